@@ -0,0 +1,201 @@
+from decision_tables import compile_decision_table
+from graph_executor import GraphExecutor
+from model_slices import ModelSlices
+
+# ==============================================================
+# compiled_model.py – en GoRules-model opløst én gang pr. modelversion
+#
+# Noder slås op efter rolle (AK/RK/bilag/BK/Designkrav) med samme navne- og
+# nøgleordsregler overalt, decision tables kompileres, og kanter/regel-id'er
+# indekseres, så evalueringsfunktionerne ikke har setup-arbejde pr. request.
+# ==============================================================
+
+
+def find_node_by_keywords(nodes, keywords):
+    """Find a decision node whose name matches any of the keywords (case-insensitive substring)."""
+    for name, node in nodes.items():
+        n = (name or "").lower()
+        for kw in keywords:
+            if kw in n:
+                return node
+    return None
+
+
+# role -> (node names tried first, keywords for the substring fallback)
+NODE_ROLES = {
+    "ak": (("Anvendelseskategori 2.0",), ("anvendelseskategori",)),
+    "rk": (("Risikoklasse",), ("risikoklasse", "risiko klasse", "risk class")),
+    "bilag": (("Relevant bilag",), ("relevant bilag", "bilag")),
+    # Earlier versions of the model called the brandklasse table "Præ-accepterede løsninger".
+    "bk": (("Brandklasse", "Præ-accepterede løsninger"), ("brandklasse", "præ-accepterede", "prae-accepterede")),
+    "krav": (("Designkrav",), ()),
+}
+
+# role -> key field whose rules are partitioned at load time (see KeyPartition).
+# Nearly every Designkrav rule pins Relevant_bilag.
+ROLE_PARTITIONS = {
+    "krav": "Relevant_bilag",
+}
+
+# Roles whose first-hit tables are compiled to region diagrams at load time (see decision_regions.py).
+REGION_ROLES = ("ak", "rk", "bilag", "bk")
+
+
+class CompiledModel:
+    """Decision model with resolved role nodes, compiled tables and graph/rule indexes."""
+
+    def __init__(self, model: dict):
+        model = model or {}
+        self.model = model
+        self.nodes_by_id = {node.get("id"): node for node in model.get("nodes", [])}
+        # Decision tables by name, in model order (same dict the flows used to build per call)
+        self.decision_nodes = {
+            node["name"]: node for node in model.get("nodes", []) if node.get("type") == "decisionTableNode"
+        }
+        self.tables = {node.get("id"): compile_decision_table(node) for node in self.decision_nodes.values()}
+
+        self.roles = {}
+        self.role_names = {}
+        for role, (names, keywords) in NODE_ROLES.items():
+            node = None
+            for name in names:
+                if name in self.decision_nodes:
+                    node = self.decision_nodes[name]
+                    break
+            if node is None and keywords:
+                node = find_node_by_keywords(self.decision_nodes, keywords)
+            self.roles[role] = node
+            self.role_names[role] = node.get("name") if node else None
+
+        # Edge adjacency (node id -> list of node ids), in edge order
+        self.downstream = {node_id: [] for node_id in self.nodes_by_id}
+        self.upstream = {node_id: [] for node_id in self.nodes_by_id}
+        for edge in model.get("edges", []) or []:
+            source, target = edge.get("sourceId"), edge.get("targetId")
+            if source in self.nodes_by_id and target in self.nodes_by_id:
+                self.downstream[source].append(target)
+                self.upstream[target].append(source)
+        self.topological_order = self._topological_order()
+
+        # Input field -> ids of the decision tables that read it (from each node's content.inputs)
+        self.field_readers = {}
+        for node_id, table in self.tables.items():
+            for field in table.inputs_map:
+                self.field_readers.setdefault(field, []).append(node_id)
+
+        # (node id, rule id) -> rule index and rule id -> CompiledRule, for both the rule's own
+        # `_id` and the "{node_id}_rule_{index}" id the evaluations return as _matched_rule_id.
+        self.rule_index = {}
+        self.rules_by_id = {}
+        for node_id, table in self.tables.items():
+            for crule in table.rules:
+                for rule_id in (crule.rule.get("_id"), crule.result["_matched_rule_id"]):
+                    if rule_id:
+                        self.rule_index.setdefault((node_id, rule_id), crule.index)
+                        self.rules_by_id.setdefault(rule_id, crule)
+
+        # (node id, rule index) -> prebuilt explanation fragments (filled by logic.generate_explanation)
+        self.explanations = {}
+        # what_if.WhatIfOptimizer of this version (built by logic on first use)
+        self.what_if = None
+
+        for role, field in ROLE_PARTITIONS.items():
+            table = self.table(role)
+            if table is not None:
+                table.partition(field)
+        # The first-hit flow tables get their region diagrams at load time, not on the first request.
+        for role in REGION_ROLES:
+            table = self.table(role)
+            if table is not None:
+                table.regions
+
+        self.executor = GraphExecutor(self)
+        self._output_indexes = {}
+        self._slices = None
+
+    def _topological_order(self):
+        """Node ids in dependency order (Kahn; model order breaks ties, cycles appended last)."""
+        indegree = {node_id: len(sources) for node_id, sources in self.upstream.items()}
+        ready = [node_id for node_id in self.nodes_by_id if indegree[node_id] == 0]
+        order = []
+        while ready:
+            node_id = ready.pop(0)
+            order.append(node_id)
+            for target in self.downstream[node_id]:
+                indegree[target] -= 1
+                if indegree[target] == 0:
+                    ready.append(target)
+        seen = set(order)
+        order.extend(node_id for node_id in self.nodes_by_id if node_id not in seen)
+        return order
+
+    def node(self, role: str):
+        """Resolved decision node for a role ("ak", "rk", "bilag", "bk", "krav") or None."""
+        return self.roles.get(role)
+
+    def table(self, role_or_node):
+        """Compiled table for a role name or a node dict of this model (None if absent)."""
+        node = self.roles.get(role_or_node) if isinstance(role_or_node, str) else role_or_node
+        if not node:
+            return None
+        return self.tables.get(node.get("id"))
+
+    def input_fields(self, role: str) -> dict:
+        """{field: input column id} of a role's decision table."""
+        table = self.table(role)
+        return dict(table.inputs_map) if table else {}
+
+    def output_fields(self, role: str) -> dict:
+        """{field: output column id} of a role's decision table."""
+        table = self.table(role)
+        return dict(table.outputs_map) if table else {}
+
+    def find_rule(self, node, rule_id):
+        """Raw rule dict with the given `_id` or matched-rule id in a decision node of this model, or None."""
+        if not node or not rule_id:
+            return None
+        node_id = node.get("id")
+        rule_index = self.rule_index.get((node_id, rule_id))
+        if rule_index is None:
+            return None
+        return self.tables[node_id].rules[rule_index].rule
+
+    def compiled_rule(self, rule_id):
+        """CompiledRule for a rule `_id` or matched-rule id anywhere in the model, or None."""
+        return self.rules_by_id.get(rule_id) if rule_id else None
+
+    def rules_by_output(self, role: str, field: str) -> dict:
+        """{output value: [CompiledRule, ...]} for one output field of a role's table (built once)."""
+        key = (role, field)
+        index = self._output_indexes.get(key)
+        if index is None:
+            index = {}
+            table = self.table(role)
+            for crule in table.rules if table else ():
+                value = crule.result.get(field)
+                if isinstance(value, str) and value:
+                    index.setdefault(value, []).append(crule)
+            self._output_indexes[key] = index
+        return index
+
+    @property
+    def slices(self) -> ModelSlices:
+        """Option/rule slices for the frontend, built on first use for this model version."""
+        if self._slices is None:
+            self._slices = ModelSlices(self)
+        return self._slices
+
+    def flow_nodes(self) -> dict:
+        """AK/RK/bilag/BK nodes in the shape the complete flow expects."""
+        return {
+            "nodes": self.decision_nodes,
+            "ak": self.roles["ak"],
+            "rk": self.roles["rk"],
+            "bilag": self.roles["bilag"],
+            "bk": self.roles["bk"],
+            "bk_name": self.role_names["bk"],
+        }
+
+
+def compile_model(model: dict) -> CompiledModel:
+    return CompiledModel(model)
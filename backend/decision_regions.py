@@ -0,0 +1,208 @@
+from bisect import bisect_left
+
+# ==============================================================
+# decision_regions.py – first-hit tabeller forudberegnet til regioner
+#
+# Hver talcelle i en tabel er en tærskel og hver tekstcelle en endelig
+# option-liste, så en tabel deler inputrummet i endeligt mange regioner. For
+# hver kolonne samles de mulige værdier i klasser med samme regel-bitset
+# (manglende felt, true/false, intervallerne mellem de sorterede tærskler og de
+# kendte tekstværdier). Derefter bygges et reduceret beslutningsdiagram over
+# klasserne, hvor hvert blad er den første regel, der rammer. Fuldt udfoldet
+# ville produktet af klasserne blive for stort (Risikoklasse har 17 kolonner),
+# men delgrafer med samme kandidatsæt deles, og en gren stopper, så snart den
+# første kandidat ikke afhænger af flere kolonner. En evaluering er derfor en
+# håndfuld bisect-/dict-opslag. Værdier uden for de kendte klasser (tekst der
+# vælger et nyt regelsæt, NaN, andre typer) giver FALLBACK, og tabellen
+# evalueres som før.
+# ==============================================================
+
+NO_MATCH = -1
+FALLBACK = -2
+
+# Diagrams with more inner nodes than this are not kept; the table stays on the bitset index.
+MAX_REGION_NODES = 20000
+
+# Upper bound on unknown text values classified per column (free-text input values are unbounded).
+_TEXT_MEMO_LIMIT = 4096
+
+
+class _RegionTooLarge(Exception):
+    pass
+
+
+def _lowest_bit(mask: int) -> int:
+    return (mask & -mask).bit_length() - 1
+
+
+class RegionColumn:
+    """Value classes of one input column: values in the same class select the same rules."""
+
+    __slots__ = (
+        "field", "masks", "missing", "true", "false", "points", "segments", "numbers", "text", "_known",
+        "_column", "_index",
+    )
+
+    def __init__(self, column):
+        self.field = column.field
+        self.masks = []
+        self._column = column
+        self._index = index = {}
+
+        def class_of(mask):
+            cls = index.get(mask)
+            if cls is None:
+                cls = index[mask] = len(self.masks)
+                self.masks.append(mask)
+            return cls
+
+        self.missing = class_of(column.free)
+        self.true = class_of(column.true_mask)
+        self.false = class_of(column.false_mask)
+        self.points = column.points
+        self.segments = [class_of(mask | column.free) for mask in column.segments]
+        # List cells such as '1,2' compare str(number) with their items, so only the numbers
+        # spelled exactly like an item can match them; those get their own entry.
+        self.numbers = {}
+        for _rule_index, cond in column.other_numeric:
+            for choice in cond.choices:
+                for parse in (int, float):
+                    try:
+                        number = parse(choice)
+                    except ValueError:
+                        continue
+                    if str(number) == choice:
+                        self.numbers[choice] = class_of(column._number_mask(number))
+        self.text = {key: class_of(mask) for key, mask in list(column.text_masks.items())}
+        self._known = len(self.text)
+
+    def free_mask(self, all_mask: int) -> int:
+        """Rules without a cell on this column (they are in every class)."""
+        free = all_mask
+        for mask in self.masks:
+            free &= mask
+        return free
+
+    def _text_class(self, key: str):
+        # A text value not in any cell: its bitset comes from the column index (aliases
+        # included). It has a class only if some precomputed value selects the same rules.
+        cls = self._index.get(self._column._text_mask(key))
+        if cls is not None:
+            if len(self.text) >= self._known + _TEXT_MEMO_LIMIT:
+                return cls
+            self.text[key] = cls
+        return cls
+
+    def classify(self, input_data: dict):
+        """Class of the column's value in input_data, or None when it has no precomputed class."""
+        if self.field not in input_data:
+            return self.missing
+        value = input_data[self.field]
+        if value is True:
+            return self.true
+        if value is False:
+            return self.false
+        if isinstance(value, str):
+            key = value.strip().lower()
+            cls = self.text.get(key)
+            return cls if cls is not None else self._text_class(key)
+        if isinstance(value, (int, float)):
+            if value != value:
+                return None
+            if self.numbers:
+                cls = self.numbers.get(str(value))
+                if cls is not None:
+                    return cls
+            points = self.points
+            i = bisect_left(points, value)
+            return self.segments[2 * i + 1 if i < len(points) and points[i] == value else 2 * i]
+        return None
+
+
+class _RegionNode:
+    __slots__ = ("column", "children")
+
+    def __init__(self, column, children):
+        self.column = column
+        self.children = children
+
+
+class DecisionRegions:
+    """Reduced decision diagram over the value classes of a first-hit table.
+
+    lookup() returns the index of the first matching rule, NO_MATCH, or FALLBACK when a
+    value is outside the precomputed classes.
+    """
+
+    def __init__(self, table, max_nodes: int = MAX_REGION_NODES):
+        index = table.index
+        all_mask = index.all_mask
+        self.columns = [RegionColumn(column) for column in index.columns]
+        # Columns in the order the rules start constraining them (first hit decides, so the
+        # early rules' columns near the root let most branches end in a leaf quickly).
+        self.columns.sort(key=lambda c: _lowest_bit(all_mask & ~c.free_mask(all_mask)))
+        self.max_nodes = max_nodes
+        self.node_count = 0
+
+        # constrained[level]: rules with a cell on any column at or after `level`
+        constrained = [0] * (len(self.columns) + 1)
+        for level in range(len(self.columns) - 1, -1, -1):
+            constrained[level] = constrained[level + 1] | (all_mask & ~self.columns[level].free_mask(all_mask))
+        self._constrained = constrained
+        self._memo = {}
+        self._unique = {}
+        self.root = self._build(0, index.all_mask)
+        del self._memo, self._unique, self._constrained
+
+    def _build(self, level, mask):
+        if not mask:
+            return NO_MATCH
+        first = _lowest_bit(mask)
+        if not (self._constrained[level] >> first) & 1:
+            # The first candidate matches whatever the remaining columns hold.
+            return first
+        key = (level, mask)
+        node = self._memo.get(key)
+        if node is not None:
+            return node
+        column = self.columns[level]
+        children = [self._build(level + 1, mask & m) for m in column.masks]
+        # Inner nodes are unique per (level, children), so identity compares subgraphs.
+        shape = tuple(c if isinstance(c, int) else id(c) for c in children)
+        if len(set(shape)) == 1:
+            node = children[0]
+        else:
+            unique_key = (level, shape)
+            node = self._unique.get(unique_key)
+            if node is None:
+                self.node_count += 1
+                if self.node_count > self.max_nodes:
+                    raise _RegionTooLarge()
+                node = self._unique[unique_key] = _RegionNode(column, children)
+        self._memo[key] = node
+        return node
+
+    def lookup(self, input_data: dict) -> int:
+        node = self.root
+        while type(node) is _RegionNode:
+            cls = node.column.classify(input_data)
+            if cls is None:
+                return FALLBACK
+            node = node.children[cls]
+        return node
+
+    def stats(self) -> dict:
+        return {
+            "nodes": self.node_count,
+            "columns": {c.field: len(c.masks) for c in self.columns},
+        }
+
+
+def compile_regions(table, max_nodes: int = MAX_REGION_NODES):
+    """DecisionRegions for a first-hit table, or None when the table doesn't qualify or is too large."""
+    if not table.has_outputs or table.hit_policy != "first" or not table.indexable or not table.rules:
+        return None
+    try:
+        return DecisionRegions(table, max_nodes)
+    except _RegionTooLarge:
+        return None
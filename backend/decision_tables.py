@@ -0,0 +1,780 @@
+import csv
+import math
+from bisect import bisect_left
+
+from decision_regions import FALLBACK, compile_regions
+
+# ==============================================================
+# decision_tables.py – kompilerede GoRules decision tables
+#
+# Regelcellerne i JSON-modellerne er strenge ("<=600", '"1a"', '"Butik", "Klinik"' ...).
+# I stedet for at parse dem igen ved hver evaluering, kompileres hver celle én gang
+# til et typed prædikat (numerisk sammenligning, option-sæt eller bilag-alias).
+# Semantikken er præcis den samme som check_numeric_condition/check_string_condition.
+# ==============================================================
+
+
+def normalize_bilag_token_for_compare(token: str):
+    """Normalize bilag tokens for equality matching.
+
+    Returns canonical "1a" / "1b" when the input token is a known alias,
+    otherwise returns None.
+    """
+    try:
+        if token is None:
+            return None
+        s = str(token).strip().lower()
+        if s == "":
+            return None
+
+        # Unwrap a single surrounding quote-pair
+        if len(s) >= 2 and s.startswith('"') and s.endswith('"'):
+            s = s[1:-1].strip().lower()
+
+        # Only treat exact tokens as aliases (avoid rewriting longer descriptive strings)
+        s_compact = s.replace(" ", "")
+        if s_compact in ("1", "1a", "1.0"):
+            return "1a"
+        if s_compact in ("1.1", "11", "1b"):
+            return "1b"
+        return None
+    except Exception:
+        return None
+
+
+def _parse_option_list(exp: str):
+    """Split a (lower-cased, newline-normalized) option list cell into unquoted options."""
+    # Brug CSV-parser for at respektere citations-tegn og undgå split på kommaer inde i citations
+    # (efter vi har normaliseret linjeskift/semicolons til komma).
+    exp_list = exp.replace("\n", ",").replace(";", ",")
+    try:
+        tokens = next(csv.reader([exp_list], skipinitialspace=True))
+    except Exception:
+        # Fallback: simple split if csv parsing fails for any reason
+        tokens = [t.strip() for t in exp_list.split(',')]
+    options = []
+    for t in tokens:
+        tt = t.strip()
+        if len(tt) >= 2 and tt.startswith('"') and tt.endswith('"'):
+            tt = tt[1:-1]
+        options.append(tt)
+    return options
+
+
+def _unquote_output(value):
+    """Strip and unwrap a single pair of surrounding quotes from an output cell."""
+    if isinstance(value, str):
+        value = value.strip()
+        # Many fields in the JSON model are stored as a quoted string literal (e.g. "\"1.3.1 og 1.3.2\"").
+        if len(value) >= 2 and value.startswith('"') and value.endswith('"'):
+            value = value[1:-1]
+    return value
+
+
+def check_numeric_condition(value, expected):
+    """Tjekker numeriske betingelser som <=, >=, <, >, intervaller"""
+    expected = (expected or "").strip()
+    if expected.startswith("<="):
+        return value <= float(expected[2:])
+    elif expected.startswith(">="):
+        return value >= float(expected[2:])
+    elif expected.startswith("<"):
+        return value < float(expected[1:])
+    elif expected.startswith(">"):
+        return value > float(expected[1:])
+    elif "," in expected:
+        # Håndter multiple værdier
+        valid_values = [v.strip() for v in expected.split(",")]
+        return str(value) in valid_values
+    else:
+        try:
+            return float(value) == float(expected)
+        except:
+            return str(value) == expected
+
+
+def check_string_condition(value, expected):
+    """Tjekker string betingelser inkl. quoted strings"""
+    val = (value or "").strip().lower()
+    exp = (expected or "").strip().lower()
+    # Some model cells contain newline-separated option lists.
+    # The csv module raises on embedded newlines unless the input is handled carefully,
+    # so normalize newlines/semicolons into commas before parsing.
+    exp = exp.replace("\r\n", "\n").replace("\r", "\n")
+
+    # Hvis vi har en liste (komma/linjeskift/semicolon-separeret), parse alle muligheder
+    if ',' in exp or '\n' in exp or ';' in exp:
+        options = _parse_option_list(exp)
+
+        # Bilag aliasing: allow e.g. "1" to match "1a" and "1.1" to match "1b".
+        norm_val = normalize_bilag_token_for_compare(val)
+        if norm_val is not None:
+            for opt in options:
+                norm_opt = normalize_bilag_token_for_compare(opt)
+                if norm_opt is not None and norm_opt == norm_val:
+                    return True
+        return val in options
+
+    # Enkelt quoted værdi
+    if len(exp) >= 2 and exp.startswith('"') and exp.endswith('"'):
+        unquoted = exp[1:-1]
+        norm_val = normalize_bilag_token_for_compare(val)
+        norm_exp = normalize_bilag_token_for_compare(unquoted)
+        if norm_val is not None and norm_exp is not None:
+            return norm_val == norm_exp
+        return val == unquoted
+
+    # Simpel streng uden citation
+    norm_val = normalize_bilag_token_for_compare(val)
+    norm_exp = normalize_bilag_token_for_compare(exp)
+    if norm_val is not None and norm_exp is not None:
+        return norm_val == norm_exp
+    return val == exp
+
+
+class CellCondition:
+    """A single pre-parsed rule cell.
+
+    The runtime type of the input value decides which branch applies (exactly as in
+    the interpreter): bools use precomputed true/false acceptance, numbers use the
+    parsed comparison and everything else is matched against the option set and
+    bilag aliases of the cell.
+    """
+
+    __slots__ = (
+        "field",
+        "expected",
+        "op",
+        "threshold",
+        "choices",
+        "options",
+        "aliases",
+        "accepts_true",
+        "accepts_false",
+    )
+
+    def __init__(self, field: str, expected: str):
+        self.field = field
+        self.expected = expected
+
+        # Numeric branch (check_numeric_condition)
+        s = expected.strip()
+        self.op = None
+        self.threshold = None
+        self.choices = None
+        for op in ("<=", ">=", "<", ">"):
+            if s.startswith(op):
+                try:
+                    self.op = op
+                    self.threshold = float(s[len(op):])
+                except ValueError:
+                    # Unparseable threshold: keep the interpreter's behaviour (it raises at runtime).
+                    self.op = "raw"
+                break
+        else:
+            if "," in s:
+                self.op = "in"
+                self.choices = frozenset(v.strip() for v in s.split(","))
+            else:
+                try:
+                    self.op = "=="
+                    self.threshold = float(s)
+                except ValueError:
+                    self.op = "str"
+                    self.choices = frozenset((s,))
+
+        # String branch (check_string_condition)
+        exp = s.lower().replace("\r\n", "\n").replace("\r", "\n")
+        if ',' in exp or '\n' in exp or ';' in exp:
+            options = _parse_option_list(exp)
+        elif len(exp) >= 2 and exp.startswith('"') and exp.endswith('"'):
+            options = [exp[1:-1]]
+        else:
+            options = [exp]
+        self.options = frozenset(options)
+        self.aliases = frozenset(
+            a for a in (normalize_bilag_token_for_compare(o) for o in options) if a is not None
+        )
+
+        # Bool branch: the model stores bools as 'true'/'false', so both outcomes are known upfront.
+        if "," in expected or '"' in expected:
+            self.accepts_true = check_string_condition("true", expected.lower())
+            self.accepts_false = check_string_condition("false", expected.lower())
+        else:
+            self.accepts_true = expected.lower() == "true"
+            self.accepts_false = expected.lower() == "false"
+
+    @property
+    def is_threshold(self) -> bool:
+        """True when the numeric branch is a pure comparison against a single number."""
+        return self.op in ("<=", ">=", "<", ">", "==")
+
+    def match_number(self, value) -> bool:
+        op = self.op
+        if op == "<=":
+            return value <= self.threshold
+        if op == ">=":
+            return value >= self.threshold
+        if op == "<":
+            return value < self.threshold
+        if op == ">":
+            return value > self.threshold
+        if op == "==":
+            return float(value) == self.threshold
+        if op == "raw":
+            return check_numeric_condition(value, self.expected)
+        return str(value) in self.choices
+
+    def numeric_adjustment(self, value):
+        """How far a numeric value is from satisfying this cell (None if satisfied/not comparable).
+
+        Output shape: { field_current, op, threshold, direction, delta_abs }
+        """
+        try:
+            if not self.is_threshold:
+                return None
+            v = float(value)
+            if self.match_number(v):
+                return None
+            op, thr = self.op, self.threshold
+            # Direction indicates which way the number must move to satisfy the constraint.
+            if op in ("<=", "<"):
+                return {"field_current": v, "op": op, "threshold": thr, "direction": "decrease", "delta_abs": max(0.0, v - thr)}
+            if op in (">=", ">"):
+                return {"field_current": v, "op": op, "threshold": thr, "direction": "increase", "delta_abs": max(0.0, thr - v)}
+            return {"field_current": v, "op": op, "threshold": thr, "direction": "set", "delta_abs": abs(v - thr)}
+        except Exception:
+            return None
+
+    def match_text(self, value: str) -> bool:
+        val = (value or "").strip().lower()
+        if self.aliases:
+            norm_val = normalize_bilag_token_for_compare(val)
+            if norm_val is not None and norm_val in self.aliases:
+                return True
+        return val in self.options
+
+    def __call__(self, value) -> bool:
+        if value is True:
+            return self.accepts_true
+        if value is False:
+            return self.accepts_false
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return self.match_number(value)
+        if isinstance(value, str):
+            return self.match_text(value)
+        return self.match_text(str(value))
+
+    def __repr__(self):
+        return f"CellCondition({self.field!r}, {self.expected!r})"
+
+
+# Cell states in a diagnostic scan
+MISSING = "missing"
+SATISFIED = "satisfied"
+MISMATCHED = "mismatched"
+
+
+def is_missing_value(value) -> bool:
+    """Diagnostics treat None and blank strings as 'not answered yet'."""
+    return value is None or (isinstance(value, str) and value.strip() == "")
+
+
+class CellStatus:
+    """Outcome of one rule cell for the current inputs (see CompiledDecisionTable.scan)."""
+
+    __slots__ = ("cond", "state", "numeric_ok", "adjustment")
+
+    def __init__(self, cond, state, numeric_ok=None, adjustment=None):
+        self.cond = cond
+        self.state = state
+        # For int/float/bool values: result of the numeric comparison and, if it fails,
+        # the distance to the threshold (CellCondition.numeric_adjustment).
+        self.numeric_ok = numeric_ok
+        self.adjustment = adjustment
+
+
+class RuleStatus:
+    """Per-rule status vector shared by matching and all diagnostics."""
+
+    __slots__ = ("crule", "matched", "satisfied", "mismatched", "missing_fields", "cells")
+
+    def __init__(self, crule, matched, satisfied, mismatched, missing_fields, cells):
+        self.crule = crule
+        self.matched = matched
+        self.satisfied = satisfied
+        self.mismatched = mismatched
+        self.missing_fields = missing_fields
+        self.cells = cells
+
+    @property
+    def required_count(self) -> int:
+        return len(self.cells)
+
+
+class CompiledRule:
+    """A rule with its non-empty cells compiled and its outputs pre-unquoted.
+
+    diag_conditions are the cells as the diagnostics read them (stripped, blank = no condition).
+    """
+
+    __slots__ = ("index", "rule", "conditions", "diag_conditions", "result")
+
+    def __init__(self, index: int, rule: dict, conditions: tuple, result: dict, diag_conditions: tuple = None):
+        self.index = index
+        self.rule = rule
+        self.conditions = conditions
+        self.diag_conditions = conditions if diag_conditions is None else diag_conditions
+        self.result = result
+
+    def matches(self, input_data: dict) -> bool:
+        for cond in self.conditions:
+            field = cond.field
+            if field not in input_data:
+                # Felt kræves af reglen men mangler i input -> intet match
+                return False
+            if not cond(input_data[field]):
+                return False
+        return True
+
+
+# Tables with at least this many rules use the bitset index by default.
+INDEX_MIN_RULES = 8
+
+# Upper bound on memoized text lookups per column (free-text input values are unbounded).
+_TEXT_MEMO_LIMIT = 4096
+
+
+def iter_bits(mask: int):
+    """Yield the positions of the set bits in mask, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def lowest_bit(mask: int):
+    """Return the position of the lowest set bit, or None for an empty mask."""
+    if not mask:
+        return None
+    return (mask & -mask).bit_length() - 1
+
+
+class _ColumnIndex:
+    """Bitsets for one input column: bit i is set when rule i accepts the value.
+
+    Rules without a condition on the column are part of every bitset.
+    """
+
+    def __init__(self, field: str, cells: list, all_mask: int):
+        self.field = field
+        cond_mask = 0
+        for rule_index, _cond in cells:
+            cond_mask |= 1 << rule_index
+        self.free = all_mask & ~cond_mask
+
+        # Booleans: two precomputed bitsets.
+        self.true_mask = self.free
+        self.false_mask = self.free
+        for rule_index, cond in cells:
+            if cond.accepts_true:
+                self.true_mask |= 1 << rule_index
+            if cond.accepts_false:
+                self.false_mask |= 1 << rule_index
+
+        # Numbers: threshold cells are step functions, so the bitset only changes at the
+        # sorted distinct thresholds. Segment 2i is the open interval below points[i],
+        # segment 2i+1 is exactly points[i].
+        threshold_cells = [(ri, c) for ri, c in cells if c.is_threshold]
+        self.other_numeric = [(ri, c) for ri, c in cells if not c.is_threshold]
+        self.points = sorted({c.threshold for _ri, c in threshold_cells})
+        self.segments = []
+        pts = self.points
+        for seg in range(2 * len(pts) + 1):
+            i, exact = divmod(seg, 2)
+            if exact:
+                probe = pts[i]
+            elif not pts:
+                probe = 0.0
+            elif i == 0:
+                probe = pts[0] - 1.0
+            elif i == len(pts):
+                probe = pts[-1] + 1.0
+            else:
+                probe = (pts[i - 1] + pts[i]) / 2.0
+            mask = 0
+            for rule_index, cond in threshold_cells:
+                if cond.match_number(probe):
+                    mask |= 1 << rule_index
+            self.segments.append(mask)
+        self.threshold_cells = threshold_cells
+
+        # Text: one bitset per distinct (normalized) value, precomputed for the values
+        # that occur in the cells and memoized for anything else.
+        self.cells = cells
+        self.text_masks = {}
+        for _rule_index, cond in cells:
+            for option in cond.options:
+                self._text_mask(option)
+
+    def _text_mask(self, value: str) -> int:
+        key = (value or "").strip().lower()
+        mask = self.text_masks.get(key)
+        if mask is None:
+            mask = self.free
+            for rule_index, cond in self.cells:
+                if cond.match_text(key):
+                    mask |= 1 << rule_index
+            if len(self.text_masks) >= _TEXT_MEMO_LIMIT:
+                self.text_masks.clear()
+            self.text_masks[key] = mask
+        return mask
+
+    def _number_mask(self, value) -> int:
+        if isinstance(value, float) and math.isnan(value):
+            mask = 0
+            for rule_index, cond in self.threshold_cells:
+                if cond.match_number(value):
+                    mask |= 1 << rule_index
+        else:
+            i = bisect_left(self.points, value)
+            exact = i < len(self.points) and self.points[i] == value
+            mask = self.segments[2 * i + 1 if exact else 2 * i]
+        for rule_index, cond in self.other_numeric:
+            if cond.match_number(value):
+                mask |= 1 << rule_index
+        return mask | self.free
+
+    def mask_for(self, input_data: dict) -> int:
+        if self.field not in input_data:
+            return self.free
+        value = input_data[self.field]
+        if value is True:
+            return self.true_mask
+        if value is False:
+            return self.false_mask
+        if isinstance(value, (int, float)):
+            return self._number_mask(value)
+        if isinstance(value, str):
+            return self._text_mask(value)
+        return self._text_mask(str(value))
+
+
+class TableIndex:
+    """Column bitset index over a compiled decision table.
+
+    A lookup ANDs one bitset per constrained column; 'first' takes the lowest set bit
+    and 'collect' reads out every set bit in rule order.
+    """
+
+    def __init__(self, table: "CompiledDecisionTable"):
+        self.all_mask = (1 << len(table.rules)) - 1
+        cells_by_field = {}
+        for crule in table.rules:
+            for cond in crule.conditions:
+                cells_by_field.setdefault(cond.field, []).append((crule.index, cond))
+        self.columns = [
+            _ColumnIndex(field, cells, self.all_mask) for field, cells in cells_by_field.items()
+        ]
+
+    def match_mask(self, input_data: dict) -> int:
+        """Bitset of all rules matching input_data."""
+        mask = self.all_mask
+        for column in self.columns:
+            mask &= column.mask_for(input_data)
+            if not mask:
+                break
+        return mask
+
+
+class KeyPartition:
+    """Rules of a table partitioned on the value of one text key field (e.g. Relevant_bilag).
+
+    A string input matches a cell exactly when its bilag alias ("1a"/"1b") is one of the
+    cell's aliases or, for values without an alias, when it is one of the cell's options.
+    Rules are therefore grouped by alias and by option at build time; rules without a
+    cell on the key field are candidates in every partition. Only the candidates'
+    remaining cells have to be checked.
+    """
+
+    def __init__(self, table, field: str):
+        self.field = field
+        free = []
+        by_alias = {}
+        by_option = {}
+        for crule in table.rules:
+            key_cell = None
+            rest = []
+            for cond in crule.conditions:
+                if cond.field == field and key_cell is None:
+                    key_cell = cond
+                else:
+                    rest.append(cond)
+            member = (crule, tuple(rest))
+            if key_cell is None:
+                free.append(member)
+                continue
+            for alias in key_cell.aliases:
+                by_alias.setdefault(alias, []).append(member)
+            for option in key_cell.options:
+                by_option.setdefault(option, []).append(member)
+
+        def with_free(members):
+            # Keep model order inside each partition (collect output order)
+            return tuple(sorted(members + free, key=lambda m: m[0].index))
+
+        self.free = tuple(free)
+        self.by_alias = {alias: with_free(members) for alias, members in by_alias.items()}
+        self.by_option = {option: with_free(members) for option, members in by_option.items()}
+
+    def candidates(self, input_data: dict):
+        """(rule, remaining cells) pairs to check, or None when the key value isn't a string."""
+        if self.field not in input_data:
+            return self.free
+        value = input_data[self.field]
+        if not isinstance(value, str):
+            return None
+        alias = normalize_bilag_token_for_compare(value)
+        if alias is not None:
+            return self.by_alias.get(alias, self.free)
+        return self.by_option.get(value.strip().lower(), self.free)
+
+
+def _matches_cells(cells, input_data: dict) -> bool:
+    for cond in cells:
+        field = cond.field
+        if field not in input_data or not cond(input_data[field]):
+            return False
+    return True
+
+
+class CompiledDecisionTable:
+    """Compiled form of a GoRules decisionTableNode."""
+
+    def __init__(self, node: dict):
+        content = node.get("content", {}) or {}
+        inputs = content.get("inputs", []) or []
+        outputs = content.get("outputs", []) or []
+
+        self.node = node
+        self.node_id = node.get("id")
+        self.name = node.get("name")
+        self.hit_policy = content.get("hitPolicy", "first")
+        self.has_outputs = bool(outputs)
+        self.inputs_map = {
+            i.get("field"): i.get("id")
+            for i in inputs
+            if isinstance(i, dict) and i.get("field") and i.get("id")
+        }
+        self.outputs_map = {
+            o.get("field"): o.get("id")
+            for o in outputs
+            if isinstance(o, dict) and o.get("field") and o.get("id")
+        }
+        self.field_questions = {
+            i.get("field"): (i.get("name") or i.get("field"))
+            for i in inputs
+            if isinstance(i, dict) and i.get("field")
+        }
+
+        single_field = next(iter(self.outputs_map)) if len(self.outputs_map) == 1 else None
+        self.rules = []
+        self.field_usage = {}  # field -> number of rules with a (non-blank) condition on it
+        for rule_index, rule in enumerate(content.get("rules", []) or []):
+            conditions = []
+            diag_conditions = []
+            for field, rule_id in self.inputs_map.items():
+                expected = rule.get(rule_id, "")
+                if expected == "" or expected is None:
+                    # Ingen betingelse sat for dette input
+                    continue
+                cond = CellCondition(field, str(expected))
+                conditions.append(cond)
+                stripped = str(expected).strip()
+                if stripped == "":
+                    continue
+                diag_conditions.append(cond if stripped == cond.expected else CellCondition(field, stripped))
+                self.field_usage[field] = self.field_usage.get(field, 0) + 1
+
+            result = {
+                "_description": rule.get("_description", ""),
+                "_matched_rule_id": f"{self.node_id}_rule_{rule_index}",
+                "_matched_rule_index": rule_index,
+                "_matched_rule_number": rule_index + 1,
+                "_matched_node_id": self.node_id,
+                "_matched_node_name": self.name,
+            }
+            for field, output_id in self.outputs_map.items():
+                result[field] = _unquote_output(rule.get(output_id))
+            # For backwards compatibility with single output
+            if single_field is not None:
+                result["value"] = result[single_field]
+                result["description"] = result["_description"]
+
+            self.rules.append(CompiledRule(rule_index, rule, tuple(conditions), result, tuple(diag_conditions)))
+
+        self._index = None
+        self._regions = None  # None = not built yet, False = table has no region diagram
+        self._partitions = {}
+        # "raw" cells raise at match time in the interpreter; keep those tables on the linear scan.
+        self.indexable = all(c.op != "raw" for r in self.rules for c in r.conditions)
+
+    @property
+    def index(self) -> TableIndex:
+        """Bitset index, built on first use and kept for the lifetime of this model version."""
+        if self._index is None:
+            self._index = TableIndex(self)
+        return self._index
+
+    @property
+    def regions(self):
+        """Region diagram for first-hit lookups (see decision_regions.py), or None if the table has none.
+
+        Built on first use and kept for the lifetime of this model version.
+        """
+        if self._regions is None:
+            self._regions = compile_regions(self) or False
+        return self._regions or None
+
+    def partition(self, field: str) -> KeyPartition:
+        """Rules partitioned on a bilag-valued key field (built once per field)."""
+        partition = self._partitions.get(field)
+        if partition is None:
+            partition = self._partitions[field] = KeyPartition(self, field)
+        return partition
+
+    def evaluate_partitioned(self, input_data: dict, field: str, hit_policy=None):
+        """evaluate() that only checks the rules in the partition of input_data[field].
+
+        Falls back to evaluate() when the key value isn't a string.
+        """
+        candidates = self.partition(field).candidates(input_data) if self.has_outputs else None
+        if candidates is None:
+            return self.evaluate(input_data, hit_policy)
+        if hit_policy is None:
+            hit_policy = self.hit_policy
+        if hit_policy == "first":
+            for crule, rest in candidates:
+                if _matches_cells(rest, input_data):
+                    return dict(crule.result)
+            return None
+        return [dict(crule.result) for crule, rest in candidates if _matches_cells(rest, input_data)]
+
+    def iter_matching_rules(self, input_data: dict, partition_field: str = None):
+        """Yield the matching rules in model order (collect semantics) as CompiledRule objects.
+
+        With partition_field, only that key field's partition is checked (see evaluate_partitioned).
+        """
+        if partition_field is not None:
+            candidates = self.partition(partition_field).candidates(input_data)
+            if candidates is not None:
+                for crule, rest in candidates:
+                    if _matches_cells(rest, input_data):
+                        yield crule
+                return
+        if len(self.rules) >= INDEX_MIN_RULES and self.indexable:
+            for i in iter_bits(self.index.match_mask(input_data)):
+                yield self.rules[i]
+            return
+        for crule in self.rules:
+            if crule.matches(input_data):
+                yield crule
+
+    def matching_rules(self, input_data: dict, partition_field: str = None):
+        """List form of iter_matching_rules."""
+        return list(self.iter_matching_rules(input_data, partition_field))
+
+    def scan(self, input_data: dict):
+        """Single pass over all rules computing a RuleStatus per rule.
+
+        Each cell is evaluated once: 'matched' follows evaluation semantics, while the
+        per-cell states (missing/satisfied/mismatched) and numeric deltas follow the
+        diagnostics semantics, so the missing-input, candidate and suggestion
+        diagnostics can all be derived from the same scan.
+        """
+        statuses = []
+        for crule in self.rules:
+            matched = crule.matches(input_data)
+            satisfied = 0
+            mismatched = 0
+            missing_fields = []
+            cells = []
+            for cond in crule.diag_conditions:
+                field = cond.field
+                value = input_data.get(field)
+                if field not in input_data or is_missing_value(value):
+                    missing_fields.append(field)
+                    cells.append(CellStatus(cond, MISSING))
+                    continue
+                ok = cond(value)
+                if ok:
+                    satisfied += 1
+                else:
+                    mismatched += 1
+                numeric_ok = None
+                adjustment = None
+                if isinstance(value, (int, float)):
+                    numeric_ok = cond.match_number(value) if isinstance(value, bool) else ok
+                    if not numeric_ok:
+                        adjustment = cond.numeric_adjustment(value)
+                cells.append(CellStatus(cond, SATISFIED if ok else MISMATCHED, numeric_ok, adjustment))
+            statuses.append(RuleStatus(crule, matched, satisfied, mismatched, missing_fields, cells))
+        return statuses
+
+    def evaluate(self, input_data: dict, hit_policy=None, use_index=None):
+        """Evaluate the table; same contract as logic.evaluate_decision_node.
+
+        use_index: True/False forces the bitset index on/off; None decides by table size.
+        First-hit lookups go through the region diagram unless use_index is False; values
+        outside its precomputed classes fall through to the index/linear scan below.
+        """
+        if not self.has_outputs:
+            return None if hit_policy == 'first' else []
+
+        if hit_policy is None:
+            hit_policy = self.hit_policy
+
+        if hit_policy == "first" and use_index is not False and self.hit_policy == "first":
+            regions = self.regions
+            if regions is not None:
+                first = regions.lookup(input_data)
+                if first != FALLBACK:
+                    return dict(self.rules[first].result) if first >= 0 else None
+
+        if use_index is None:
+            use_index = len(self.rules) >= INDEX_MIN_RULES
+        if use_index and self.indexable:
+            mask = self.index.match_mask(input_data)
+            if hit_policy == "first":
+                first = lowest_bit(mask)
+                return dict(self.rules[first].result) if first is not None else None
+            return [dict(self.rules[i].result) for i in iter_bits(mask)]
+
+        if hit_policy == "first":
+            for crule in self.rules:
+                if crule.matches(input_data):
+                    return dict(crule.result)
+            return None
+
+        return [dict(crule.result) for crule in self.rules if crule.matches(input_data)]
+
+
+def project_result(result: dict, fields=None) -> dict:
+    """Copy of a rule result, limited to the given output keys (all keys when fields is None)."""
+    if fields is None:
+        return dict(result)
+    return {key: result[key] for key in fields if key in result}
+
+
+def compile_decision_table(node: dict) -> CompiledDecisionTable:
+    """Compile a decisionTableNode dict into a CompiledDecisionTable."""
+    return CompiledDecisionTable(node)
+
+
+def compile_model_tables(model: dict) -> dict:
+    """Compile every decision table in a GoRules model. Returns {node_id: CompiledDecisionTable}."""
+    return {
+        node.get("id"): compile_decision_table(node)
+        for node in (model or {}).get("nodes", [])
+        if node.get("type") == "decisionTableNode"
+    }
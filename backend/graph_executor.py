@@ -0,0 +1,256 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# ==============================================================
+# graph_executor.py – evaluering af en GoRules-model efter dens `edges`
+#
+# Noderne ordnes topologisk ud fra kanterne, hver decision table evalueres
+# højst én gang, og udvalgte outputs sendes videre til efterfølgende noder.
+# Grene uden sti til et ønsket output springes over, og uafhængige søskende-
+# noder kan evalueres samtidigt i en trådpulje. rerun() genbruger resultaterne fra
+# en tidligere kørsel for noder, hvis inputfelter ikke er ændret.
+# ==============================================================
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def _get_pool(max_workers: int):
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="graph-exec")
+        return _POOL
+
+
+class GraphRun:
+    """Outcome of one executor run.
+
+    results:    node id -> evaluation result (dict, list for collect tables, or None = no match)
+    node_inputs: node id -> the context the node was evaluated with
+    skipped:    node ids not evaluated because a halting upstream node had no match
+    context:    inputs plus every forwarded output, in evaluation order
+    """
+
+    __slots__ = ("results", "node_inputs", "skipped", "context", "halted_at", "reused")
+
+    def __init__(self, context):
+        self.results = {}
+        self.node_inputs = {}
+        self.skipped = []
+        self.context = context
+        self.halted_at = None
+        self.reused = []  # node ids whose result was taken over from the previous run (rerun only)
+
+    def result(self, node):
+        return self.results.get(node.get("id")) if node else None
+
+    def evaluated(self, node) -> bool:
+        return bool(node) and node.get("id") in self.results
+
+    def inputs_for(self, node):
+        return self.node_inputs.get(node.get("id")) if node else None
+
+
+class GraphExecutor:
+    """Evaluates the decision tables of a CompiledModel in edge order.
+
+    forward maps an output field to a function result -> value; after a node matches,
+    those fields are written into the context seen by downstream nodes. Without a
+    forward map, all output fields of a matched first-hit table are forwarded as-is.
+    """
+
+    def __init__(self, compiled, max_workers: int = 4):
+        self.compiled = compiled
+        self.max_workers = max_workers
+        self._plans = {}
+        self._plans_lock = threading.Lock()
+
+        # Models without edges are treated as a chain of their decision tables in model order.
+        self.upstream = compiled.upstream
+        if not any(compiled.upstream.values()):
+            self.upstream = {node_id: [] for node_id in compiled.nodes_by_id}
+            previous = None
+            for node_id in compiled.tables:
+                if previous is not None:
+                    self.upstream[node_id] = [previous]
+                previous = node_id
+
+        self._depth = {}
+        for node_id in compiled.topological_order:
+            parents = self.upstream.get(node_id, [])
+            self._depth[node_id] = 1 + max((self._depth.get(p, 0) for p in parents), default=-1)
+
+        self._descendants = {node_id: set() for node_id in compiled.nodes_by_id}
+        for node_id in reversed(compiled.topological_order):
+            for parent in self.upstream.get(node_id, []):
+                self._descendants[parent].add(node_id)
+                self._descendants[parent] |= self._descendants[node_id]
+
+        self._reads = {node_id: frozenset(table.inputs_map) for node_id, table in compiled.tables.items()}
+
+    def _resolve_target(self, target):
+        """Node ids for a target given as node id, node name or output field name."""
+        compiled = self.compiled
+        if target in compiled.nodes_by_id:
+            return {target}
+        if target in compiled.decision_nodes:
+            return {compiled.decision_nodes[target].get("id")}
+        return {node_id for node_id, table in compiled.tables.items() if target in table.outputs_map}
+
+    def plan(self, targets=None):
+        """Decision table ids needed for targets, in topological order (all tables if targets is None)."""
+        key = None if targets is None else tuple(sorted(targets))
+        plan = self._plans.get(key)
+        if plan is not None:
+            return plan
+
+        order = [node_id for node_id in self.compiled.topological_order if node_id in self.compiled.tables]
+        if targets is not None:
+            needed = set()
+            pending = set()
+            for target in targets:
+                pending |= self._resolve_target(target)
+            while pending:
+                node_id = pending.pop()
+                if node_id in needed:
+                    continue
+                needed.add(node_id)
+                pending.update(self.upstream.get(node_id, []))
+            order = [node_id for node_id in order if node_id in needed]
+
+        # Group into waves of nodes whose dependencies are all in earlier waves.
+        waves = {}
+        for node_id in order:
+            waves.setdefault(self._depth[node_id], []).append(node_id)
+        plan = [waves[depth] for depth in sorted(waves)]
+        with self._plans_lock:
+            self._plans[key] = plan
+        return plan
+
+    def run(self, inputs: dict, targets=None, forward=None, halt_on_miss=(), parallel: bool = True):
+        """Evaluate the planned nodes against inputs (the dict is used as the context, not copied).
+
+        halt_on_miss: node ids whose missing match stops evaluation of everything downstream.
+        """
+        run = GraphRun(inputs)
+        blocked = set()
+        for wave in self.plan(targets):
+            ready = []
+            for node_id in wave:
+                if node_id in blocked:
+                    run.skipped.append(node_id)
+                else:
+                    ready.append(node_id)
+            if not ready:
+                continue
+
+            if parallel and len(ready) > 1:
+                # Siblings see the same context; their outputs are merged in topological order.
+                snapshot = dict(run.context)
+                pool = _get_pool(self.max_workers)
+                futures = [(node_id, pool.submit(self._evaluate, node_id, snapshot)) for node_id in ready]
+                for node_id, future in futures:
+                    self._record(run, node_id, snapshot, future.result(), forward, halt_on_miss, blocked)
+            else:
+                for node_id in ready:
+                    node_inputs = dict(run.context)
+                    result = self._evaluate(node_id, run.context)
+                    self._record(run, node_id, node_inputs, result, forward, halt_on_miss, blocked)
+        return run
+
+    def affected(self, changed_fields):
+        """Decision table ids that may change when the given input fields change.
+
+        The nodes reading a field (see CompiledModel.field_readers) and everything downstream
+        of them; an upper bound for rerun(), which also stops at nodes whose result stays the same.
+        """
+        affected = set()
+        for field in changed_fields:
+            for node_id in self.compiled.field_readers.get(field, ()):
+                affected.add(node_id)
+                affected |= self._descendants.get(node_id, set())
+        return {node_id for node_id in affected if node_id in self.compiled.tables}
+
+    def rerun(self, previous, inputs: dict, changed_fields, targets=None, forward=None, halt_on_miss=(), parallel: bool = True):
+        """run() that reuses the results of `previous` for nodes none of whose input fields changed.
+
+        changed_fields are the input fields that differ from the inputs of `previous` (added,
+        removed or new value). A recomputed node whose result differs marks the fields it
+        forwards as changed too, so its downstream nodes are recomputed; an unchanged result
+        stops the propagation. Same forward/halt_on_miss arguments as the previous run.
+        """
+        run = GraphRun(inputs)
+        dirty = set(changed_fields)
+        blocked = set()
+        for wave in self.plan(targets):
+            ready = []
+            for node_id in wave:
+                if node_id in blocked:
+                    run.skipped.append(node_id)
+                    if node_id in previous.results:
+                        dirty |= self._forwarded_fields(node_id, forward)
+                else:
+                    ready.append(node_id)
+            if not ready:
+                continue
+
+            stale = [
+                node_id for node_id in ready
+                if node_id not in previous.results or not self._reads[node_id].isdisjoint(dirty)
+            ]
+            # Same context rules as run(): siblings of a parallel wave all see one snapshot.
+            snapshot = dict(run.context) if parallel and len(ready) > 1 else None
+            computed = {}
+            if snapshot is not None and len(stale) > 1:
+                pool = _get_pool(self.max_workers)
+                futures = [(node_id, pool.submit(self._evaluate, node_id, snapshot)) for node_id in stale]
+                computed = {node_id: future.result() for node_id, future in futures}
+            elif snapshot is not None:
+                computed = {node_id: self._evaluate(node_id, snapshot) for node_id in stale}
+
+            for node_id in ready:
+                if node_id not in stale:
+                    run.reused.append(node_id)
+                    node_inputs = snapshot if snapshot is not None else dict(run.context)
+                    self._record(run, node_id, node_inputs, previous.results[node_id], forward, halt_on_miss, blocked)
+                    continue
+                if snapshot is not None:
+                    node_inputs, result = snapshot, computed[node_id]
+                else:
+                    node_inputs = dict(run.context)
+                    result = self._evaluate(node_id, run.context)
+                if node_id not in previous.results or result != previous.results[node_id]:
+                    dirty |= self._forwarded_fields(node_id, forward)
+                self._record(run, node_id, node_inputs, result, forward, halt_on_miss, blocked)
+        return run
+
+    def _forwarded_fields(self, node_id, forward):
+        outputs = self.compiled.tables[node_id].outputs_map
+        if forward is None:
+            return set(outputs)
+        return {field for field in forward if field in outputs}
+
+    def _evaluate(self, node_id, context):
+        return self.compiled.tables[node_id].evaluate(context)
+
+    def _record(self, run, node_id, node_inputs, result, forward, halt_on_miss, blocked):
+        run.results[node_id] = result
+        run.node_inputs[node_id] = node_inputs
+        self._forward(run, node_id, result, forward)
+        if not result and node_id in halt_on_miss:
+            if run.halted_at is None:
+                run.halted_at = node_id
+            blocked |= self._descendants.get(node_id, set())
+
+    def _forward(self, run, node_id, result, forward):
+        if not isinstance(result, dict):
+            return
+        outputs = self.compiled.tables[node_id].outputs_map
+        if forward is None:
+            for field in outputs:
+                run.context[field] = result.get(field)
+            return
+        for field, extract in forward.items():
+            if field in outputs:
+                run.context[field] = extract(result)
@@ -0,0 +1,240 @@
+import argparse
+import itertools
+import json
+import math
+import random
+import sys
+
+# ==============================================================
+# input_generator.py – syntetiske inputs udledt af beslutningsmodellerne
+#
+# Domænet for hvert inputfelt læses direkte fra regelcellerne i
+# Brandklasse_Bestemmelse.json og Krav.json (via ModelSlices.field_options):
+# valgmuligheder for tekstfelter, true/false for booleske felter og
+# tærskelværdier ("<=600", ">150.49" ...) for talfelter. Talfelter prøves på
+# hver tærskel og lige over/under (±ε), så alle grænser i tabellerne rammes.
+# Input kan streames tilfældigt med fast seed eller udtømmende (produktet af
+# de valgte felters domæner) – til load-test, benchmarks og til at sammenligne
+# en hurtigere motor med fortolkeren.
+# ==============================================================
+
+BOOLEAN = "boolean"
+NUMERIC = "numeric"
+CATEGORICAL = "categorical"
+
+_BOOL_TOKENS = {"true": True, "false": False}
+
+
+class FieldDomain:
+    """The values worth probing for one input field.
+
+    values:     probe values, in a stable order (booleans, numbers around each threshold,
+                then text options in model order)
+    thresholds: sorted distinct numeric thresholds the rule cells compare against
+    nodes:      names of the decision tables that read the field
+    """
+
+    __slots__ = ("field", "kind", "values", "thresholds", "nodes")
+
+    def __init__(self, field: str, kind: str, values: list, thresholds: list, nodes: list):
+        self.field = field
+        self.kind = kind
+        self.values = values
+        self.thresholds = thresholds
+        self.nodes = nodes
+
+    def to_dict(self) -> dict:
+        return {"kind": self.kind, "values": self.values, "thresholds": self.thresholds, "nodes": self.nodes}
+
+    def __repr__(self):
+        return f"FieldDomain({self.field!r}, {self.kind!r}, {len(self.values)} values)"
+
+
+def _number(value: float):
+    """Whole numbers as int, so generated inputs look like what the UI sends."""
+    return int(value) if float(value).is_integer() else round(value, 6)
+
+
+def boundary_values(thresholds, epsilon=None, minimum=0.0) -> list:
+    """Each threshold plus the nearest values just below and above it.
+
+    epsilon defaults to 1 when every threshold is a whole number and 0.01 otherwise. If two
+    thresholds are closer than epsilon it becomes half their gap, so a probe never jumps past
+    the neighbouring threshold. Values below `minimum` (counts, areas and heights are never
+    negative) are dropped; pass minimum=None to keep them.
+    """
+    points = sorted(set(thresholds))
+    if not points:
+        return []
+    if epsilon is None:
+        epsilon = 1.0 if all(float(p).is_integer() for p in points) else 0.01
+    gap = min((b - a for a, b in zip(points, points[1:])), default=epsilon)
+    if gap < epsilon:
+        epsilon = gap / 2.0
+    values = []
+    for p in points:
+        for v in (p - epsilon, p, p + epsilon):
+            v = _number(v)
+            if (minimum is None or v >= minimum) and v not in values:
+                values.append(v)
+    return values
+
+
+def model_domains(*compiled_models, include_derived: bool = False, epsilon=None) -> dict:
+    """{field: FieldDomain} for every input column of the given CompiledModels.
+
+    Fields read by several models are merged. Fields that a decision table of the same
+    model produces itself (e.g. anvendelseskategori, risikoklasse) are derived by the flow
+    and left out unless include_derived is set.
+    """
+    merged = {}
+    for compiled in compiled_models:
+        derived = set()
+        if not include_derived:
+            for table in compiled.tables.values():
+                derived.update(table.outputs_map)
+        for field, entry in compiled.slices.field_options().items():
+            if field in derived:
+                continue
+            acc = merged.setdefault(field, {"options": [], "thresholds": set(), "nodes": []})
+            acc["options"].extend(o for o in entry["options"] if o not in acc["options"])
+            acc["thresholds"].update(t["value"] for t in entry["thresholds"])
+            acc["nodes"].extend(n for n in entry["nodes"] if n not in acc["nodes"])
+
+    domains = {}
+    for field, acc in merged.items():
+        # Cells such as '"true", ' leave punctuation-only tokens behind; they are not options.
+        options = [o for o in acc["options"] if any(ch.isalnum() for ch in o)]
+        thresholds = sorted(acc["thresholds"])
+        if options and not thresholds and all(o.lower() in _BOOL_TOKENS for o in options):
+            kind, values = BOOLEAN, [True, False]
+        else:
+            values = boundary_values(thresholds, epsilon) + options
+            kind = NUMERIC if thresholds and not options else CATEGORICAL
+        domains[field] = FieldDomain(field, kind, values, [_number(t) for t in thresholds], acc["nodes"])
+    return domains
+
+
+class InputGenerator:
+    """Streams input dicts over a set of field domains.
+
+    covering():   few rows that together use every value of every field at least once
+    random():     seeded random rows (after the covering rows by default), endless if count is None
+    around():     seeded variations of given inputs, a few fields at a time set to domain values
+    exhaustive(): every combination of the chosen fields' values, in a fixed order
+    """
+
+    def __init__(self, domains: dict):
+        self.domains = domains
+        self.fields = sorted(domains)
+
+    @classmethod
+    def from_models(cls, *compiled_models, **kwargs):
+        return cls(model_domains(*compiled_models, **kwargs))
+
+    def size(self, fields=None) -> int:
+        """Number of rows exhaustive(fields) yields."""
+        return math.prod(len(self.domains[f].values) for f in (fields or self.fields))
+
+    def covering(self, seed=None):
+        """max(len(values)) rows; row i takes value i (mod len) of each field.
+
+        With a seed, each field's values are shuffled first so the pairings vary between seeds.
+        """
+        rng = random.Random(seed) if seed is not None else None
+        columns = []
+        for field in self.fields:
+            values = list(self.domains[field].values)
+            if rng is not None:
+                rng.shuffle(values)
+            columns.append((field, values, len(values)))
+        rows = max((n for _f, _v, n in columns), default=0)
+        for i in range(rows):
+            yield {field: values[i % n] for field, values, n in columns if n}
+
+    def random(self, count=None, seed=0, cover: bool = True):
+        """Seeded random rows; `count` includes the covering rows. Same seed, same stream."""
+        produced = 0
+        if cover:
+            for row in self.covering(seed):
+                if count is not None and produced >= count:
+                    return
+                yield row
+                produced += 1
+        rng = random.Random(seed)
+        rnd = rng.random
+        columns = [(f, self.domains[f].values, len(self.domains[f].values)) for f in self.fields]
+        columns = [c for c in columns if c[2]]
+        while count is None or produced < count:
+            yield {field: values[int(rnd() * n)] for field, values, n in columns}
+            produced += 1
+
+    def around(self, bases, count=None, seed=0, max_fields: int = 6):
+        """Seeded rows that each take one of `bases` and set 1..max_fields fields to domain values.
+
+        Uniform rows rarely get through the whole flow (most combinations stop at a table
+        without a matching rule); varying realistic inputs keeps the flow reachable while
+        still probing the boundaries next to them.
+        """
+        bases = list(bases)
+        if not bases:
+            return
+        rng = random.Random(seed)
+        fields = [f for f in self.fields if self.domains[f].values]
+        produced = 0
+        while count is None or produced < count:
+            row = dict(rng.choice(bases))
+            for field in rng.sample(fields, k=min(len(fields), rng.randint(1, max_fields))):
+                row[field] = rng.choice(self.domains[field].values)
+            yield row
+            produced += 1
+
+    def exhaustive(self, fields=None, base=None):
+        """Every combination of the values of `fields` (default: all fields), on top of `base`.
+
+        The product grows quickly – check size(fields) before iterating over many fields.
+        """
+        fields = list(fields or self.fields)
+        unknown = [f for f in fields if f not in self.domains]
+        if unknown:
+            raise KeyError(f"Ukendte felter: {', '.join(unknown)}")
+        base = dict(base or {})
+        for combo in itertools.product(*(self.domains[f].values for f in fields)):
+            row = dict(base)
+            row.update(zip(fields, combo))
+            yield row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream synthetic BR18 inputs derived from the decision models as JSON lines.")
+    parser.add_argument("--count", type=int, default=1000, help="rows to emit in random mode (0 = endless)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-cover", action="store_true", help="skip the covering rows in random mode")
+    parser.add_argument("--exhaustive", action="store_true", help="emit every combination of --fields")
+    parser.add_argument("--fields", help="comma-separated fields for --exhaustive (default: all)")
+    parser.add_argument("--domains", action="store_true", help="print the field domains and exit")
+    args = parser.parse_args(argv)
+
+    import logic
+
+    generator = InputGenerator.from_models(
+        logic.get_model_snapshot("brandklasse").compiled, logic.get_model_snapshot("krav").compiled
+    )
+    out = sys.stdout
+    if args.domains:
+        json.dump({f: d.to_dict() for f, d in generator.domains.items()}, out, ensure_ascii=False, indent=2)
+        out.write("\n")
+        return 0
+    if args.exhaustive:
+        fields = [f.strip() for f in args.fields.split(",")] if args.fields else None
+        rows = generator.exhaustive(fields)
+    else:
+        rows = generator.random(args.count or None, args.seed, cover=not args.no_cover)
+    for row in rows:
+        out.write(json.dumps(row, ensure_ascii=False))
+        out.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
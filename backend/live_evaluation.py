@@ -0,0 +1,96 @@
+import asyncio
+
+from sessions import apply_patch
+
+# ==============================================================
+# live_evaluation.py – løbende evaluering over én WebSocket-forbindelse
+#
+# Klienten sender input-opdateringer (hele input eller en merge patch) i takt
+# med at brugeren taster. Opdateringerne samles: kommer der nye, mens en
+# evaluering kører, evalueres kun den seneste tilstand bagefter. Hver evaluering
+# sker i to trin – først de fire resultater (uden diagnostik), derefter det
+# komplette flow med diagnostik – og et trin, som er overhalet af nyere input,
+# springes over i stedet for at blive sendt.
+# ==============================================================
+
+
+class LiveChannel:
+    """Coalescing evaluation loop for one connection.
+
+    quick(inputs) returns the result pushed first (type "result"); complete(inputs, previous,
+    changed_fields) returns a state with .result, pushed as type "complete". Both run in a
+    worker thread. send(message) is an async callable (e.g. WebSocket.send_json).
+    """
+
+    def __init__(self, send, quick, complete):
+        self._send = send
+        self._quick = quick
+        self._complete = complete
+        self.inputs = {}
+        self.seq = 0  # seq of the latest accepted update
+        self.evaluated = 0
+        self.superseded = 0
+        self._changed = set()  # fields changed since the last complete evaluation
+        self._state = None
+        self._wake = asyncio.Event()
+
+    def submit(self, message) -> str | None:
+        """Accept {"inputs": {...}} (replace) or {"patch": {...}} (merge patch), optionally with "seq".
+
+        Returns an error text for malformed messages, else None.
+        """
+        if not isinstance(message, dict):
+            return "Message must be a JSON object"
+        if "inputs" in message:
+            inputs = message["inputs"]
+            if not isinstance(inputs, dict):
+                return "'inputs' must be a JSON object"
+            self._changed |= self.inputs.keys() | inputs.keys()
+            self.inputs = dict(inputs)
+        elif "patch" in message:
+            patch = message["patch"]
+            if not isinstance(patch, dict):
+                return "'patch' must be a JSON object"
+            self.inputs, changed = apply_patch(self.inputs, patch)
+            self._changed.update(changed)
+        else:
+            return "Expected 'inputs' or 'patch'"
+        seq = message.get("seq")
+        self.seq = seq if isinstance(seq, int) and seq > self.seq else self.seq + 1
+        self._wake.set()
+        return None
+
+    def _is_current(self, seq) -> bool:
+        if seq == self.seq:
+            return True
+        self.superseded += 1
+        return False
+
+    async def run(self):
+        """Evaluate the latest inputs whenever new updates arrive, until cancelled."""
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            seq = self.seq
+            inputs = dict(self.inputs)
+            changed, self._changed = self._changed, set()
+            try:
+                result = await asyncio.to_thread(self._quick, inputs)
+                if not self._is_current(seq):
+                    # Newer input arrived: skip the diagnostics step and start over with the latest state.
+                    self._changed |= changed
+                    continue
+                await self._send({"type": "result", "seq": seq, "result": result})
+
+                # A superseded complete state is still kept: the next run builds on it.
+                previous = self._state
+                state = await asyncio.to_thread(self._complete, inputs, previous, changed if previous else None)
+                self._state = state
+                self.evaluated += 1
+                if self._is_current(seq):
+                    await self._send({"type": "complete", "seq": seq, "result": state.result})
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._state = None
+                await self._send({"type": "error", "seq": seq, "error": f"{type(e).__name__}: {e}"})
@@ -1,6 +1,24 @@
+import itertools
 import json
 import os
 
+from compiled_model import ROLE_PARTITIONS, compile_model, find_node_by_keywords as _find_node_by_keywords
+from flow_cache import FlowCache
+from input_generator import model_domains
+from model_registry import ModelRegistry
+from sweep import SweepError, field_breakpoints, parse_ranges, pieces, sweep_regions
+from what_if import WhatIfOptimizer
+from decision_tables import (
+    check_numeric_condition,
+    check_string_condition,
+    compile_decision_table,
+    project_result,
+    is_missing_value,
+    MISSING,
+    SATISFIED,
+    normalize_bilag_token_for_compare as _normalize_bilag_token_for_compare,
+)
+
 # ==============================================================
 # logic.py – simpel GoRules evaluator baseret på Brandklasse_Bestemmelse.json
 # ==============================================================
@@ -45,47 +63,245 @@ def load_krav(path="Krav.json"):
     with open(path, encoding="utf-8") as f:
         return json.load(f)
 
-# Cache decision models, but allow them to refresh when the underlying JSON files change.
-_BRAND_MODEL_CACHE = None
-_BRAND_MODEL_PATH = None
-_BRAND_MODEL_MTIME = None
+def _resolve_krav_path(path: str) -> str:
+    """Same path resolution as load_krav."""
+    if not os.path.isabs(path):
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        candidate = os.path.join(root_dir, path)
+        if os.path.exists(candidate):
+            return candidate
+    return path
+
+
+# Decision models are held by a registry of immutable snapshots. A background watcher
+# (start_model_watcher) polls the JSON files and swaps in recompiled versions, so a
+# request only looks up the current snapshot and never touches the filesystem.
+_BRAND_MODEL = "brandklasse"
+_KRAV_MODEL = "krav"
+_MODELS = ModelRegistry(
+    poll_interval=float(os.environ.get("BR18_MODEL_POLL_INTERVAL", "1.0")),
+    compile=compile_model,
+)
+_MODELS.register(_BRAND_MODEL, _resolve_project_path("Brandklasse_Bestemmelse.json"))
+_MODELS.register(_KRAV_MODEL, _resolve_krav_path("Krav.json"))
+
+# Compiled decision tables of all loaded snapshots, keyed by id() of the raw node dict
+# they were compiled from. Rebuilt (and replaced as a whole) whenever a model is swapped.
+_COMPILED_TABLES = {}
+
+
+def _on_model_swap(name, old, new):
+    global _COMPILED_TABLES
+    tables = {}
+    for snapshot in _MODELS.snapshot().values():
+        for table in snapshot.compiled.tables.values():
+            tables[id(table.node)] = table
+    _COMPILED_TABLES = tables
+    if name == _BRAND_MODEL and old is not None:
+        # Cached flow results are keyed on the model version; drop the stale ones right away.
+        _FLOW_CACHE.clear()
+
+
+_MODELS.add_listener(_on_model_swap)
+
 
-KRAV_MODEL = None  # Lazy load when needed
+def get_compiled_table(node):
+    """Return the compiled form of a decision table node (compiling it on first use)."""
+    table = _COMPILED_TABLES.get(id(node))
+    if table is None or table.node is not node:
+        # Node of a snapshot that was swapped out while a request still holds it (or a
+        # node that isn't part of a registered model).
+        table = compile_decision_table(node)
+    return table
+
+
+def start_model_watcher(poll_interval: float | None = None):
+    """Start the background thread that reloads changed model files."""
+    if poll_interval is not None:
+        _MODELS.poll_interval = poll_interval
+    _MODELS.start()
+
+
+def stop_model_watcher():
+    _MODELS.stop()
+
+
+def reload_models(force: bool = False):
+    """Check the model files now (without the watcher). Returns the names that were reloaded."""
+    return _MODELS.check(force=force)
+
+
+def get_brandtree_snapshot(path="Brandklasse_Bestemmelse.json"):
+    """Return the current Brandklasse ModelSnapshot (model, version, compiled tables)."""
+    if path == "Brandklasse_Bestemmelse.json":
+        return _MODELS.get(_BRAND_MODEL)
+    if not _MODELS.is_registered(path):
+        _MODELS.register(path, _resolve_project_path(path))
+    return _MODELS.get(path)
+
+
+def get_compiled_model(path="Brandklasse_Bestemmelse.json"):
+    """Return the CompiledModel (resolved nodes, tables, indexes) of the current Brandklasse model."""
+    return get_brandtree_snapshot(path).compiled
 
 
 def get_brandtree(path="Brandklasse_Bestemmelse.json"):
     """Return the Brandklasse model.
 
     Note: Uvicorn's --reload typically only watches .py changes, so JSON edits won't
-    automatically reload the process. This function detects mtime changes and reloads
-    the JSON model on-demand.
+    automatically reload the process. The model watcher (start_model_watcher, started by
+    server.py) picks up edits in the background; without it, call reload_models().
     """
-    global _BRAND_MODEL_CACHE, _BRAND_MODEL_PATH, _BRAND_MODEL_MTIME
-    resolved = _resolve_project_path(path)
+    return get_brandtree_snapshot(path).model
+
+
+def get_model_snapshot(name: str):
+    """Current ModelSnapshot of "brandklasse" or "krav" (raw bytes, compressed variants, version)."""
+    if name not in (_BRAND_MODEL, _KRAV_MODEL):
+        raise KeyError(f"Ukendt model: {name}")
+    return _MODELS.get(name)
+
+
+def get_model_versions():
+    """{name: {version, size, loaded_at}} of both decision models, loading them if needed.
+
+    Lets a client compare against what it already holds and skip downloading the JSON.
+    """
+    versions = {}
+    errors = _MODELS.errors()
+    for name in (_BRAND_MODEL, _KRAV_MODEL):
+        info = get_model_snapshot(name).info()
+        info.pop("path", None)
+        if name in errors:
+            info["reload_error"] = errors[name]
+        versions[name] = info
+    return versions
+
+
+def _model_slices(model: str):
+    """(snapshot, ModelSlices) of a model, or (None, error response)."""
     try:
-        mtime = os.path.getmtime(resolved)
-    except OSError:
-        mtime = None
-
-    if (
-        _BRAND_MODEL_CACHE is None
-        or _BRAND_MODEL_PATH != resolved
-        or (_BRAND_MODEL_MTIME is not None and mtime is not None and mtime != _BRAND_MODEL_MTIME)
-    ):
-        _BRAND_MODEL_CACHE = load_brandtree(resolved)
-        _BRAND_MODEL_PATH = resolved
-        _BRAND_MODEL_MTIME = mtime
-
-    return _BRAND_MODEL_CACHE
-
-def _find_node_by_keywords(nodes, keywords):
-    """Find a decision node whose name matches any of the keywords (case-insensitive substring)."""
-    for name, node in nodes.items():
-        n = (name or "").lower()
-        for kw in keywords:
-            if kw in n:
-                return node
-    return None
+        snapshot = get_model_snapshot(model)
+    except KeyError as e:
+        return None, {"success": False, "error": str(e.args[0])}
+    except Exception as e:
+        return None, {"success": False, "error": f"Kunne ikke indlæse modellen '{model}': {str(e)}"}
+    return snapshot, snapshot.compiled.slices
+
+
+def get_model_options(model: str = _BRAND_MODEL, fields=None):
+    """Distinct option values and numeric thresholds per input field of a model.
+
+    fields limits the answer to those input fields (unknown fields are left out).
+    """
+    snapshot, slices = _model_slices(model)
+    if snapshot is None:
+        return slices
+    options = slices.field_options()
+    if fields is not None:
+        options = {field: options[field] for field in fields if field in options}
+    return {"success": True, "model": model, "version": snapshot.version, "fields": options}
+
+
+def get_model_rules(model: str, node: str, bilag: str | None = None):
+    """Rules of one decision node (role, name or id), optionally only those relevant for a bilag."""
+    snapshot, slices = _model_slices(model)
+    if snapshot is None:
+        return slices
+    rules = slices.rules(node, bilag)
+    if rules is None:
+        return {"success": False, "error": f"Ukendt node: {node}"}
+    return {"success": True, "model": model, "version": snapshot.version, "rules": rules, "count": len(rules)}
+
+
+def get_model_rule(model: str, rule_id: str):
+    """A single rule of a model, looked up by its `_id` or matched-rule id."""
+    snapshot, slices = _model_slices(model)
+    if snapshot is None:
+        return slices
+    rule = slices.rule(rule_id)
+    if rule is None:
+        return {"success": False, "error": f"Regel '{rule_id}' findes ikke"}
+    return {"success": True, "model": model, "version": snapshot.version, "rule": rule}
+
+# Results of evaluate_complete_flow / evaluate_basic_flow keyed on canonical inputs + model version.
+# The wizard posts (nearly) the same payload to several endpoints, so this saves full re-evaluations.
+_FLOW_CACHE = FlowCache(maxsize=1024, ttl=300.0)
+
+
+def get_flow_cache_stats():
+    """Hit/miss counters and size of the flow result cache."""
+    stats = _FLOW_CACHE.stats()
+    snapshot = _MODELS.snapshot().get(_BRAND_MODEL)
+    stats["model_version"] = snapshot.version if snapshot else None
+    return stats
+
+
+# Old frontend field -> field name used by the GoRules model
+_INPUT_ALIASES = {
+    "fritstaaende": "fritliggende_BA",
+    "tilbygning": "med_tilbygning",
+}
+
+
+def _prepare_flow_inputs(inputs: dict):
+    """Copy inputs and apply the aliasing/normalization both flows rely on."""
+    current_data = inputs.copy()
+
+    # Backwards compatible aliasing: frontend havde tidligere andre feltnavne end GoRules-modellen.
+    # Brandklasse-node forventer bl.a.: fritliggende_BA, med_tilbygning, med_erhvervssammenbygning,
+    # antal_fravigelser_fra_praeaccepterede (og evt. andre felter afhængigt af modellen).
+    for source, alias in _INPUT_ALIASES.items():
+        if alias not in current_data and source in current_data:
+            current_data[alias] = current_data.get(source)
+
+    # Normaliser strengfelter vi matcher på (trim og lower-case for robusthed)
+    if isinstance(current_data.get("bygningstype"), str):
+        current_data["bygningstype"] = current_data["bygningstype"].strip().lower()
+    return current_data
+
+
+def _flow_cache_key(flow: str, current_data: dict, version: str):
+    """Cache key for prepared flow inputs, or None if the inputs can't be keyed exactly.
+
+    Field order is kept (it shows up in the debug output) and every value is keyed together
+    with its type, since e.g. True, 1 and 1.0 match different rule cells.
+    """
+    items = []
+    for field, value in current_data.items():
+        if value is not None and not isinstance(value, (str, int, float, bool)):
+            return None
+        items.append((field, type(value), repr(value) if isinstance(value, float) else value))
+    return (flow, version, tuple(items))
+
+
+def _clone_result(obj):
+    """Copy a JSON-like result tree (much cheaper than copy.deepcopy)."""
+    if isinstance(obj, dict):
+        return {k: _clone_result(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_clone_result(v) for v in obj]
+    return obj
+
+
+def _cached_flow(flow: str, inputs: dict, version: str, evaluate, cacheable=None):
+    """Run evaluate(current_data) through the flow cache. Callers get their own copy.
+
+    cacheable(result), if given, decides whether a fresh result may be stored (e.g. not a
+    search that was cut off by its time budget).
+    """
+    current_data = _prepare_flow_inputs(inputs)
+    key = _flow_cache_key(flow, current_data, version)
+    if key is None:
+        return evaluate(current_data)
+    cached = _FLOW_CACHE.get(key)
+    if cached is not None:
+        return _clone_result(cached)
+    result = evaluate(current_data)
+    if cacheable is None or cacheable(result):
+        _FLOW_CACHE.put(key, _clone_result(result))
+    return result
+
 
 def _parse_first_int(value):
     """Robustly parse the first integer from a value.
@@ -216,34 +432,6 @@ def _parse_relevant_bilag_token(value):
         return None
 
 
-def _normalize_bilag_token_for_compare(token: str):
-    """Normalize bilag tokens for equality matching.
-
-    Returns canonical "1a" / "1b" when the input token is a known alias,
-    otherwise returns None.
-    """
-    try:
-        if token is None:
-            return None
-        s = str(token).strip().lower()
-        if s == "":
-            return None
-
-        # Unwrap a single surrounding quote-pair
-        if len(s) >= 2 and s.startswith('"') and s.endswith('"'):
-            s = s[1:-1].strip().lower()
-
-        # Only treat exact tokens as aliases (avoid rewriting longer descriptive strings)
-        s_compact = s.replace(" ", "")
-        if s_compact in ("1", "1a", "1.0"):
-            return "1a"
-        if s_compact in ("1.1", "11", "1b"):
-            return "1b"
-        return None
-    except Exception:
-        return None
-
-
 def _coerce_number_like(token: str):
     """Coerce a numeric token string to int/float when possible."""
     if token is None:
@@ -259,31 +447,373 @@ def _coerce_number_like(token: str):
     except Exception:
         return None
 
+def _forward_first_int(result):
+    value = result.get("value")
+    return _parse_first_int(value) if value is not None else None
+
+
+def _forward_bilag_token(result):
+    raw = result.get("relevant_bilag")
+    if raw is None:
+        raw = result.get("value")
+    return _parse_relevant_bilag_token(raw) if raw is not None else None
+
+
+# Outputs the flows pass on to downstream tables, parsed the same way as in the results.
+_FLOW_FORWARD = {
+    "anvendelseskategori": _forward_first_int,
+    "risikoklasse": _forward_first_int,
+    "relevant_bilag": _forward_bilag_token,
+}
+
+
+def _run_flow_graph(compiled, current_data: dict, targets=None):
+    """Evaluate the Brandklasse graph along its edges; AK/RK without a match stop the flow."""
+    halt = {node.get("id") for node in (compiled.node("ak"), compiled.node("rk")) if node}
+    return compiled.executor.run(current_data, targets=targets, forward=_FLOW_FORWARD, halt_on_miss=halt)
+
+
 def evaluate_complete_flow(inputs: dict):
     """
     Evaluerer komplet BR18 flow: Anvendelseskategori -> Risikoklasse -> Brandklasse
     inputs = dict med alle bygningsparametre
     Returnerer dict med alle resultater
     """
-    model = get_brandtree()
-    # Find alle decision nodes i rækkefølge
-    nodes = {node["name"]: node for node in model.get("nodes", []) if node.get("type") == "decisionTableNode"}
+    snapshot = get_brandtree_snapshot()
+    return _cached_flow("complete", inputs, snapshot.version, lambda data: _evaluate_complete_flow(data, snapshot.compiled))
+
+
+class FlowState:
+    """Result of evaluate_incremental plus what is needed to update it cheaply.
+
+    result is the evaluate_complete_flow response; run keeps the node results and
+    diagnostics the node diagnostics, both reused by the next evaluate_incremental.
+    Parts of result are shared with later states: treat it as read-only (copy before changing).
+    """
+
+    __slots__ = ("version", "inputs", "run", "diagnostics", "result")
+
+    def __init__(self, version, inputs, run, diagnostics, result):
+        self.version = version
+        self.inputs = inputs  # prepared inputs (before any forwarded outputs)
+        self.run = run
+        self.diagnostics = diagnostics
+        self.result = result
+
+
+def _changed_fields(old: dict, new: dict, fields=None):
+    """Fields (of `fields`, default all) added, removed or given another value (True/1/1.0 differ)."""
+    changed = set()
+    for field in (old.keys() | new.keys()) if fields is None else fields:
+        if field not in old or field not in new:
+            changed.add(field)
+            continue
+        a, b = old[field], new[field]
+        if type(a) is not type(b) or a != b:
+            changed.add(field)
+    return changed
+
+
+def evaluate_incremental(inputs: dict, previous: FlowState | None = None, changed_fields=None):
+    """evaluate_complete_flow that only recomputes what the changed fields can affect.
+
+    Tables none of whose input fields changed keep their previous result (and diagnostics);
+    the rest of the graph is recomputed along the edges only while results actually change.
+    changed_fields limits the comparison with previous.inputs to those fields (the caller
+    vouches that nothing else differs); by default all fields are compared. Without a
+    previous state, or after a model reload, everything is evaluated.
+
+    Returns a FlowState; its result equals evaluate_complete_flow(inputs).
+    """
+    snapshot = get_brandtree_snapshot()
+    compiled = snapshot.compiled
+    current_data = _prepare_flow_inputs(inputs)
+    prepared = dict(current_data)
+
+    if previous is None or previous.version != snapshot.version:
+        run = _run_flow_graph(compiled, current_data)
+        diagnostics = _NodeDiagnostics()
+    else:
+        fields = None
+        if changed_fields is not None:
+            fields = set(changed_fields)
+            fields |= {_INPUT_ALIASES[field] for field in changed_fields if field in _INPUT_ALIASES}
+        changed = _changed_fields(previous.inputs, prepared, fields)
+        halt = {node.get("id") for node in (compiled.node("ak"), compiled.node("rk")) if node}
+        run = compiled.executor.rerun(previous.run, current_data, changed, forward=_FLOW_FORWARD, halt_on_miss=halt)
+        diagnostics = _NodeDiagnostics(previous.diagnostics)
+
+    result = _complete_flow_results(compiled, run, diagnostics)
+    return FlowState(snapshot.version, prepared, run, diagnostics, result)
+
+# Output fields evaluate() can be asked for (in flow order)
+EVALUATION_TARGETS = ("anvendelseskategori", "risikoklasse", "relevant_bilag", "brandklasse")
+
+
+def evaluate(inputs: dict, targets=None, diagnostics: bool = False):
+    """Goal-directed evaluation: only the tables the requested outputs depend on are evaluated.
+
+    Args:
+        inputs: Bygningsparametre (samme format som evaluate_complete_flow)
+        targets: Output fields (see EVALUATION_TARGETS), node names or node ids. Default: all.
+        diagnostics: Add missing_inputs/candidates for targets without a match.
+
+    Returns:
+        { success, errors, <target>: {value, description, matched_rule_id} | None, ... }
+    """
+    targets = tuple(targets) if targets else EVALUATION_TARGETS
+    snapshot = get_brandtree_snapshot()
+    flow = f"evaluate:{int(bool(diagnostics))}:" + "\x1f".join(str(t) for t in targets)
+    return _cached_flow(flow, inputs, snapshot.version, lambda data: _evaluate_targets(data, snapshot.compiled, targets, diagnostics))
+
+
+def _evaluate_targets(current_data: dict, compiled, targets, diagnostics: bool):
+    executor = compiled.executor
+    run = _run_flow_graph(compiled, current_data, targets=targets)
+    results = {"success": True, "errors": []}
+    diagnosed = set()
+
+    def add_diagnostics(table, output_field, key):
+        diagnosed.add(table.node_id)
+        node_inputs = run.node_inputs[table.node_id]
+        scan = _safe_scan(table.node, node_inputs)
+        results["missing_inputs"] = (results.get("missing_inputs") or []) + diagnose_missing_inputs_for_node(table.node, node_inputs, scan=scan)
+        results.setdefault("candidates", {})[key] = diagnose_possible_outputs_for_node(table.node, node_inputs, output_field=output_field, scan=scan)
+
+    for target in targets:
+        results[target] = None
+        node_ids = [node_id for wave in executor.plan((target,)) for node_id in wave]
+        if not node_ids:
+            results["success"] = False
+            results["errors"].append(f"Unknown target: {target}")
+            continue
+        # The target is produced by the last table of its plan; earlier ones are its ancestors.
+        table = compiled.tables[node_ids[-1]]
+        node_id = table.node_id
+        if node_id not in run.results:
+            # Not evaluated because an upstream table (reported separately) had no match.
+            results["success"] = False
+            continue
+        result = run.results[node_id]
+        if not result:
+            results["success"] = False
+            message = f"No matching rule for {table.name}"
+            if message not in results["errors"]:
+                results["errors"].append(message)
+            if diagnostics and node_id not in diagnosed:
+                add_diagnostics(table, target if target in table.outputs_map else None, target)
+            continue
+
+        field = target if target in table.outputs_map else None
+        forward = _FLOW_FORWARD.get(field)
+        if forward is not None:
+            value = forward(result)
+        elif field is not None:
+            value = result.get(field)
+        else:
+            value = result.get("value")
+        results[target] = {
+            "value": value,
+            "description": result.get("description", result.get("_description", "")),
+            "matched_rule_id": result.get("_matched_rule_id"),
+        }
+
+    # Halting tables outside the targets' own tables still explain a missing result.
+    if run.halted_at is not None:
+        table = compiled.tables[run.halted_at]
+        message = f"No matching rule for {table.name}"
+        if message not in results["errors"]:
+            results["errors"].insert(0, message)
+        if diagnostics and table.node_id not in diagnosed:
+            output_field = next(iter(table.outputs_map), None)
+            add_diagnostics(table, output_field, output_field or table.name)
+    return results
+
+
+def _forward_brandklasse(result):
+    value = result.get("brandklasse")
+    return _parse_first_int(value) if value is not None else None
+
+
+# AK/RK/bilag/BK values as the complete flow's results report them (what-if suggestions, sweeps)
+_FLOW_VALUES = {**_FLOW_FORWARD, "brandklasse": _forward_brandklasse}
+
 
+def _flow_values(compiled, run) -> dict:
+    """{output field: value} of the flow tables a graph run matched, in flow order."""
+    values = {}
+    for node_id in compiled.topological_order:
+        result = run.results.get(node_id)
+        if isinstance(result, dict):
+            for field in compiled.tables[node_id].outputs_map:
+                if field in _FLOW_VALUES:
+                    values[field] = _FLOW_VALUES[field](result)
+    return values
+
+
+def _what_if_optimizer(compiled) -> WhatIfOptimizer:
+    """The what-if optimizer of a model version (built on first use)."""
+    optimizer = compiled.what_if
+    if optimizer is None:
+        halt = {node.get("id") for node in (compiled.node("ak"), compiled.node("rk")) if node}
+        optimizer = compiled.what_if = WhatIfOptimizer(
+            compiled, _FLOW_FORWARD, halt, model_domains(compiled), outputs=_FLOW_VALUES
+        )
+    return optimizer
+
+
+def _what_if_goal(target: str, value, current):
+    """(description, accept(value)) for a what-if target: the given value, or lower than current."""
+    if target == "relevant_bilag":
+        if value is None:
+            raise ValueError("relevant_bilag har ingen rækkefølge; angiv en værdi")
+        wanted = _parse_relevant_bilag_token(value)
+        if wanted is None:
+            raise ValueError(f"Ugyldig værdi for {target}: {value!r}")
+        return wanted, lambda v: v is not None and v == wanted
+    if value is not None:
+        wanted = _parse_first_int(value)
+        if wanted is None:
+            raise ValueError(f"Ugyldig værdi for {target}: {value!r}")
+        return wanted, lambda v: _parse_first_int(v) == wanted
+    current_int = _parse_first_int(current) if current is not None else None
+
+    def lower(v):
+        parsed = _parse_first_int(v) if v is not None else None
+        return parsed is not None and (current_int is None or parsed < current_int)
+    return "lower", lower
+
+
+def what_if(
+    inputs: dict,
+    target: str = "brandklasse",
+    value=None,
+    max_changes: int = 3,
+    fixed_fields=None,
+    limit: int = 5,
+    time_budget_ms: float = 250.0,
+):
+    """Smallest sets of input changes across AK → RK → bilag → BK that give `target` another value.
+
+    Args:
+        inputs: Bygningsparametre (samme format som evaluate_complete_flow)
+        target: One of EVALUATION_TARGETS
+        value: Wanted value of the target; None means any value lower than the current one
+        max_changes: Most input fields a suggestion may change
+        fixed_fields: Input fields that must keep their current value
+        limit: Number of suggestions returned (fewest changes, then smallest numeric change first)
+        time_budget_ms: Search time cap; when hit, "complete" is false and the best found so far is returned
+
+    Returns:
+        { success, target, goal, current, suggestions: [{changes, delta, outputs, rules}], complete, explored, elapsed_ms }
+    """
+    if target not in EVALUATION_TARGETS:
+        return {"success": False, "error": f"Ukendt mål: {target} (mulige: {', '.join(EVALUATION_TARGETS)})"}
+    fixed = tuple(sorted(str(f) for f in (fixed_fields or ())))
+    max_changes = max(0, min(int(max_changes), 8))
+    limit = max(1, min(int(limit), 50))
+    time_budget_ms = max(1.0, min(float(time_budget_ms), 5000.0))
+    snapshot = get_brandtree_snapshot()
+    flow = f"what-if:{target}:{value!r}:{max_changes}:{','.join(fixed)}:{limit}:{time_budget_ms}"
+    return _cached_flow(
+        flow, inputs, snapshot.version,
+        lambda data: _what_if(data, snapshot.compiled, target, value, max_changes, fixed, limit, time_budget_ms),
+        # A search stopped by the time budget is only the best so far: run it again next time
+        cacheable=lambda result: result.get("complete", True),
+    )
+
+
+def _what_if(current_data: dict, compiled, target, value, max_changes, fixed, limit, time_budget_ms):
+    optimizer = _what_if_optimizer(compiled)
+    current = optimizer.reported(optimizer.run(dict(current_data), target))
+    try:
+        goal, accept = _what_if_goal(target, value, current.get(target))
+    except ValueError as e:
+        return {"success": False, "error": str(e)}
+    suggestions, stats = optimizer.optimize(
+        current_data, target, accept,
+        max_changes=max_changes, fixed_fields=fixed, limit=limit, time_budget=time_budget_ms / 1000.0,
+    )
+    return {"success": True, "target": target, "goal": goal, "current": current, "suggestions": suggestions, **stats}
+
+
+def sweep(inputs: dict, ranges):
+    """Flow results while one or two numeric input fields vary over a range.
+
+    Args:
+        inputs: Bygningsparametre (samme format som evaluate_complete_flow); the base values
+        ranges: [{"field": "area_BA", "from": 50, "to": 2000}, ...] (one or two)
+
+    Returns:
+        { success, fields, breakpoints, evaluations, regions: [{<field>: {from, to, from_inclusive,
+          to_inclusive}, ..., outputs: {anvendelseskategori, risikoklasse, relevant_bilag, brandklasse}}] }
+    The regions come from the rule thresholds (see sweep.py), not from sampling a grid.
+    """
+    snapshot = get_brandtree_snapshot()
+    compiled = snapshot.compiled
+    derived = {field for table in compiled.tables.values() for field in table.outputs_map}
+    numeric = {
+        field for field, entry in compiled.slices.field_options().items()
+        if entry["thresholds"] and field not in derived
+    }
+    try:
+        parsed = parse_ranges(ranges, numeric)
+    except SweepError as e:
+        return {"success": False, "error": str(e)}
+    key = ";".join(f"{field}={low!r}..{high!r}" for field, low, high in parsed)
+    return _cached_flow(f"sweep:{key}", inputs, snapshot.version, lambda data: _sweep(data, compiled, parsed))
+
+
+def _sweep(current_data: dict, compiled, parsed):
+    fields = [field for field, _low, _high in parsed]
+    breakpoints = {field: field_breakpoints(compiled, field) for field in fields}
+    piece_lists = [pieces(low, high, breakpoints[field]) for field, low, high in parsed]
+    halt = {node.get("id") for node in (compiled.node("ak"), compiled.node("rk")) if node}
+    executor = compiled.executor
+    previous = {}
+
+    def evaluate(values):
+        # Neighbouring pieces differ in the swept fields only: re-run just the tables reading them.
+        context = dict(current_data)
+        context.update(values)
+        if previous:
+            changed = _changed_fields(previous["values"], values)
+            run = executor.rerun(previous["run"], context, changed, forward=_FLOW_FORWARD, halt_on_miss=halt)
+        else:
+            run = executor.run(context, forward=_FLOW_FORWARD, halt_on_miss=halt)
+        previous["values"], previous["run"] = values, run
+        return _flow_values(compiled, run)
+
+    regions, evaluations = sweep_regions(fields, piece_lists, evaluate)
+    return {
+        "success": True,
+        "fields": fields,
+        "breakpoints": {field: [p for p in breakpoints[field] if low < p < high] for field, low, high in parsed},
+        "evaluations": evaluations,
+        "regions": regions,
+    }
+
+
+def _evaluate_complete_flow(inputs: dict, compiled):
+    """Run the complete flow against a CompiledModel and build the response from the node results."""
+    current_data = _prepare_flow_inputs(inputs)
+    # Evaluates every table once in edge order; current_data receives the forwarded outputs.
+    run = _run_flow_graph(compiled, current_data)
+    return _complete_flow_results(compiled, run, _NodeDiagnostics())
+
+
+def _complete_flow_results(compiled, run, diag):
+    """Build the complete-flow response from a graph run; diagnostics go through diag (_NodeDiagnostics)."""
+    current_data = run.context
+    flow_nodes = compiled.flow_nodes()
     # Resolve core nodes once so we can produce candidates + optimization hints even on early exit.
-    ak_node = nodes.get("Anvendelseskategori 2.0") or _find_node_by_keywords(nodes, ["anvendelseskategori"])
-    rk_node = nodes.get("Risikoklasse") or _find_node_by_keywords(nodes, ["risikoklasse", "risiko klasse", "risk class"])
-    bilag_node = nodes.get("Relevant bilag") or _find_node_by_keywords(nodes, ["relevant bilag", "bilag"])
-    bk_node = None
-    bk_node_name = None
-    for candidate in ("Brandklasse", "Præ-accepterede løsninger"):
-        if candidate in nodes:
-            bk_node = nodes.get(candidate)
-            bk_node_name = candidate
-            break
-    if bk_node is None:
-        bk_node = _find_node_by_keywords(nodes, ["brandklasse", "præ-accepterede", "prae-accepterede"])
-        bk_node_name = bk_node.get("name") if bk_node else None
-    
+    nodes = flow_nodes["nodes"]
+    ak_node = flow_nodes["ak"]
+    rk_node = flow_nodes["rk"]
+    bilag_node = flow_nodes["bilag"]
+    bk_node = flow_nodes["bk"]
+    bk_node_name = flow_nodes["bk_name"]
+
     results = {
         "success": True,
         "anvendelseskategori": None,
@@ -292,24 +822,10 @@ def evaluate_complete_flow(inputs: dict):
         "brandklasse": None,
         "errors": []
     }
-    
-    current_data = inputs.copy()
 
-    # Backwards compatible aliasing: frontend havde tidligere andre feltnavne end GoRules-modellen.
-    # Brandklasse-node forventer bl.a.: fritliggende_BA, med_tilbygning, med_erhvervssammenbygning,
-    # antal_fravigelser_fra_praeaccepterede (og evt. andre felter afhængigt af modellen).
-    if "fritliggende_BA" not in current_data and "fritstaaende" in current_data:
-        current_data["fritliggende_BA"] = current_data.get("fritstaaende")
-    if "med_tilbygning" not in current_data and "tilbygning" in current_data:
-        current_data["med_tilbygning"] = current_data.get("tilbygning")
-
-    # Normaliser strengfelter vi matcher på (trim og lower-case for robusthed)
-    if isinstance(current_data.get("bygningstype"), str):
-        current_data["bygningstype"] = current_data["bygningstype"].strip().lower()
-    
     # Step 1: Anvendelseskategori
     if ak_node:
-        result = evaluate_decision_node(ak_node, current_data)
+        result = run.result(ak_node)
         if result:
             anvendelseskategori = _parse_first_int(result["value"]) if result.get("value") is not None else None
             results["anvendelseskategori"] = {
@@ -317,33 +833,37 @@ def evaluate_complete_flow(inputs: dict):
                 "description": result["description"],
                 "matched_rule_id": result.get("_matched_rule_id")
             }
-            current_data["anvendelseskategori"] = anvendelseskategori
         else:
             # Debug info when AK has no match
             results["debug_ak"] = {
                 "inputs_present": list(current_data.keys())
             }
-            results["missing_inputs"] = diagnose_missing_inputs_for_node(ak_node, current_data)
+            # One scan per node, shared by the missing-input, candidate and suggestion diagnostics.
+            ak_scan = diag.scan(ak_node, current_data)
+            rk_scan = diag.scan(rk_node, current_data)
+            bk_scan = diag.scan(bk_node, current_data)
+            results["missing_inputs"] = diag.missing_inputs(ak_node, current_data, scan=ak_scan)
             # Even if AK can't be determined yet, we can still provide candidate outputs
             # for downstream nodes, typically with "mangler: anvendelseskategori" etc.
             results["candidates"] = {
-                "anvendelseskategori": diagnose_possible_outputs_for_node(ak_node, current_data, output_field="anvendelseskategori"),
-                "risikoklasse": diagnose_possible_outputs_for_node(rk_node, current_data, output_field="risikoklasse") if rk_node else [],
-                "relevant_bilag": diagnose_possible_outputs_for_node(bilag_node, current_data, output_field="relevant_bilag") if bilag_node else [],
-                "brandklasse": diagnose_possible_outputs_for_node(bk_node, current_data, output_field="brandklasse") if bk_node else [],
+                "anvendelseskategori": diag.possible_outputs(ak_node, current_data, output_field="anvendelseskategori", scan=ak_scan),
+                "risikoklasse": diag.possible_outputs(rk_node, current_data, output_field="risikoklasse", scan=rk_scan) if rk_node else [],
+                "relevant_bilag": diag.possible_outputs(bilag_node, current_data, output_field="relevant_bilag") if bilag_node else [],
+                "brandklasse": diag.possible_outputs(bk_node, current_data, output_field="brandklasse", scan=bk_scan) if bk_node else [],
             }
 
             results["suggestions"] = {
-                "risikoklasse": diagnose_optimization_suggestions_for_node(
+                "risikoklasse": diag.suggestions(
                     rk_node,
                     current_data,
                     output_field="risikoklasse",
                     current_value=None,
                     limit=3,
+                    scan=rk_scan,
                 )
                 if rk_node
                 else [],
-                "brandklasse": diagnose_optimization_suggestions_for_node(
+                "brandklasse": diag.suggestions(
                     bk_node,
                     current_data,
                     output_field="brandklasse",
@@ -351,6 +871,7 @@ def evaluate_complete_flow(inputs: dict):
                     limit=3,
                     # Avoid noisy suggestions that require huge numeric changes.
                     max_numeric_delta_abs=500.0,
+                    scan=bk_scan,
                 )
                 if bk_node
                 else [],
@@ -361,7 +882,7 @@ def evaluate_complete_flow(inputs: dict):
     
     # Step 2: Risikoklasse
     if rk_node:
-        result = evaluate_decision_node(rk_node, current_data)
+        result = run.result(rk_node)
         if result:
             risikoklasse = _parse_first_int(result["value"]) if result.get("value") is not None else None
             results["risikoklasse"] = {
@@ -369,25 +890,26 @@ def evaluate_complete_flow(inputs: dict):
                 "description": result["description"],
                 "matched_rule_id": result.get("_matched_rule_id")
             }
-            current_data["risikoklasse"] = risikoklasse
         else:
             results["debug_rk"] = {
                 "inputs_present": list(current_data.keys()),
                 "anvendelseskategori": current_data.get("anvendelseskategori")
             }
-            results["missing_inputs"] = diagnose_missing_inputs_for_node(rk_node, current_data)
+            rk_scan = diag.scan(rk_node, current_data)
+            results["missing_inputs"] = diag.missing_inputs(rk_node, current_data, scan=rk_scan)
             results["candidates"] = {
-                "risikoklasse": diagnose_possible_outputs_for_node(rk_node, current_data, output_field="risikoklasse"),
-                "relevant_bilag": diagnose_possible_outputs_for_node(bilag_node, current_data, output_field="relevant_bilag") if bilag_node else [],
+                "risikoklasse": diag.possible_outputs(rk_node, current_data, output_field="risikoklasse", scan=rk_scan),
+                "relevant_bilag": diag.possible_outputs(bilag_node, current_data, output_field="relevant_bilag") if bilag_node else [],
             }
 
             results["suggestions"] = {
-                "risikoklasse": diagnose_optimization_suggestions_for_node(
+                "risikoklasse": diag.suggestions(
                     rk_node,
                     current_data,
                     output_field="risikoklasse",
                     current_value=None,
                     limit=3,
+                    scan=rk_scan,
                 )
                 if rk_node
                 else []
@@ -398,7 +920,7 @@ def evaluate_complete_flow(inputs: dict):
     
     # Step 3: Relevant bilag
     if bilag_node:
-        result = evaluate_decision_node(bilag_node, current_data)
+        result = run.result(bilag_node)
         if result:
             # The model can output multiple fields (e.g. relevant_bilag + Bilagsinformation).
             # In that case, evaluate_decision_node won't set result["value"], so read the field explicitly.
@@ -415,8 +937,7 @@ def evaluate_complete_flow(inputs: dict):
             }
             # Backwards-compatible field preserved for older frontend code.
             results["relevant_bilag_matched_rule_id"] = result.get("_matched_rule_id")
-            # Keep as string: the GoRules models use "1a"/"1b".
-            current_data["relevant_bilag"] = relevant_token
+            # current_data["relevant_bilag"] holds the same token (string: the GoRules models use "1a"/"1b").
 
             # Optional: forward any bilag text info if present
             bilagsinfo = result.get("Bilagsinformation") if isinstance(result, dict) else None
@@ -445,12 +966,14 @@ def evaluate_complete_flow(inputs: dict):
             }
             # Provide guidance anyway, since brandklasse depends on relevant_bilag.
             results.setdefault("missing_inputs", [])
-            results["missing_inputs"] = (results.get("missing_inputs") or []) + diagnose_missing_inputs_for_node(bilag_node, current_data)
+            bilag_scan = diag.scan(bilag_node, current_data)
+            results["missing_inputs"] = (results.get("missing_inputs") or []) + diag.missing_inputs(bilag_node, current_data, scan=bilag_scan)
             results.setdefault("candidates", {})
-            results["candidates"]["relevant_bilag"] = diagnose_possible_outputs_for_node(
+            results["candidates"]["relevant_bilag"] = diag.possible_outputs(
                 bilag_node,
                 current_data,
                 output_field="relevant_bilag",
+                scan=bilag_scan,
             )
     
     # Step 4: Brandklasse
@@ -466,7 +989,7 @@ def evaluate_complete_flow(inputs: dict):
         }
         results["errors"].append("Brandklasse node not found")
     else:
-        result = evaluate_decision_node(bk_node, current_data)
+        result = run.result(bk_node)
         if result:
             # The output field is "brandklasse"
             brandklasse_value = result.get("brandklasse") if isinstance(result, dict) else None
@@ -517,19 +1040,21 @@ def evaluate_complete_flow(inputs: dict):
                 "relevant_bilag": bilag_num,
                 "bilag_node_searched": bk_node_name,
             }
-            results["missing_inputs"] = diagnose_missing_inputs_for_node(bk_node, current_data)
+            bk_scan = diag.scan(bk_node, current_data)
+            results["missing_inputs"] = diag.missing_inputs(bk_node, current_data, scan=bk_scan)
             results["candidates"] = {
-                "brandklasse": diagnose_possible_outputs_for_node(bk_node, current_data, output_field="brandklasse")
+                "brandklasse": diag.possible_outputs(bk_node, current_data, output_field="brandklasse", scan=bk_scan)
             }
 
             results["suggestions"] = {
-                "brandklasse": diagnose_optimization_suggestions_for_node(
+                "brandklasse": diag.suggestions(
                     bk_node,
                     current_data,
                     output_field="brandklasse",
                     current_value=None,
                     limit=3,
                     max_numeric_delta_abs=500.0,
+                    scan=bk_scan,
                 )
             }
             results["success"] = False
@@ -546,7 +1071,7 @@ def evaluate_complete_flow(inputs: dict):
 
         results.setdefault("suggestions", {})
         if rk_node and "risikoklasse" not in results["suggestions"]:
-            results["suggestions"]["risikoklasse"] = diagnose_optimization_suggestions_for_node(
+            results["suggestions"]["risikoklasse"] = diag.suggestions(
                 rk_node,
                 current_data,
                 output_field="risikoklasse",
@@ -554,7 +1079,7 @@ def evaluate_complete_flow(inputs: dict):
                 limit=3,
             )
         if bk_node and "brandklasse" not in results["suggestions"]:
-            results["suggestions"]["brandklasse"] = diagnose_optimization_suggestions_for_node(
+            results["suggestions"]["brandklasse"] = diag.suggestions(
                 bk_node,
                 current_data,
                 output_field="brandklasse",
@@ -568,13 +1093,18 @@ def evaluate_complete_flow(inputs: dict):
     return results
 
 
-def evaluate_basic_flow(inputs: dict):
+def evaluate_basic_flow(inputs: dict, diagnostics: bool = True):
     """Evaluerer kun de "lette" trin: Anvendelseskategori -> Risikoklasse -> Relevant bilag.
 
     Bruges til trin 1 i UI, hvor brandklasse (bilag-specifik) håndteres på et senere trin.
+    Med diagnostics=False udelades missing_inputs/candidates/suggestions.
     """
-    model = get_brandtree()
-    nodes = {node["name"]: node for node in model.get("nodes", []) if node.get("type") == "decisionTableNode"}
+    snapshot = get_brandtree_snapshot()
+    flow = "basic" if diagnostics else "basic:nodiag"
+    return _cached_flow(flow, inputs, snapshot.version, lambda data: _evaluate_basic_flow(data, snapshot.compiled, diagnostics))
+
+
+def _evaluate_basic_flow(inputs: dict, compiled, diagnostics: bool = True):
 
     results = {
         "success": True,
@@ -584,49 +1114,48 @@ def evaluate_basic_flow(inputs: dict):
         "errors": [],
     }
 
-    current_data = inputs.copy()
-
-    # Backwards compatible aliasing
-    if "fritliggende_BA" not in current_data and "fritstaaende" in current_data:
-        current_data["fritliggende_BA"] = current_data.get("fritstaaende")
-    if "med_tilbygning" not in current_data and "tilbygning" in current_data:
-        current_data["med_tilbygning"] = current_data.get("tilbygning")
-
-    if isinstance(current_data.get("bygningstype"), str):
-        current_data["bygningstype"] = current_data["bygningstype"].strip().lower()
+    current_data = _prepare_flow_inputs(inputs)
 
     # Step 1: Anvendelseskategori
-    ak_node = nodes.get("Anvendelseskategori 2.0") or _find_node_by_keywords(nodes, ["anvendelseskategori"])
+    ak_node = compiled.node("ak")
     if not ak_node:
         results["success"] = False
         results["errors"].append("Anvendelseskategori node not found")
         return results
 
-    ak_res = evaluate_decision_node(ak_node, current_data)
+    # Only the tables up to relevant bilag (and what they depend on) are evaluated; BK is skipped.
+    targets = [node.get("id") for node in (ak_node, compiled.node("rk"), compiled.node("bilag")) if node]
+    run = _run_flow_graph(compiled, current_data, targets=targets)
+
+    ak_res = run.result(ak_node)
     if not ak_res:
         results["success"] = False
         results["errors"].append("No matching rule for Anvendelseskategori")
         results["debug_ak"] = {"inputs_present": list(current_data.keys())}
-        results["missing_inputs"] = diagnose_missing_inputs_for_node(ak_node, current_data)
-        rk_node_tmp = nodes.get("Risikoklasse") or _find_node_by_keywords(nodes, ["risikoklasse", "risiko klasse", "risk class"])
-        bilag_node_tmp = nodes.get("Relevant bilag") or _find_node_by_keywords(nodes, ["relevant bilag", "bilag"])
-        results["candidates"] = {
-            "anvendelseskategori": diagnose_possible_outputs_for_node(ak_node, current_data, output_field="anvendelseskategori"),
-            "risikoklasse": diagnose_possible_outputs_for_node(rk_node_tmp, current_data, output_field="risikoklasse") if rk_node_tmp else [],
-            "relevant_bilag": diagnose_possible_outputs_for_node(bilag_node_tmp, current_data, output_field="relevant_bilag") if bilag_node_tmp else [],
-        }
+        if diagnostics:
+            ak_scan = _safe_scan(ak_node, current_data)
+            results["missing_inputs"] = diagnose_missing_inputs_for_node(ak_node, current_data, scan=ak_scan)
+            rk_node_tmp = compiled.node("rk")
+            bilag_node_tmp = compiled.node("bilag")
+            rk_scan = _safe_scan(rk_node_tmp, current_data)
+            results["candidates"] = {
+                "anvendelseskategori": diagnose_possible_outputs_for_node(ak_node, current_data, output_field="anvendelseskategori", scan=ak_scan),
+                "risikoklasse": diagnose_possible_outputs_for_node(rk_node_tmp, current_data, output_field="risikoklasse", scan=rk_scan) if rk_node_tmp else [],
+                "relevant_bilag": diagnose_possible_outputs_for_node(bilag_node_tmp, current_data, output_field="relevant_bilag") if bilag_node_tmp else [],
+            }
 
-        results["suggestions"] = {
-            "risikoklasse": diagnose_optimization_suggestions_for_node(
-                rk_node_tmp,
-                current_data,
-                output_field="risikoklasse",
-                current_value=None,
-                limit=3,
-            )
-            if rk_node_tmp
-            else []
-        }
+            results["suggestions"] = {
+                "risikoklasse": diagnose_optimization_suggestions_for_node(
+                    rk_node_tmp,
+                    current_data,
+                    output_field="risikoklasse",
+                    current_value=None,
+                    limit=3,
+                    scan=rk_scan,
+                )
+                if rk_node_tmp
+                else []
+            }
         return results
 
     anv = _parse_first_int(ak_res["value"]) if ak_res.get("value") is not None else None
@@ -635,24 +1164,25 @@ def evaluate_basic_flow(inputs: dict):
         "description": ak_res["description"],
         "matched_rule_id": ak_res.get("_matched_rule_id")
     }
-    current_data["anvendelseskategori"] = anv
 
     # Step 2: Risikoklasse
-    rk_node = nodes.get("Risikoklasse") or _find_node_by_keywords(nodes, ["risikoklasse", "risiko klasse", "risk class"])
+    rk_node = compiled.node("rk")
     if not rk_node:
         results["success"] = False
         results["errors"].append("Risikoklasse node not found")
         return results
 
-    rk_res = evaluate_decision_node(rk_node, current_data)
+    rk_res = run.result(rk_node)
     if not rk_res:
         results["success"] = False
         results["errors"].append("No matching rule for Risikoklasse")
         results["debug_rk"] = {"inputs_present": list(current_data.keys()), "anvendelseskategori": current_data.get("anvendelseskategori")}
-        results["missing_inputs"] = diagnose_missing_inputs_for_node(rk_node, current_data)
-        results["candidates"] = {
-            "risikoklasse": diagnose_possible_outputs_for_node(rk_node, current_data, output_field="risikoklasse")
-        }
+        if diagnostics:
+            rk_scan = _safe_scan(rk_node, current_data)
+            results["missing_inputs"] = diagnose_missing_inputs_for_node(rk_node, current_data, scan=rk_scan)
+            results["candidates"] = {
+                "risikoklasse": diagnose_possible_outputs_for_node(rk_node, current_data, output_field="risikoklasse", scan=rk_scan)
+            }
         return results
 
     rk = _parse_first_int(rk_res["value"]) if rk_res.get("value") is not None else None
@@ -661,25 +1191,26 @@ def evaluate_basic_flow(inputs: dict):
         "description": rk_res["description"],
         "matched_rule_id": rk_res.get("_matched_rule_id")
     }
-    current_data["risikoklasse"] = rk
 
     # Always-on optimization suggestions for RK (show how to potentially reach lower RK).
-    try:
-        results.setdefault("suggestions", {})
-        results["suggestions"]["risikoklasse"] = diagnose_optimization_suggestions_for_node(
-            rk_node,
-            current_data,
-            output_field="risikoklasse",
-            current_value=rk,
-            limit=3,
-        )
-    except Exception:
-        pass
+    bilag_node = compiled.node("bilag")
+    if diagnostics:
+        try:
+            results.setdefault("suggestions", {})
+            results["suggestions"]["risikoklasse"] = diagnose_optimization_suggestions_for_node(
+                rk_node,
+                # Context as it was right after RK (before relevant bilag was forwarded)
+                run.inputs_for(bilag_node) if run.evaluated(bilag_node) else current_data,
+                output_field="risikoklasse",
+                current_value=rk,
+                limit=3,
+            )
+        except Exception:
+            pass
 
     # Step 3: Relevant bilag (optional)
-    bilag_node = nodes.get("Relevant bilag") or _find_node_by_keywords(nodes, ["relevant bilag", "bilag"])
     if bilag_node:
-        bilag_res = evaluate_decision_node(bilag_node, current_data)
+        bilag_res = run.result(bilag_node)
         if bilag_res:
             bilag_raw = bilag_res.get("relevant_bilag") if isinstance(bilag_res, dict) else None
             if bilag_raw is None:
@@ -706,210 +1237,85 @@ def evaluate_basic_flow(inputs: dict):
                 "anvendelseskategori": current_data.get("anvendelseskategori"),
                 "risikoklasse": current_data.get("risikoklasse"),
             }
-            results.setdefault("missing_inputs", [])
-            results["missing_inputs"] = (results.get("missing_inputs") or []) + diagnose_missing_inputs_for_node(bilag_node, current_data)
-            results.setdefault("candidates", {})
-            results["candidates"]["relevant_bilag"] = diagnose_possible_outputs_for_node(
-                bilag_node,
-                current_data,
-                output_field="relevant_bilag",
-            )
+            if diagnostics:
+                results.setdefault("missing_inputs", [])
+                bilag_scan = _safe_scan(bilag_node, current_data)
+                results["missing_inputs"] = (results.get("missing_inputs") or []) + diagnose_missing_inputs_for_node(bilag_node, current_data, scan=bilag_scan)
+                results.setdefault("candidates", {})
+                results["candidates"]["relevant_bilag"] = diagnose_possible_outputs_for_node(
+                    bilag_node,
+                    current_data,
+                    output_field="relevant_bilag",
+                    scan=bilag_scan,
+                )
 
     return results
 
-def evaluate_decision_node(node, input_data, hit_policy=None):
+def evaluate_decision_node(node, input_data, hit_policy=None, use_index=None):
     """Evaluerer en enkelt decision table node
     
     Args:
         node: Decision table node dict
         input_data: Input data dict
         hit_policy: Override hit policy ('first' or 'collect'). If None, uses node's hitPolicy
+        use_index: Force the bitset column index on/off. If None, large tables use it automatically
     
     Returns:
         For 'first' policy: Single result dict or None (includes _matched_rule_id)
         For 'collect' policy: List of all matching results
     """
-    rules = node["content"]["rules"]
-    inputs_map = {
-        i.get("field"): i.get("id")
-        for i in node["content"].get("inputs", [])
-        if isinstance(i, dict) and i.get("field") and i.get("id")
-    }
-    outputs = node["content"].get("outputs", [])
-    
-    if not outputs:
-        return None if hit_policy == 'first' else []
-    
-    # Support multiple outputs for collect policy
-    outputs_map = {
-        o.get("field"): o.get("id")
-        for o in outputs
-        if isinstance(o, dict) and o.get("field") and o.get("id")
-    }
-    
-    # Determine hit policy
-    if hit_policy is None:
-        hit_policy = node["content"].get("hitPolicy", "first")
-    
-    matching_results = []
-    
-    for rule_index, rule in enumerate(rules):
-        match = True
-        match = True
-
-        # VIGTIGT: Vi skal matche imod alle forventede (ikke-tomme) betingelser i reglen.
-        # Hvis reglen forventer et felt (expected != "") men feltet mangler i input, skal reglen IKKE matche.
-        for field, rule_id in inputs_map.items():
-            expected = rule.get(rule_id, "")
-            if expected == "":
-                # Ingen betingelse sat for dette input
-                continue
+    # Cellerne er kompileret én gang ved indlæsning af modellen (se decision_tables.py).
+    return get_compiled_table(node).evaluate(input_data, hit_policy, use_index=use_index)
 
-            if field not in input_data:
-                # Felt kræves af reglen men mangler i input -> intet match
-                match = False
-                break
 
-            value = input_data[field]
+def scan_node(node, input_data: dict):
+    """One pass over a node's rules, shared by matching and the diagnose_* helpers.
 
-            # Konverter værdi baseret på type
-            if isinstance(value, bool):
-                # Understøt også multi-options og citations i expected
-                if "," in expected or '"' in expected:
-                    if not check_string_condition(str(value).lower(), expected.lower()):
-                        match = False
-                        break
-                else:
-                    if str(value).lower() != expected.lower():
-                        match = False
-                        break
-            elif isinstance(value, (int, float)):
-                # Håndter numeriske sammenligninger og lister
-                if not check_numeric_condition(value, expected):
-                    match = False
-                    break
-            elif isinstance(value, str):
-                # Håndter string matching (inkl. quoted og lister)
-                if not check_string_condition(value, expected):
-                    match = False
-                    break
-            else:
-                # Ukendt type -> fallback til strengsammenligning
-                if not check_string_condition(str(value), expected):
-                    match = False
-                    break
-        
-        if match:
-            # Build result with all outputs
-            result = {
-                "_description": rule.get("_description", ""),
-                "_matched_rule_id": f"{node['id']}_rule_{rule_index}",
-                "_matched_rule_index": rule_index,
-                "_matched_rule_number": rule_index + 1,
-                "_matched_node_id": node.get("id"),
-                "_matched_node_name": node.get("name"),
-            }
-            
-            for field, output_id in outputs_map.items():
-                result_value = rule.get(output_id)
-                if isinstance(result_value, str):
-                    result_value = result_value.strip()
-                    # Many fields in the JSON model are stored as a quoted string literal (e.g. "\"1.3.1 og 1.3.2\"").
-                    # Unwrap a single pair of surrounding quotes to get clean text for the frontend.
-                    if len(result_value) >= 2 and result_value.startswith('"') and result_value.endswith('"'):
-                        result_value = result_value[1:-1]
-                result[field] = result_value
-            
-            # For backwards compatibility with single output
-            if len(outputs_map) == 1:
-                single_field = list(outputs_map.keys())[0]
-                result["value"] = result[single_field]
-                result["description"] = result["_description"]
-            
-            if hit_policy == "first":
-                return result
-            else:
-                matching_results.append(result)
-    
-    return None if hit_policy == "first" else matching_results
+    Returns a list of RuleStatus (see decision_tables.CompiledDecisionTable.scan).
+    """
+    return get_compiled_table(node).scan(input_data)
 
 
-def diagnose_missing_inputs_for_node(node, input_data: dict, top_k_rules: int = 5):
+def _safe_scan(node, input_data: dict):
+    """scan_node for the flows: None (let each diagnostic fall back) if the node is absent or fails."""
+    if not node:
+        return None
+    try:
+        return scan_node(node, input_data)
+    except Exception:
+        return None
+
+
+def diagnose_missing_inputs_for_node(node, input_data: dict, top_k_rules: int = 5, scan=None):
     """Generate user-facing hints about which inputs are missing.
 
     This is used when a decision node returns no match. We look for "near matches":
     rules where all provided inputs satisfy their conditions, but some required fields
     are missing. Those missing fields are excellent candidates to ask the user for.
 
+    Pass scan (from scan_node) to reuse a scan of the same node and inputs.
+
     Returns a list of dicts:
       { field, question, node_name, missing_in_rules, score }
     """
     try:
-        content = (node or {}).get("content", {})
-        rules = content.get("rules", []) or []
-        inputs = content.get("inputs", []) or []
-
-        field_to_question = {
-            i.get("field"): (i.get("name") or i.get("field"))
-            for i in inputs
-            if isinstance(i, dict) and i.get("field")
-        }
-
-        inputs_map = {
-            i.get("field"): i.get("id")
-            for i in inputs
-            if isinstance(i, dict) and i.get("field") and i.get("id")
-        }
-
-        def _is_missing_value(v):
-            return v is None or (isinstance(v, str) and v.strip() == "")
-
-        def _check_condition(value, expected: str) -> bool:
-            if isinstance(value, bool):
-                # Model stores bools as 'true'/'false'
-                if "," in expected or '"' in expected:
-                    return check_string_condition(str(value).lower(), expected.lower())
-                return str(value).lower() == expected.lower()
-            if isinstance(value, (int, float)):
-                return check_numeric_condition(value, expected)
-            if isinstance(value, str):
-                return check_string_condition(value, expected)
-            return check_string_condition(str(value), expected)
+        table = get_compiled_table(node)
+        if scan is None:
+            scan = table.scan(input_data)
 
         # 1) Near-match candidates: mismatches == 0 and missing_fields > 0
         candidates = []
-        for rule_index, rule in enumerate(rules):
-            satisfied = 0
-            mismatched = 0
-            missing_fields = []
-            required_count = 0
-
-            for field, rule_id in inputs_map.items():
-                expected = (rule.get(rule_id, "") or "").strip()
-                if expected == "":
-                    continue
-                required_count += 1
-
-                value = input_data.get(field)
-                if field not in input_data or _is_missing_value(value):
-                    missing_fields.append(field)
-                    continue
-
-                if _check_condition(value, expected):
-                    satisfied += 1
-                else:
-                    mismatched += 1
-
-            if required_count == 0:
+        for status in scan:
+            if status.required_count == 0:
                 continue
 
-            if mismatched == 0 and satisfied > 0 and missing_fields:
+            if status.mismatched == 0 and status.satisfied > 0 and status.missing_fields:
                 candidates.append(
                     {
-                        "rule_index": rule_index,
-                        "rule_number": rule_index + 1,
-                        "satisfied": satisfied,
-                        "missing_fields": missing_fields,
+                        "rule_index": status.crule.index,
+                        "rule_number": status.crule.index + 1,
+                        "satisfied": status.satisfied,
+                        "missing_fields": status.missing_fields,
                     }
                 )
 
@@ -927,27 +1333,19 @@ def diagnose_missing_inputs_for_node(node, input_data: dict, top_k_rules: int =
 
         # 2) Fallback: if no near-matches, suggest fields frequently used in the node.
         if not field_count:
-            overall_count = {}
-            for rule in rules:
-                for field, rule_id in inputs_map.items():
-                    expected = (rule.get(rule_id, "") or "").strip()
-                    if expected != "":
-                        overall_count[field] = overall_count.get(field, 0) + 1
-
-            for f, cnt in overall_count.items():
+            for f, cnt in table.field_usage.items():
                 v = input_data.get(f)
-                if f not in input_data or _is_missing_value(v):
+                if f not in input_data or is_missing_value(v):
                     field_count[f] = cnt
                     field_score[f] = cnt
 
-        node_name = (node or {}).get("name")
         hints = []
         for f in field_count.keys():
             hints.append(
                 {
                     "field": f,
-                    "question": field_to_question.get(f) or f,
-                    "node_name": node_name,
+                    "question": table.field_questions.get(f) or f,
+                    "node_name": table.name,
                     "missing_in_rules": field_count.get(f, 0),
                     "score": field_score.get(f, 0),
                 }
@@ -959,110 +1357,54 @@ def diagnose_missing_inputs_for_node(node, input_data: dict, top_k_rules: int =
         return []
 
 
-def diagnose_possible_outputs_for_node(node, input_data: dict, output_field: str | None = None, limit: int = 12):
+def diagnose_possible_outputs_for_node(node, input_data: dict, output_field: str | None = None, limit: int = 12, scan=None):
     """Suggest possible output values for a decision node given partial inputs.
 
     We keep any rule that has *no contradictions* with the provided inputs.
     Missing required inputs are treated as "unknown" and tracked so the UI can ask for them.
 
+    Pass scan (from scan_node) to reuse a scan of the same node and inputs.
+
     Returns a list of candidates:
       { value, missing_fields, missing_questions, satisfied, missing_count, rule_number, node_name }
     """
     try:
-        content = (node or {}).get("content", {})
-        rules = content.get("rules", []) or []
-        inputs = content.get("inputs", []) or []
-        outputs = content.get("outputs", []) or []
-
-        inputs_map = {
-            i.get("field"): i.get("id")
-            for i in inputs
-            if isinstance(i, dict) and i.get("field") and i.get("id")
-        }
-        outputs_map = {
-            o.get("field"): o.get("id")
-            for o in outputs
-            if isinstance(o, dict) and o.get("field") and o.get("id")
-        }
+        table = get_compiled_table(node)
+        outputs_map = table.outputs_map
 
         if not outputs_map:
             return []
 
         if output_field is None:
-            # Prefer the single output if there is only one.
-            if len(outputs_map) == 1:
-                output_field = list(outputs_map.keys())[0]
-            else:
-                # Fallback: pick the first output field.
-                output_field = list(outputs_map.keys())[0]
+            # Prefer the single output if there is only one, else fall back to the first output field.
+            output_field = list(outputs_map.keys())[0]
 
-        output_id = outputs_map.get(output_field)
-        if not output_id:
+        if not outputs_map.get(output_field):
             return []
 
-        field_to_question = {
-            i.get("field"): (i.get("name") or i.get("field"))
-            for i in inputs
-            if isinstance(i, dict) and i.get("field")
-        }
-
-        def _is_missing_value(v):
-            return v is None or (isinstance(v, str) and v.strip() == "")
-
-        def _check_condition(value, expected: str) -> bool:
-            if isinstance(value, bool):
-                if "," in expected or '"' in expected:
-                    return check_string_condition(str(value).lower(), expected.lower())
-                return str(value).lower() == expected.lower()
-            if isinstance(value, (int, float)):
-                return check_numeric_condition(value, expected)
-            if isinstance(value, str):
-                return check_string_condition(value, expected)
-            return check_string_condition(str(value), expected)
+        if scan is None:
+            scan = table.scan(input_data)
 
         candidates_by_value = {}
 
-        for rule_index, rule in enumerate(rules):
-            contradictions = 0
-            satisfied = 0
-            missing_fields = []
-
-            for field, rule_id in inputs_map.items():
-                expected = (rule.get(rule_id, "") or "").strip()
-                if expected == "":
-                    continue
-
-                value = input_data.get(field)
-                if field not in input_data or _is_missing_value(value):
-                    missing_fields.append(field)
-                    continue
-
-                if _check_condition(value, expected):
-                    satisfied += 1
-                else:
-                    contradictions += 1
-                    break
-
-            if contradictions:
+        for status in scan:
+            if status.mismatched:
                 continue
 
-            out_val = rule.get(output_id)
-            if isinstance(out_val, str):
-                out_val = out_val.strip()
-                if len(out_val) >= 2 and out_val.startswith('"') and out_val.endswith('"'):
-                    out_val = out_val[1:-1]
-
+            # Output cells are pre-unquoted at compile time.
+            out_val = status.crule.result.get(output_field)
             if out_val in (None, ""):
                 continue
 
+            missing_fields = list(status.missing_fields)
             cand = {
                 "value": out_val,
                 "missing_fields": missing_fields,
-                "missing_questions": [field_to_question.get(f) or f for f in missing_fields],
-                "satisfied": satisfied,
+                "missing_questions": [table.field_questions.get(f) or f for f in missing_fields],
+                "satisfied": status.satisfied,
                 "missing_count": len(missing_fields),
-                "rule_number": rule_index + 1,
-                "node_name": (node or {}).get("name"),
+                "rule_number": status.crule.index + 1,
+                "node_name": table.name,
             }
 
             # Keep the "best" rule for each output value: fewest missing, then most satisfied.
@@ -1082,146 +1424,6 @@ def diagnose_possible_outputs_for_node(node, input_data: dict, output_field: str
     except Exception:
         return []
 
-def check_numeric_condition(value, expected):
-    """Tjekker numeriske betingelser som <=, >=, <, >, intervaller"""
-    expected = (expected or "").strip()
-    if expected.startswith("<="):
-        return value <= float(expected[2:])
-    elif expected.startswith(">="):
-        return value >= float(expected[2:])
-    elif expected.startswith("<"):
-        return value < float(expected[1:])
-    elif expected.startswith(">"):
-        return value > float(expected[1:])
-    elif "," in expected:
-        # Håndter multiple værdier
-        valid_values = [v.strip() for v in expected.split(",")]
-        return str(value) in valid_values
-    else:
-        try:
-            return float(value) == float(expected)
-        except:
-            return str(value) == expected
-
-def check_string_condition(value, expected):
-    """Tjekker string betingelser inkl. quoted strings"""
-    val = (value or "").strip().lower()
-    exp = (expected or "").strip().lower()
-    # Some model cells contain newline-separated option lists.
-    # The csv module raises on embedded newlines unless the input is handled carefully,
-    # so normalize newlines/semicolons into commas before parsing.
-    exp = exp.replace("\r\n", "\n").replace("\r", "\n")
-
-    # Hvis vi har en liste (komma/linjeskift/semicolon-separeret), parse alle muligheder
-    if ',' in exp or '\n' in exp or ';' in exp:
-        # Brug CSV-parser for at respektere citations-tegn og undgå split på kommaer inde i citations
-        # (efter vi har normaliseret linjeskift/semicolons til komma).
-        import csv
-        exp_list = exp.replace("\n", ",").replace(";", ",")
-        try:
-            tokens = next(csv.reader([exp_list], skipinitialspace=True))
-        except Exception:
-            # Fallback: simple split if csv parsing fails for any reason
-            tokens = [t.strip() for t in exp_list.split(',')]
-        options = []
-        for t in tokens:
-            tt = t.strip()
-            if len(tt) >= 2 and tt.startswith('"') and tt.endswith('"'):
-                tt = tt[1:-1]
-            options.append(tt)
-
-        # Bilag aliasing: allow e.g. "1" to match "1a" and "1.1" to match "1b".
-        norm_val = _normalize_bilag_token_for_compare(val)
-        if norm_val is not None:
-            for opt in options:
-                norm_opt = _normalize_bilag_token_for_compare(opt)
-                if norm_opt is not None and norm_opt == norm_val:
-                    return True
-        return val in options
-
-    # Enkelt quoted værdi
-    if len(exp) >= 2 and exp.startswith('"') and exp.endswith('"'):
-        unquoted = exp[1:-1]
-        norm_val = _normalize_bilag_token_for_compare(val)
-        norm_exp = _normalize_bilag_token_for_compare(unquoted)
-        if norm_val is not None and norm_exp is not None:
-            return norm_val == norm_exp
-        return val == unquoted
-
-    # Simpel streng uden citation
-    norm_val = _normalize_bilag_token_for_compare(val)
-    norm_exp = _normalize_bilag_token_for_compare(exp)
-    if norm_val is not None and norm_exp is not None:
-        return norm_val == norm_exp
-    return val == exp
-
-
-def _parse_expected_numeric(expected: str):
-    """Parse a numeric condition string like '<=600' into (op, threshold).
-
-    Returns (op, threshold_float) or (None, None) if not parseable.
-    """
-    try:
-        s = (expected or "").strip()
-        for op in ("<=", ">=", "<", ">"):
-            if s.startswith(op):
-                return op, float(s[len(op):].strip())
-        # single numeric equality
-        try:
-            return "==", float(s)
-        except Exception:
-            return None, None
-    except Exception:
-        return None, None
-
-
-def _numeric_adjustment(value, expected: str):
-    """Return a dict describing how far a numeric value is from satisfying a condition.
-
-    If the condition is satisfied or not numeric-comparable, returns None.
-    Output shape:
-      { field_current, op, threshold, direction, delta_abs }
-    """
-    try:
-        op, thr = _parse_expected_numeric(expected)
-        if op is None:
-            return None
-        v = float(value)
-
-        ok = check_numeric_condition(v, expected)
-        if ok:
-            return None
-
-        # Direction indicates which way the number must move to satisfy the constraint.
-        if op in ("<=", "<"):
-            return {
-                "field_current": v,
-                "op": op,
-                "threshold": thr,
-                "direction": "decrease",
-                "delta_abs": max(0.0, v - thr),
-            }
-        if op in (">=", ">"):
-            return {
-                "field_current": v,
-                "op": op,
-                "threshold": thr,
-                "direction": "increase",
-                "delta_abs": max(0.0, thr - v),
-            }
-        if op == "==":
-            return {
-                "field_current": v,
-                "op": op,
-                "threshold": thr,
-                "direction": "set",
-                "delta_abs": abs(v - thr),
-            }
-        return None
-    except Exception:
-        return None
-
-
 def diagnose_optimization_suggestions_for_node(
     node,
     input_data: dict,
@@ -1229,12 +1431,15 @@ def diagnose_optimization_suggestions_for_node(
     current_value: int | None,
     limit: int = 5,
     max_numeric_delta_abs: float | None = None,
+    scan=None,
 ):
     """Suggest "better" (lower) numeric outputs and what would be needed to reach them.
 
     This is intentionally phrased as: "Hvis byggeriet faktisk opfylder ..."
     We do NOT assume the user can/should change conceptual properties.
 
+    Pass scan (from scan_node) to reuse a scan of the same node and inputs.
+
     Returns a list of suggestions:
       {
         target_value,
@@ -1249,38 +1454,19 @@ def diagnose_optimization_suggestions_for_node(
         if not node or not output_field:
             return []
 
-        content = (node or {}).get("content", {})
-        rules = content.get("rules", []) or []
-        inputs = content.get("inputs", []) or []
-        outputs = content.get("outputs", []) or []
-
-        inputs_map = {
-            i.get("field"): i.get("id")
-            for i in inputs
-            if isinstance(i, dict) and i.get("field") and i.get("id")
-        }
-        outputs_map = {
-            o.get("field"): o.get("id")
-            for o in outputs
-            if isinstance(o, dict) and o.get("field") and o.get("id")
-        }
-        out_id = outputs_map.get(output_field)
+        table = get_compiled_table(node)
+        out_id = table.outputs_map.get(output_field)
         if not out_id:
             return []
 
-        field_to_question = {
-            i.get("field"): (i.get("name") or i.get("field"))
-            for i in inputs
-            if isinstance(i, dict) and i.get("field")
-        }
-
-        def _is_missing_value(v):
-            return v is None or (isinstance(v, str) and v.strip() == "")
+        field_to_question = table.field_questions
+        if scan is None:
+            scan = table.scan(input_data)
 
         suggestions_by_target = {}
 
-        for rule_index, rule in enumerate(rules):
-            out_raw = rule.get(out_id)
+        for status in scan:
+            out_raw = status.crule.rule.get(out_id)
             out_int = _parse_first_int(out_raw) if out_raw is not None else None
             if out_int is None:
                 continue
@@ -1293,22 +1479,19 @@ def diagnose_optimization_suggestions_for_node(
             numeric_adjustments = []
             satisfied = 0
 
-            for field, rule_id in inputs_map.items():
-                expected = (rule.get(rule_id, "") or "").strip()
-                if expected == "":
-                    continue
-
-                value = input_data.get(field)
-                if field not in input_data or _is_missing_value(value):
+            for cell in status.cells:
+                field = cell.cond.field
+                expected = cell.cond.expected
+                if cell.state == MISSING:
                     missing_fields.append(field)
                     continue
 
                 # Already provided: if it's satisfied, great.
-                if isinstance(value, (int, float)):
-                    if check_numeric_condition(value, expected):
+                if cell.numeric_ok is not None:
+                    if cell.numeric_ok:
                         satisfied += 1
                     else:
-                        adj = _numeric_adjustment(value, expected)
+                        adj = cell.adjustment
                         if adj is not None:
                             if max_numeric_delta_abs is not None and adj.get("delta_abs") is not None:
                                 if float(adj["delta_abs"]) > float(max_numeric_delta_abs):
@@ -1320,7 +1503,7 @@ def diagnose_optimization_suggestions_for_node(
                                     "field": field,
                                     "question": field_to_question.get(field) or field,
                                     "expected": expected,
-                                    "current": value,
+                                    "current": input_data.get(field),
                                     "op": adj.get("op"),
                                     "threshold": adj.get("threshold"),
                                     "delta_abs": adj.get("delta_abs"),
@@ -1334,29 +1517,17 @@ def diagnose_optimization_suggestions_for_node(
                                     "expected": expected,
                                 }
                             )
-                elif isinstance(value, bool):
-                    # If it mismatches, record as a requirement.
-                    if check_string_condition(str(value).lower(), expected.lower()):
-                        satisfied += 1
-                    else:
-                        required_fields.append(
-                            {
-                                "field": field,
-                                "question": field_to_question.get(field) or field,
-                                "expected": expected,
-                            }
-                        )
+                elif cell.state == SATISFIED:
+                    satisfied += 1
                 else:
-                    if check_string_condition(str(value), expected):
-                        satisfied += 1
-                    else:
-                        required_fields.append(
-                            {
-                                "field": field,
-                                "question": field_to_question.get(field) or field,
-                                "expected": expected,
-                            }
-                        )
+                    # If it mismatches, record as a requirement.
+                    required_fields.append(
+                        {
+                            "field": field,
+                            "question": field_to_question.get(field) or field,
+                            "expected": expected,
+                        }
+                    )
 
             if numeric_adjustments is None:
                 continue
@@ -1386,8 +1557,8 @@ def diagnose_optimization_suggestions_for_node(
                 "required_fields": required_fields,
                 "numeric_adjustments": numeric_adjustments,
                 "score": score,
-                "node_name": (node or {}).get("name"),
-                "rule_number": rule_index + 1,
+                "node_name": table.name,
+                "rule_number": status.crule.index + 1,
             }
 
             prev = suggestions_by_target.get(out_int)
@@ -1401,6 +1572,126 @@ def diagnose_optimization_suggestions_for_node(
         return []
 
 
+def _node_signature(node, input_data: dict):
+    """Hashable (field, type, value) tuple of the node's own input fields, or None if not keyable."""
+    table = get_compiled_table(node)
+    items = []
+    for field in table.inputs_map:
+        if field not in input_data:
+            items.append((field,))
+            continue
+        value = input_data[field]
+        if value is not None and not isinstance(value, (str, int, float, bool)):
+            return None
+        items.append((field, type(value), repr(value) if isinstance(value, float) else value))
+    return (node.get("id"), tuple(items))
+
+
+class _NodeDiagnostics:
+    """Scans and diagnostics of the flow's nodes, memoized on the values of each node's input fields.
+
+    A node's diagnostics only depend on its own input fields, so a memo handed on from the
+    previous evaluation (see evaluate_incremental) lets unaffected nodes skip them entirely.
+    Memoized values are shared between evaluations and must not be modified.
+    """
+
+    def __init__(self, previous=None):
+        self.memo = {}
+        self._previous = previous.memo if previous is not None else {}
+
+    def _get(self, key, compute):
+        if key in self.memo:
+            return self.memo[key]
+        if key in self._previous:
+            value = self.memo[key] = self._previous[key]
+            return value
+        value = self.memo[key] = compute()
+        return value
+
+    def scan(self, node, input_data: dict):
+        signature = _node_signature(node, input_data) if node else None
+        if signature is None:
+            return _safe_scan(node, input_data)
+        return self._get(("scan", signature), lambda: _safe_scan(node, input_data))
+
+    def _diagnose(self, kind, diagnose, node, input_data, kwargs):
+        signature = _node_signature(node, input_data) if node else None
+        if signature is None:
+            return diagnose(node, input_data, **kwargs)
+        kwargs.pop("scan", None)
+        key = (kind, signature, tuple(sorted(kwargs.items())))
+        return self._get(key, lambda: diagnose(node, input_data, scan=self.scan(node, input_data), **kwargs))
+
+    def missing_inputs(self, node, input_data: dict, **kwargs):
+        return self._diagnose("missing", diagnose_missing_inputs_for_node, node, input_data, kwargs)
+
+    def possible_outputs(self, node, input_data: dict, **kwargs):
+        return self._diagnose("outputs", diagnose_possible_outputs_for_node, node, input_data, kwargs)
+
+    def suggestions(self, node, input_data: dict, **kwargs):
+        return self._diagnose("suggestions", diagnose_optimization_suggestions_for_node, node, input_data, kwargs)
+
+
+def evaluate_complete_flow_batch(items: list, include_krav: bool = False):
+    """Evaluerer komplet flow for mange bygningsafsnit i ét kald.
+
+    Modellen og dens noder slås op én gang for hele batchen. Resultaterne returneres i
+    samme rækkefølge som input; en fejl i ét element påvirker ikke de øvrige.
+
+    Args:
+        items: Liste af input-dicts (ét pr. bygningsafsnit)
+        include_krav: Evaluer også Krav.json for hvert element med bestemt brandklasse
+
+    Returns:
+        Liste af { index, success, result[, krav] } eller { index, success: False, error }
+    """
+    return list(iter_complete_flow_batch(items, include_krav=include_krav))
+
+
+def iter_complete_flow_batch(items, include_krav: bool = False):
+    """Generator-udgave af evaluate_complete_flow_batch: ét element ad gangen (items må være en iterator).
+
+    Model-snapshot og Krav-node ligger fast for hele batchen.
+    """
+    compiled = get_compiled_model()
+    krav_node, krav_error = _get_krav_node() if include_krav else (None, None)
+
+    for index, inputs in enumerate(items or []):
+        yield _evaluate_batch_item(index, inputs, compiled, include_krav, krav_node, krav_error)
+
+
+def _evaluate_batch_item(index, inputs, compiled, include_krav, krav_node, krav_error):
+    if not isinstance(inputs, dict):
+        return {"index": index, "success": False, "error": "Input skal være et JSON-objekt"}
+    try:
+        result = _evaluate_complete_flow(inputs, compiled)
+        entry = {"index": index, "success": bool(result.get("success")), "result": result}
+        if include_krav:
+            entry["krav"] = _evaluate_krav_for_result(inputs, result, krav_node, krav_error)
+        return entry
+    except Exception as e:
+        return {"index": index, "success": False, "error": str(e)}
+
+
+def _evaluate_krav_for_result(inputs: dict, result: dict, krav_node, krav_error):
+    """Evaluate krav the way the frontend does: inputs + evaluated bilag and brandklasse.
+
+    Returns None when brandklasse or relevant bilag hasn't been determined.
+    """
+    if krav_error:
+        return krav_error
+    bilag = result.get("relevant_bilag")
+    bilag = bilag.get("value") if isinstance(bilag, dict) else None
+    brandklasse = result.get("brandklasse")
+    brandklasse = brandklasse.get("value") if isinstance(brandklasse, dict) else None
+    if bilag in (None, "") or brandklasse is None:
+        return None
+    krav_inputs = dict(inputs)
+    krav_inputs["Relevant_bilag"] = bilag
+    krav_inputs["brandklasse"] = brandklasse
+    return _evaluate_krav(krav_inputs, krav_node)
+
+
 def evaluate_from_bools(inputs: dict):
     """
     Bagudkompatibilitet - konverterer gamle boolean format til nyt system
@@ -1430,8 +1721,8 @@ def evaluate_from_bools(inputs: dict):
         "direkte_udgange": True
     }
     
-    # Kør gennem nyt system
-    result = evaluate_complete_flow(expanded_inputs)
+    # Kør gennem nyt system (kun anvendelseskategori skal bruges)
+    result = evaluate(expanded_inputs, targets=["anvendelseskategori"])
     
     # Returner i gamle format
     if result["success"] and result["anvendelseskategori"]:
@@ -1443,46 +1734,148 @@ def evaluate_from_bools(inputs: dict):
         return {"kategori": None, "description": "Ingen match fundet."}
 
 
-def evaluate_krav(inputs: dict):
+def evaluate_krav(inputs: dict, fields=None, offset: int = 0, limit: int | None = None):
     """
     Evaluerer Krav.json baseret på brandklasse og relevant bilag
     
     Args:
         inputs: Dict med parametre inkl. Relevant_bilag, brandklasse, osv.
+        fields: Kun disse output-felter pr. krav (fx ["Krav_id", "Krav_Titel"]); None = alle
+        offset, limit: Side af de matchende krav (i modellens rækkefølge)
     
     Returns:
-        Dict med liste af alle matchende krav
+        Dict med liste af alle matchende krav (med paging også total/offset/limit)
     """
-    global KRAV_MODEL
-    if KRAV_MODEL is None:
-        try:
-            KRAV_MODEL = load_krav()
-        except Exception as e:
-            return {
-                "success": False,
-                "error": f"Kunne ikke indlæse Krav.json: {str(e)}",
-                "krav": []
-            }
+    krav_node, error = _get_krav_node()
+    if error:
+        return error
+    return _evaluate_krav(inputs, krav_node, fields=fields, offset=offset, limit=limit)
+
+
+def iter_krav(inputs: dict, fields=None, offset: int = 0, limit: int | None = None):
+    """Generator-udgave af evaluate_krav: giver ét krav (dict) ad gangen, i modellens rækkefølge.
+
+    Bruges til streaming (NDJSON); kan Krav.json ikke bruges, gives fejl-svaret som eneste element.
+    """
+    krav_node, error = _get_krav_node()
+    if error:
+        yield error
+        return
+    table = get_compiled_table(krav_node)
+    if not table.has_outputs:
+        return
+    matching = table.iter_matching_rules(inputs, partition_field=_KRAV_PARTITION_FIELD)
+    start = max(0, int(offset or 0))
+    stop = None if limit is None else start + max(0, int(limit))
+    for crule in itertools.islice(matching, start, stop):
+        yield project_result(crule.result, fields)
+
+
+def get_krav_detail(krav_id: str, rule_id: str | None = None):
+    """Alle varianter (regler) af et krav med fulde output-felter, slået op på Krav_id.
+
+    rule_id (et _matched_rule_id fra evaluate_krav) udvælger én bestemt variant.
+    """
+    try:
+        krav_compiled = _MODELS.get(_KRAV_MODEL).compiled
+    except Exception as e:
+        return {"success": False, "error": f"Kunne ikke indlæse Krav.json: {str(e)}"}
+    rules = krav_compiled.rules_by_output("krav", "Krav_id").get(str(krav_id).strip(), [])
+    if rule_id:
+        rules = [crule for crule in rules if crule.result.get("_matched_rule_id") == rule_id]
+    if not rules:
+        return {"success": False, "error": f"Krav '{krav_id}' findes ikke"}
+    return {
+        "success": True,
+        "Krav_id": krav_id,
+        "krav": [dict(crule.result) for crule in rules],
+        "count": len(rules),
+    }
+
+
+def _get_krav_node():
+    """Return (Designkrav node, None) or (None, error response) if Krav.json can't be used."""
+    try:
+        krav_compiled = _MODELS.get(_KRAV_MODEL).compiled
+    except Exception as e:
+        return None, {
+            "success": False,
+            "error": f"Kunne ikke indlæse Krav.json: {str(e)}",
+            "krav": []
+        }
     
     # Find Designkrav decision table
-    nodes = {node["name"]: node for node in KRAV_MODEL.get("nodes", []) if node.get("type") == "decisionTableNode"}
-    krav_node = nodes.get("Designkrav")
+    krav_node = krav_compiled.node("krav")
     
     if not krav_node:
-        return {
+        return None, {
             "success": False,
             "error": "Kunne ikke finde 'Designkrav' node i Krav.json",
             "krav": []
         }
-    
-    # Evaluate with collect policy to get all matching requirements
-    matching_krav = evaluate_decision_node(krav_node, inputs, hit_policy="collect")
-    
-    return {
+    return krav_node, None
+
+
+_KRAV_PARTITION_FIELD = ROLE_PARTITIONS["krav"]
+
+
+def _evaluate_krav(inputs: dict, krav_node, fields=None, offset: int = 0, limit: int | None = None):
+    # Evaluate with collect policy to get all matching requirements.
+    # Only the rules of the Relevant_bilag partition (1/1a, 1.1/1b aliases resolved) are checked.
+    table = get_compiled_table(krav_node)
+    if not table.has_outputs:
+        matching = []
+    else:
+        matching = table.matching_rules(inputs, partition_field=_KRAV_PARTITION_FIELD)
+    total = len(matching)
+
+    paged = bool(offset) or limit is not None
+    if paged:
+        start = max(0, int(offset or 0))
+        matching = matching[start:] if limit is None else matching[start:start + max(0, int(limit))]
+    matching_krav = [project_result(crule.result, fields) for crule in matching]
+
+    response = {
         "success": True,
         "krav": matching_krav,
         "count": len(matching_krav)
     }
+    if paged:
+        response["total"] = total
+        response["offset"] = offset
+        response["limit"] = limit
+    return response
+
+
+def _explanation_fragments(compiled, node, rule_id):
+    """Prebuilt explanation parts of a matched rule, cached on the CompiledModel (one per model version).
+
+    Returns (rule description, [(label, fixed text or None, field, condition)]) or None if
+    the rule isn't in the node. Only the actual input values are filled in per call.
+    """
+    node_id = node.get("id")
+    rule_index = compiled.rule_index.get((node_id, rule_id)) if rule_id else None
+    if rule_index is None:
+        return None
+    key = (node_id, rule_index)
+    fragments = compiled.explanations.get(key)
+    if fragments is None:
+        rule = compiled.tables[node_id].rules[rule_index].rule
+        parts = []
+        for inp in node.get("content", {}).get("inputs", []):
+            field = inp.get("field")
+            name = inp.get("name", field)
+            condition_value = rule.get(inp.get("id"), "")
+            if not condition_value:
+                continue
+            if condition_value == "true":
+                parts.append((name, f"{name}: Ja", field, condition_value))
+            elif condition_value == "false":
+                parts.append((name, f"{name}: Nej", field, condition_value))
+            else:
+                parts.append((name, None, field, condition_value))
+        fragments = compiled.explanations[key] = (rule.get("_description"), parts)
+    return fragments
 
 
 def generate_explanation(inputs: dict, results: dict):
@@ -1497,8 +1890,7 @@ def generate_explanation(inputs: dict, results: dict):
     Returns:
         Dict med strukturerede forklaringer for hvert beslutningslag
     """
-    model = get_brandtree()
-    nodes = {node["name"]: node for node in model.get("nodes", []) if node.get("type") == "decisionTableNode"}
+    compiled = get_compiled_model()
     
     explanations = {
         "anvendelseskategori": None,
@@ -1507,100 +1899,70 @@ def generate_explanation(inputs: dict, results: dict):
         "summary": ""
     }
     
-    # Helper function to find rule by ID
-    def find_rule_in_node(node, rule_id):
-        if not node or not rule_id:
+    # Rule lookup and condition labels come from the per-version fragment cache;
+    # matched_rule_id may be the rule's `_id` or the "{node_id}_rule_{index}" id of the flows.
+    def explain_rule(node, result):
+        if not node or not result.get("matched_rule_id"):
             return None
-        rules = node.get("content", {}).get("rules", [])
-        for rule in rules:
-            if rule.get("_id") == rule_id:
-                return rule
-        return None
-    
-    # Helper function to format input conditions
-    def format_conditions(node, rule, inputs_data):
+        fragments = _explanation_fragments(compiled, node, result["matched_rule_id"])
+        if fragments is None:
+            return None
+        description, parts = fragments
         conditions = []
-        input_defs = node.get("content", {}).get("inputs", [])
-        
-        for inp in input_defs:
-            field = inp.get("field")
-            input_id = inp.get("id")
-            name = inp.get("name", field)
-            
-            # Get the condition from the rule
-            condition_value = rule.get(input_id, "")
-            if not condition_value or condition_value == "":
+        for name, fixed, field, condition_value in parts:
+            if fixed is not None:
+                conditions.append(fixed)
                 continue
-            
-            # Get the actual input value
-            actual_value = inputs_data.get(field)
-            
-            # Format the condition nicely
-            if condition_value == "true":
-                conditions.append(f"{name}: Ja")
-            elif condition_value == "false":
-                conditions.append(f"{name}: Nej")
-            elif actual_value is not None:
-                conditions.append(f"{name}: {actual_value}")
-            else:
-                conditions.append(f"{name}: {condition_value}")
-        
-        return conditions
-    
+            # Show the actual input value when there is one
+            actual_value = inputs.get(field)
+            conditions.append(f"{name}: {actual_value if actual_value is not None else condition_value}")
+        return description, conditions
+
     # Explain Anvendelseskategori
     if results.get("anvendelseskategori"):
         ak_result = results["anvendelseskategori"]
-        ak_node = nodes.get("Anvendelseskategori 2.0") or _find_node_by_keywords(nodes, ["anvendelseskategori"])
-        
-        if ak_node and ak_result.get("matched_rule_id"):
-            rule = find_rule_in_node(ak_node, ak_result["matched_rule_id"])
-            if rule:
-                conditions = format_conditions(ak_node, rule, inputs)
-                explanations["anvendelseskategori"] = {
-                    "value": ak_result["value"],
-                    "description": rule.get("_description", ak_result.get("description", "")),
-                    "conditions": conditions,
-                    "text": f"Dit byggeri er klassificeret som Anvendelseskategori {ak_result['value']}. " +
-                           f"{rule.get('_description', '')} " +
-                           f"Dette blev bestemt baseret på: {', '.join(conditions) if conditions else 'de angivne parametre'}."
-                }
+        explained = explain_rule(compiled.node("ak"), ak_result)
+        if explained:
+            description, conditions = explained
+            explanations["anvendelseskategori"] = {
+                "value": ak_result["value"],
+                "description": description if description is not None else ak_result.get("description", ""),
+                "conditions": conditions,
+                "text": f"Dit byggeri er klassificeret som Anvendelseskategori {ak_result['value']}. " +
+                       f"{description or ''} " +
+                       f"Dette blev bestemt baseret på: {', '.join(conditions) if conditions else 'de angivne parametre'}."
+            }
     
     # Explain Risikoklasse
     if results.get("risikoklasse"):
         rk_result = results["risikoklasse"]
-        rk_node = nodes.get("Risikoklasse") or _find_node_by_keywords(nodes, ["risikoklasse"])
-        
-        if rk_node and rk_result.get("matched_rule_id"):
-            rule = find_rule_in_node(rk_node, rk_result["matched_rule_id"])
-            if rule:
-                conditions = format_conditions(rk_node, rule, inputs)
-                explanations["risikoklasse"] = {
-                    "value": rk_result["value"],
-                    "description": rule.get("_description", rk_result.get("description", "")),
-                    "conditions": conditions,
-                    "text": f"Risikoklasse {rk_result['value']} blev tildelt. " +
-                           f"{rule.get('_description', '')} " +
-                           f"Dette baseres på: anvendelseskategori {results.get('anvendelseskategori', {}).get('value')}, " +
-                           f"samt {', '.join(conditions) if conditions else 'bygningens karakteristika'}."
-                }
+        explained = explain_rule(compiled.node("rk"), rk_result)
+        if explained:
+            description, conditions = explained
+            explanations["risikoklasse"] = {
+                "value": rk_result["value"],
+                "description": description if description is not None else rk_result.get("description", ""),
+                "conditions": conditions,
+                "text": f"Risikoklasse {rk_result['value']} blev tildelt. " +
+                       f"{description or ''} " +
+                       f"Dette baseres på: anvendelseskategori {(results.get('anvendelseskategori') or {}).get('value')}, " +
+                       f"samt {', '.join(conditions) if conditions else 'bygningens karakteristika'}."
+            }
     
     # Explain Brandklasse
     if results.get("brandklasse"):
         bk_result = results["brandklasse"]
-        bk_node = nodes.get("Præ-accepterede løsninger")
-        
-        if bk_node and bk_result.get("matched_rule_id"):
-            rule = find_rule_in_node(bk_node, bk_result["matched_rule_id"])
-            if rule:
-                conditions = format_conditions(bk_node, rule, inputs)
-                explanations["brandklasse"] = {
-                    "value": bk_result.get("value"),
-                    "description": rule.get("_description", bk_result.get("description", "")),
-                    "conditions": conditions,
-                    "text": f"Brandklasse {bk_result.get('value')} er gældende. " +
-                           f"{rule.get('_description', '')} " +
-                           f"Klassificeringen tager udgangspunkt i: {', '.join(conditions) if conditions else 'byggeriets egenskaber og relevant bilag'}."
-                }
+        explained = explain_rule(compiled.node("bk"), bk_result)
+        if explained:
+            description, conditions = explained
+            explanations["brandklasse"] = {
+                "value": bk_result.get("value"),
+                "description": description if description is not None else bk_result.get("description", ""),
+                "conditions": conditions,
+                "text": f"Brandklasse {bk_result.get('value')} er gældende. " +
+                       f"{description or ''} " +
+                       f"Klassificeringen tager udgangspunkt i: {', '.join(conditions) if conditions else 'byggeriets egenskaber og relevant bilag'}."
+            }
     
     # Generate summary
     summary_parts = []
@@ -0,0 +1,221 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+# ==============================================================
+# model_registry.py – indlæste decision-modeller med baggrundsovervågning
+#
+# Hver model (fx Brandklasse_Bestemmelse.json og Krav.json) holdes som et
+# uforanderligt ModelSnapshot. En baggrundstråd poller filerne (stat), og ved
+# ændringer parses og kompileres den nye version uden for request-stien, hvorefter
+# snapshot'et byttes atomisk. Requests slår blot det aktuelle snapshot op
+# (ingen filsystemkald) og bruger det samme snapshot hele vejen igennem.
+# Snapshot'et har også de rå bytes komprimeret på forhånd (gzip, og brotli hvis
+# installeret), så selve JSON-filen kan serveres direkte fra hukommelsen.
+# ==============================================================
+
+
+class ModelSnapshot:
+    """One immutable loaded version of a model file."""
+
+    __slots__ = ("name", "path", "raw", "model", "version", "compiled", "stat", "loaded_at", "variants")
+
+    def __init__(self, name, path, raw, model, version, compiled, stat, loaded_at, variants=None):
+        self.name = name
+        self.path = path
+        self.raw = raw  # file content (bytes) the model was parsed from
+        self.model = model
+        self.version = version  # sha1 of raw
+        self.compiled = compiled  # whatever the registry's compile hook returned
+        self.stat = stat  # (mtime_ns, size) seen when the file was read
+        self.loaded_at = loaded_at
+        self.variants = variants or {}  # {"br"/"gzip": (etag, bytes)} precompressed forms of raw
+
+    @property
+    def etag(self) -> str:
+        """Strong ETag of the raw file content (the quoted version hash)."""
+        return f'"{self.version}"'
+
+    def info(self) -> dict:
+        return {
+            "name": self.name,
+            "path": self.path,
+            "version": self.version,
+            "size": len(self.raw),
+            "loaded_at": self.loaded_at,
+        }
+
+
+def _compress_variants(raw: bytes, version: str) -> dict:
+    variants = {}
+    if brotli is not None:
+        variants["br"] = (f'"{version}-br"', brotli.compress(raw, quality=11))
+    variants["gzip"] = (f'"{version}-gz"', gzip.compress(raw, compresslevel=9, mtime=0))
+    return variants
+
+
+def _file_stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class ModelRegistry:
+    """Named model files with lazy first load, polling reload and atomic snapshot swaps.
+
+    compile(model) is called once per loaded version (off the request path when the
+    watcher thread is running) and its return value is kept on the snapshot.
+    Listeners are called as listener(name, old_snapshot, new_snapshot) after a swap.
+    """
+
+    def __init__(self, poll_interval: float = 1.0, compile=None):
+        self.poll_interval = poll_interval
+        self._compile = compile
+        self._paths = {}  # name -> resolved path
+        self._snapshots = {}  # name -> ModelSnapshot; replaced wholesale, never mutated
+        self._errors = {}  # name -> last reload error (the previous snapshot stays active)
+        self._listeners = []
+        self._lock = threading.Lock()  # serializes loads/swaps, never taken by get()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, name: str, path: str):
+        """Declare a model file. It is loaded on first get() or by the watcher."""
+        with self._lock:
+            if self._paths.get(name) != path:
+                self._paths[name] = path
+                self._snapshots = {k: v for k, v in self._snapshots.items() if k != name}
+
+    def is_registered(self, name: str) -> bool:
+        return name in self._paths
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def get(self, name: str) -> ModelSnapshot:
+        """Current snapshot of a model. Only the very first call for a name touches the disk."""
+        snapshot = self._snapshots.get(name)
+        if snapshot is None:
+            snapshot = self._load_initial(name)
+        return snapshot
+
+    def snapshot(self) -> dict:
+        """All currently loaded snapshots {name: ModelSnapshot} (one consistent view)."""
+        return self._snapshots
+
+    def errors(self) -> dict:
+        return dict(self._errors)
+
+    def _load_initial(self, name):
+        with self._lock:
+            snapshot = self._snapshots.get(name)
+            if snapshot is None:
+                if name not in self._paths:
+                    raise KeyError(f"Ukendt model: {name}")
+                snapshot = self._read(name, self._paths[name])
+                self._swap(name, snapshot)
+        return snapshot
+
+    def _read(self, name, path):
+        stat = _file_stat(path)
+        with open(path, "rb") as f:
+            raw = f.read()
+        model = json.loads(raw.decode("utf-8"))
+        compiled = self._compile(model) if self._compile else None
+        version = hashlib.sha1(raw).hexdigest()
+        return ModelSnapshot(
+            name=name,
+            path=path,
+            raw=raw,
+            model=model,
+            version=version,
+            compiled=compiled,
+            stat=stat,
+            loaded_at=time.time(),
+            variants=_compress_variants(raw, version),
+        )
+
+    def _swap(self, name, snapshot):
+        # Caller holds self._lock. Build a new dict so readers always see a complete mapping.
+        old = self._snapshots.get(name)
+        snapshots = dict(self._snapshots)
+        snapshots[name] = snapshot
+        self._snapshots = snapshots
+        self._errors.pop(name, None)
+        for listener in self._listeners:
+            try:
+                listener(name, old, snapshot)
+            except Exception:
+                pass
+
+    def check(self, force: bool = False) -> list:
+        """Reload every loaded model whose file changed (or all, if force). Returns reloaded names."""
+        reloaded = []
+        for name, path in list(self._paths.items()):
+            current = self._snapshots.get(name)
+            if current is None and not force:
+                continue  # never requested yet; keep it lazy
+            stat = _file_stat(path)
+            if stat is None:
+                continue  # file temporarily missing (e.g. editor save); keep serving the old one
+            if not force and current is not None and current.stat == stat:
+                continue
+            try:
+                snapshot = self._read(name, path)
+            except Exception as e:
+                # Half-written or invalid JSON: keep the previous version and retry on next poll.
+                self._errors[name] = f"{type(e).__name__}: {e}"
+                continue
+            with self._lock:
+                if self._paths.get(name) != path:
+                    continue
+                current = self._snapshots.get(name)
+                if current is not None and current.version == snapshot.version:
+                    # Touched but unchanged: just remember the new stat.
+                    snapshot = ModelSnapshot(
+                        current.name, current.path, current.raw, current.model, current.version,
+                        current.compiled, snapshot.stat, current.loaded_at, current.variants,
+                    )
+                    self._snapshots = {**self._snapshots, name: snapshot}
+                    continue
+                self._swap(name, snapshot)
+            reloaded.append(name)
+        return reloaded
+
+    # --- watcher thread ---
+
+    def start(self):
+        """Start the polling watcher thread (idempotent)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 5.0):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+
+    @property
+    def watching(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check()
+            except Exception:
+                pass
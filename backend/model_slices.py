@@ -0,0 +1,142 @@
+import re
+
+# ==============================================================
+# model_slices.py – små udsnit af en kompileret model til frontend'en
+#
+# I stedet for at hente hele Brandklasse_Bestemmelse.json / Krav.json for at
+# finde fx bygningstype-valgmuligheder eller en regels betingelser, udledes
+# udsnittene (valgmuligheder pr. inputfelt, regler pr. node/bilag, én regel pr.
+# `_id`) én gang pr. modelversion fra CompiledModel og genbruges derefter.
+# ==============================================================
+
+_QUOTED = re.compile(r'"([^"]+)"|\'([^\']+)\'')
+_SEPARATORS = re.compile(r"[,;\n]")
+
+_COMPARISONS = ("<", "<=", ">", ">=", "==")
+
+
+def _cell_options(expected: str):
+    """Option values of a text cell, original casing (same extraction as the bygningstype dropdown)."""
+    s = expected.strip()
+    if not s:
+        return []
+    quoted = [(a or b).strip() for a, b in _QUOTED.findall(s)]
+    if quoted:
+        return [q for q in quoted if q]
+    if _SEPARATORS.search(s):
+        return [t.strip() for t in _SEPARATORS.split(s) if t.strip()]
+    return [s]
+
+
+def _bilag_field(table):
+    for field in table.inputs_map:
+        if field.lower() == "relevant_bilag":
+            return field
+    return None
+
+
+class ModelSlices:
+    """Lazily built, cached slices of one CompiledModel (i.e. of one model version).
+
+    Returned structures are shared between requests and must not be mutated.
+    """
+
+    def __init__(self, compiled):
+        self.compiled = compiled
+        self._options = None
+        self._rules = {}  # (node id, id of partition group or None) -> [rule slice]
+        self._rule_slices = {}  # (node id, rule index) -> rule slice
+
+    def resolve_node(self, node):
+        """Decision node for a role ("ak", "krav", ...), node name or node id; None if unknown."""
+        compiled = self.compiled
+        if not node:
+            return None
+        return compiled.node(node) or compiled.decision_nodes.get(node) or (
+            compiled.nodes_by_id.get(node) if node in compiled.tables else None
+        )
+
+    def field_options(self) -> dict:
+        """{field: {options, thresholds, nodes}} for every input field of every decision table.
+
+        options:    distinct text values used in rule cells, in model order
+        thresholds: distinct numeric comparisons [{op, value}], sorted by value
+        nodes:      names of the decision tables that read the field
+        """
+        if self._options is None:
+            options = {}
+            for table in self.compiled.tables.values():
+                for field in table.inputs_map:
+                    entry = options.setdefault(field, {"options": [], "thresholds": [], "nodes": []})
+                    if table.name not in entry["nodes"]:
+                        entry["nodes"].append(table.name)
+                seen = {}
+                for crule in table.rules:
+                    for cond in crule.conditions:
+                        entry = options[cond.field]
+                        if cond.op in _COMPARISONS:
+                            threshold = {"op": cond.op, "value": cond.threshold}
+                            if threshold not in entry["thresholds"]:
+                                entry["thresholds"].append(threshold)
+                            continue
+                        known = seen.setdefault(cond.field, set(entry["options"]))
+                        for value in _cell_options(cond.expected):
+                            if value not in known:
+                                known.add(value)
+                                entry["options"].append(value)
+            for entry in options.values():
+                entry["thresholds"].sort(key=lambda t: (t["value"], t["op"]))
+            self._options = options
+        return self._options
+
+    def _rule_slice(self, table, crule):
+        conditions = {}
+        for cond in crule.conditions:
+            if cond.expected.strip():
+                conditions[cond.field] = cond.expected.strip()
+        return {
+            "_id": crule.rule.get("_id"),
+            "rule_id": crule.result["_matched_rule_id"],
+            "index": crule.index,
+            "node_id": table.node_id,
+            "node_name": table.name,
+            "description": crule.rule.get("_description", ""),
+            "conditions": conditions,
+            "outputs": {field: crule.result.get(field) for field in table.outputs_map},
+        }
+
+    def rules(self, node, bilag=None):
+        """Rule slices of one decision node, optionally limited to the rules that can apply to a bilag.
+
+        The bilag filter uses the table's Relevant_bilag partition (1/1a and 1.1/1b aliases
+        resolved); tables without a bilag input return all their rules.
+        """
+        node = self.resolve_node(node)
+        table = self.compiled.table(node) if node else None
+        if table is None:
+            return None
+        field = _bilag_field(table) if bilag is not None else None
+        if field is None:
+            key = (table.node_id, None)
+            candidates = None
+        else:
+            # Keyed on the partition group, so arbitrary bilag strings don't grow the cache.
+            candidates = table.partition(field).candidates({field: str(bilag)})
+            key = (table.node_id, id(candidates))
+        rules = self._rules.get(key)
+        if rules is None:
+            crules = table.rules if candidates is None else [crule for crule, _ in candidates]
+            rules = self._rules[key] = [self._rule_slice(table, crule) for crule in crules]
+        return rules
+
+    def rule(self, rule_id):
+        """Rule slice by its `_id` or matched-rule id ("{node_id}_rule_{index}"), or None."""
+        crule = self.compiled.compiled_rule(rule_id)
+        if crule is None:
+            return None
+        key = (crule.result["_matched_node_id"], crule.index)
+        rule = self._rule_slices.get(key)
+        if rule is None:
+            table = self.compiled.tables[key[0]]
+            rule = self._rule_slices[key] = self._rule_slice(table, crule)
+        return rule
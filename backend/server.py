@@ -1,13 +1,44 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import FileResponse, JSONResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pathlib import Path
 from fastapi.middleware.cors import CORSMiddleware
-import sys, os
+import asyncio, json, sys, os
 sys.path.append(os.path.dirname(__file__))  # 👈 tilføj backend til sys.path
-from logic import evaluate_from_bools, evaluate_basic_flow, evaluate_complete_flow, evaluate_krav, generate_explanation
+from logic import evaluate as evaluate_targets_logic, evaluate_from_bools, evaluate_basic_flow, evaluate_complete_flow, evaluate_complete_flow_batch, evaluate_krav, iter_complete_flow_batch, iter_krav, generate_explanation, get_krav_detail, get_flow_cache_stats, get_model_options, get_model_rule, get_model_rules, get_model_snapshot, get_model_versions, evaluate_incremental, start_model_watcher, stop_model_watcher, sweep, what_if
 from br18_data import get_category_info
+from static_assets import asset_response, preload_assets, serve_bytes
+from sessions import SessionStore
+from live_evaluation import LiveChannel
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Genindlæs Brandklasse_Bestemmelse.json / Krav.json i baggrunden når de ændres
+    start_model_watcher()
+    # Hash og komprimér de store tekstfiler én gang ved opstart
+    preload_assets([FRONTEND_DIR / "br18_full.html", FRONTEND_DIR / "style.css", FRONTEND_DIR / "theme.css"])
+    yield
+    stop_model_watcher()
+
+
+app = FastAPI(lifespan=lifespan)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def wants_ndjson(req: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in req.headers.get("accept", "")
+
+
+def ndjson_response(rows):
+    """Stream an iterable of JSON-able objects as newline-delimited JSON (one object per line)."""
+    def lines():
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False, default=str) + "\n"
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
 
-app = FastAPI()
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]
@@ -38,18 +69,222 @@ async def evaluate_complete(req: Request):
     return result
 
 
+# Wizard sessions: the server keeps the inputs and last evaluation, clients send only changes.
+SESSIONS = SessionStore(
+    evaluate_incremental,
+    max_sessions=int(os.environ.get("BR18_MAX_SESSIONS", "1000")),
+    idle_ttl=float(os.environ.get("BR18_SESSION_IDLE_TTL", "1800")),
+    max_bytes=int(float(os.environ.get("BR18_SESSION_MAX_MB", "64")) * 1024 * 1024),
+)
+
+
+@app.post("/sessions")
+async def create_session(req: Request):
+    """Start an evaluation session. Body (optional): the initial input dict. Returns id + full result."""
+    body = await req.body()
+    try:
+        data = json.loads(body) if body.strip() else {}
+    except ValueError:
+        return JSONResponse({"error": "Body must be valid JSON"}, status_code=400)
+    if not isinstance(data, dict):
+        return JSONResponse({"error": "Body must be a JSON object"}, status_code=400)
+    session = SESSIONS.create(data)
+    return JSONResponse({"session_id": session.id, "revision": session.revision, "result": session.result}, status_code=201)
+
+
+@app.get("/sessions/{session_id}")
+def get_session(session_id: str):
+    """Current inputs and full result of a session."""
+    session = SESSIONS.get(session_id)
+    if session is None:
+        return JSONResponse({"error": "Session not found"}, status_code=404)
+    return {"session_id": session.id, "revision": session.revision, "inputs": session.inputs, "result": session.result}
+
+
+@app.patch("/sessions/{session_id}")
+async def patch_session(session_id: str, req: Request):
+    """Update a session with only the changed fields (merge patch: null removes a field).
+
+    Returns only the top-level result fields that changed, plus the keys that disappeared.
+    """
+    try:
+        data = await req.json()
+    except ValueError:
+        return JSONResponse({"error": "Body must be valid JSON"}, status_code=400)
+    if not isinstance(data, dict):
+        return JSONResponse({"error": "Body must be a JSON object"}, status_code=400)
+    updated = SESSIONS.update(session_id, data)
+    if updated is None:
+        return JSONResponse({"error": "Session not found"}, status_code=404)
+    session, changed, removed = updated
+    return {"session_id": session.id, "revision": session.revision, "changed": changed, "removed": removed}
+
+
+@app.delete("/sessions/{session_id}")
+def delete_session(session_id: str):
+    if not SESSIONS.delete(session_id):
+        return JSONResponse({"error": "Session not found"}, status_code=404)
+    return Response(status_code=204)
+
+
+@app.websocket("/ws/evaluate")
+async def ws_evaluate(websocket: WebSocket):
+    """Live evaluation: send {"seq", "inputs": {...}} or {"seq", "patch": {...}} as the user types.
+
+    Bursts are coalesced (only the latest state is evaluated). For each evaluated state the
+    server pushes {"type": "result"} (AK/RK/bilag/BK values) and then {"type": "complete"}
+    (the /evaluate-complete response with diagnostics); steps overtaken by newer input are skipped.
+    """
+    await websocket.accept()
+    channel = LiveChannel(websocket.send_json, evaluate_targets_logic, evaluate_incremental)
+    worker = asyncio.create_task(channel.run())
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+            except ValueError:
+                message = None
+            error = channel.submit(message) if message is not None else "Invalid JSON"
+            if error:
+                await websocket.send_json({"type": "error", "error": error})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        worker.cancel()
+
+
+@app.post("/evaluate-complete/batch")
+async def evaluate_complete_batch(req: Request):
+    """Complete BR18 evaluation for many bygningsafsnit in one request.
+
+    Body: a list of input dicts, or {"items": [...], "include_krav": bool}.
+    Results are returned in input order; errors are reported per item.
+    With "Accept: application/x-ndjson" each item result is streamed as one JSON line.
+    """
+    data = await req.json()
+    include_krav = False
+    if isinstance(data, dict):
+        items = data.get("items")
+        include_krav = bool(data.get("include_krav", False))
+    else:
+        items = data
+    if not isinstance(items, list):
+        return JSONResponse({"success": False, "error": "Forventede en liste af inputs ('items')"}, status_code=400)
+
+    if wants_ndjson(req):
+        # One line per bygningsafsnit, written as soon as it has been evaluated
+        return ndjson_response(iter_complete_flow_batch(items, include_krav=include_krav))
+
+    results = evaluate_complete_flow_batch(items, include_krav=include_krav)
+    return {
+        "success": True,
+        "count": len(results),
+        "results": results,
+    }
+
+
 @app.post("/evaluate-basic")
-async def evaluate_basic(req: Request):
-    """Basic BR18 evaluation: Anvendelseskategori -> Risikoklasse -> Relevant bilag"""
+async def evaluate_basic(req: Request, diagnostics: bool = True):
+    """Basic BR18 evaluation: Anvendelseskategori -> Risikoklasse -> Relevant bilag
+
+    ?diagnostics=false skips missing_inputs/candidates/suggestions.
+    """
+    data = await req.json()
+    result = evaluate_basic_flow(data, diagnostics=diagnostics)
+    return result
+
+
+@app.post("/evaluate-targets")
+async def evaluate_targets(req: Request):
+    """Goal-directed evaluation: only the tables the requested outputs depend on.
+
+    Body: {"inputs": {...}, "targets": ["anvendelseskategori", ...], "diagnostics": bool}
+    """
+    data = await req.json()
+    if not isinstance(data, dict) or not isinstance(data.get("inputs", {}), dict):
+        return JSONResponse({"success": False, "error": "Forventede et JSON-objekt med 'inputs'"}, status_code=400)
+    targets = data.get("targets")
+    if targets is not None and (not isinstance(targets, list) or not all(isinstance(t, str) for t in targets)):
+        return JSONResponse({"success": False, "error": "'targets' skal være en liste af feltnavne"}, status_code=400)
+    return evaluate_targets_logic(data.get("inputs") or {}, targets=targets, diagnostics=bool(data.get("diagnostics", False)))
+
+@app.post("/what-if")
+async def what_if_endpoint(req: Request):
+    """Smallest input changes across AK → RK → bilag → BK that give a target output another value.
+
+    Body: {"inputs": {...}, "target": "brandklasse", "value": null (= lower than now) | 2,
+           "max_changes": 3, "fixed_fields": ["bygningstype"], "limit": 5, "time_budget_ms": 250}
+    """
+    data = await req.json()
+    if not isinstance(data, dict) or not isinstance(data.get("inputs", {}), dict):
+        return JSONResponse({"success": False, "error": "Forventede et JSON-objekt med 'inputs'"}, status_code=400)
+    fixed = data.get("fixed_fields")
+    if fixed is not None and (not isinstance(fixed, list) or not all(isinstance(f, str) for f in fixed)):
+        return JSONResponse({"success": False, "error": "'fixed_fields' skal være en liste af feltnavne"}, status_code=400)
+    try:
+        options = {
+            name: float(data[name]) if name == "time_budget_ms" else int(data[name])
+            for name in ("max_changes", "limit", "time_budget_ms")
+            if data.get(name) is not None
+        }
+    except (TypeError, ValueError):
+        return JSONResponse({"success": False, "error": "max_changes/limit/time_budget_ms skal være tal"}, status_code=400)
+    result = await asyncio.to_thread(
+        what_if,
+        data.get("inputs") or {},
+        target=data.get("target") or "brandklasse",
+        value=data.get("value"),
+        fixed_fields=fixed,
+        **options,
+    )
+    if not result.get("success"):
+        return JSONResponse(result, status_code=400)
+    return result
+
+
+@app.post("/sweep")
+async def sweep_endpoint(req: Request):
+    """AK/RK/bilag/BK regions while one or two numeric input fields vary over a range.
+
+    Body: {"inputs": {...}, "ranges": [{"field": "area_BA", "from": 50, "to": 2000},
+                                       {"field": "antal_etager_over_terraen_BA", "from": 1, "to": 8}]}
+    One range gives intervals, two give rectangles; each region carries the outputs it evaluates to.
+    """
     data = await req.json()
-    result = evaluate_basic_flow(data)
+    if not isinstance(data, dict) or not isinstance(data.get("inputs", {}), dict):
+        return JSONResponse({"success": False, "error": "Forventede et JSON-objekt med 'inputs'"}, status_code=400)
+    result = await asyncio.to_thread(sweep, data.get("inputs") or {}, data.get("ranges"))
+    if not result.get("success"):
+        return JSONResponse(result, status_code=400)
     return result
 
+
 @app.post("/evaluate-krav")
-async def evaluate_krav_endpoint(req: Request):
-    """Evaluate all requirements (Krav) based on brandklasse and relevant bilag"""
+async def evaluate_krav_endpoint(req: Request, fields: str | None = None, offset: int = 0, limit: int | None = None):
+    """Evaluate all requirements (Krav) based on brandklasse and relevant bilag
+
+    ?fields=Krav_id,Krav_Titel returns only those output fields per krav;
+    ?offset=&limit= returns one page (plus total). Full detail: GET /krav/{Krav_id}.
+    With "Accept: application/x-ndjson" each krav is streamed as one JSON line.
+    """
     data = await req.json()
-    result = evaluate_krav(data)
+    if offset < 0 or (limit is not None and limit < 0):
+        return JSONResponse({"success": False, "error": "offset/limit skal være >= 0"}, status_code=400)
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    if wants_ndjson(req):
+        # One line per matching krav, produced lazily from the decision table
+        return ndjson_response(iter_krav(data, fields=field_list, offset=offset, limit=limit))
+    result = evaluate_krav(data, fields=field_list, offset=offset, limit=limit)
+    return result
+
+
+@app.get("/krav/{krav_id}")
+def get_krav_endpoint(krav_id: str, rule_id: str | None = None):
+    """Full output fields of a krav (all rule variants, or the one given by ?rule_id=)."""
+    result = get_krav_detail(krav_id, rule_id=rule_id)
+    if not result.get("success"):
+        return JSONResponse(result, status_code=404)
     return result
 
 
@@ -59,11 +294,21 @@ async def generate_explanation_endpoint(req: Request):
     data = await req.json()
     inputs = data.get("inputs", {})
     results = data.get("results", {})
-    
-    # If results not provided, evaluate first
-    if not results or not results.get("success"):
-        results = evaluate_complete_flow(inputs)
-    
+
+    # A session id is a handle to an already evaluated result: explain that one as-is.
+    session_id = data.get("session_id")
+    if session_id:
+        session = SESSIONS.get(session_id)
+        if session is None:
+            return JSONResponse({"success": False, "error": "Session not found"}, status_code=404)
+        inputs, results = session.inputs, session.result
+    elif not results:
+        # Explanations never re-evaluate: the caller sends the result it got, or its session handle
+        return JSONResponse(
+            {"success": False, "error": "Angiv 'session_id' eller 'results' fra en tidligere evaluering"},
+            status_code=400,
+        )
+
     explanation = generate_explanation(inputs, results)
     return {
         "success": True,
@@ -71,180 +316,153 @@ async def generate_explanation_endpoint(req: Request):
     }
 
 
+@app.get("/cache-stats")
+def cache_stats():
+    """Hit/miss counters for the evaluation result cache."""
+    return get_flow_cache_stats()
+
+
 # Serve input1.json from project root so frontend can load the example
 ROOT_DIR = Path(__file__).resolve().parent.parent
+FRONTEND_DIR = ROOT_DIR / "frontend"
 
 @app.get("/input1.json")
-def get_input_json():
-    no_cache_headers = {
-        "Cache-Control": "no-store, no-cache, must-revalidate, max-age=0",
-        "Pragma": "no-cache",
-        "Expires": "0",
-    }
+def get_input_json(req: Request):
     # Serve input1.json
-    input_path = ROOT_DIR / "input1.json"
-    
-    input_path = input_path.resolve()
-    # Ensure the resolved path stays within ROOT_DIR
-    if ROOT_DIR in input_path.parents and input_path.exists():
-        return FileResponse(str(input_path), media_type="application/json", headers=no_cache_headers)
-    return JSONResponse({"error": "input1.json not found"}, status_code=404)
+    return asset_response(req, ROOT_DIR / "input1.json", media_type="application/json", not_found="input1.json not found")
 
 
 @app.get("/inputB1.json")
-def get_input_b1_json():
+def get_input_b1_json(req: Request):
     """Serve inputB1.json from project root so frontend can load bilag 1 template."""
-    no_cache_headers = {
-        "Cache-Control": "no-store, no-cache, must-revalidate, max-age=0",
-        "Pragma": "no-cache",
-        "Expires": "0",
-    }
-    input_path = (ROOT_DIR / "inputB1.json").resolve()
-    if ROOT_DIR in input_path.parents and input_path.exists():
-        return FileResponse(str(input_path), media_type="application/json", headers=no_cache_headers)
-    return JSONResponse({"error": "inputB1.json not found"}, status_code=404)
+    return asset_response(req, ROOT_DIR / "inputB1.json", media_type="application/json", not_found="inputB1.json not found")
 
 
 @app.get("/inputB11.json")
-def get_input_b11_json():
+def get_input_b11_json(req: Request):
     """Serve inputB11.json from project root so frontend can load bilag 1.1 template."""
-    no_cache_headers = {
-        "Cache-Control": "no-store, no-cache, must-revalidate, max-age=0",
-        "Pragma": "no-cache",
-        "Expires": "0",
-    }
-    input_path = (ROOT_DIR / "inputB11.json").resolve()
-    if ROOT_DIR in input_path.parents and input_path.exists():
-        return FileResponse(str(input_path), media_type="application/json", headers=no_cache_headers)
-    return JSONResponse({"error": "inputB11.json not found"}, status_code=404)
+    return asset_response(req, ROOT_DIR / "inputB11.json", media_type="application/json", not_found="inputB11.json not found")
+
+
+def model_response(req: Request, name: str, not_found: str):
+    """Serve a decision model straight from its loaded snapshot, with the model version as ETag."""
+    try:
+        snapshot = get_model_snapshot(name)
+    except (OSError, ValueError):
+        return JSONResponse({"error": not_found}, status_code=404)
+    return serve_bytes(
+        req,
+        snapshot.raw,
+        snapshot.etag,
+        "application/json",
+        snapshot.variants,
+        headers={"X-Model-Version": snapshot.version},
+    )
+
+
+@app.get("/models/versions")
+def model_versions():
+    """Version hash of each decision model, so the frontend can skip re-downloading unchanged JSON."""
+    try:
+        return get_model_versions()
+    except (OSError, ValueError) as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@app.get("/models/{model}/options")
+def model_options(model: str, fields: str | None = None):
+    """Option values/thresholds per input field (e.g. ?fields=bygningstype) without the whole model."""
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    result = get_model_options(model, fields=field_list)
+    if not result.get("success"):
+        return JSONResponse(result, status_code=404)
+    return result
+
+
+@app.get("/models/{model}/rules")
+def model_rules(model: str, node: str, bilag: str | None = None):
+    """Rules of one decision node (role such as ak/rk/bilag/bk/krav, name or id), optionally for one bilag."""
+    result = get_model_rules(model, node, bilag=bilag)
+    if not result.get("success"):
+        return JSONResponse(result, status_code=404)
+    return result
+
+
+@app.get("/models/{model}/rules/{rule_id}")
+def model_rule(model: str, rule_id: str):
+    """A single rule by its `_id` or matched-rule id (as returned in matched_rule_id)."""
+    result = get_model_rule(model, rule_id)
+    if not result.get("success"):
+        return JSONResponse(result, status_code=404)
+    return result
 
 
 @app.get("/Brandklasse_Bestemmelse.json")
-def get_brandklasse_model_json():
-    """Serve Brandklasse_Bestemmelse.json from project root so frontend can load bygningstype options."""
-    no_cache_headers = {
-        "Cache-Control": "no-store, no-cache, must-revalidate, max-age=0",
-        "Pragma": "no-cache",
-        "Expires": "0",
-    }
-    model_path = (ROOT_DIR / "Brandklasse_Bestemmelse.json").resolve()
-    if ROOT_DIR in model_path.parents and model_path.exists():
-        return FileResponse(str(model_path), media_type="application/json", headers=no_cache_headers)
-    return JSONResponse({"error": "Brandklasse_Bestemmelse.json not found"}, status_code=404)
+def get_brandklasse_model_json(req: Request):
+    """Serve Brandklasse_Bestemmelse.json so frontend can load bygningstype options."""
+    return model_response(req, "brandklasse", "Brandklasse_Bestemmelse.json not found")
 
 
 @app.get("/manual")
-async def serve_manual():
+def serve_manual(req: Request):
     """Serve the manual (guided) BR18 wizard."""
-    no_cache_headers = {
-        "Cache-Control": "no-store, no-cache, must-revalidate, max-age=0",
-        "Pragma": "no-cache",
-        "Expires": "0",
-    }
-    html_path = ROOT_DIR / "frontend" / "br18_full.html"
-    if html_path.exists():
-        return FileResponse(str(html_path), media_type="text/html", headers=no_cache_headers)
-    return JSONResponse({"error": "Manual frontend not found"}, status_code=404)
+    return asset_response(req, FRONTEND_DIR / "br18_full.html", media_type="text/html", not_found="Manual frontend not found")
 
 
 @app.get("/br18_full.html")
-async def serve_manual_html():
+def serve_manual_html(req: Request):
     """Serve manual wizard by filename for static-like navigation."""
-    no_cache_headers = {
-        "Cache-Control": "no-store, no-cache, must-revalidate, max-age=0",
-        "Pragma": "no-cache",
-        "Expires": "0",
-    }
-    html_path = ROOT_DIR / "frontend" / "br18_full.html"
-    if html_path.exists():
-        return FileResponse(str(html_path), media_type="text/html", headers=no_cache_headers)
-    return JSONResponse({"error": "br18_full.html not found"}, status_code=404)
+    return asset_response(req, FRONTEND_DIR / "br18_full.html", media_type="text/html", not_found="br18_full.html not found")
 
 @app.get("/style.css")
-async def serve_css():
-    no_cache_headers = {
-        "Cache-Control": "no-store, no-cache, must-revalidate, max-age=0",
-        "Pragma": "no-cache",
-        "Expires": "0",
-    }
-    css_path = ROOT_DIR / "frontend" / "style.css"
-    if css_path.exists():
-        return FileResponse(str(css_path), media_type="text/css", headers=no_cache_headers)
-    return JSONResponse({"error": "CSS not found"}, status_code=404)
+def serve_css(req: Request):
+    return asset_response(req, FRONTEND_DIR / "style.css", media_type="text/css", not_found="CSS not found")
 
 
 @app.get("/theme.css")
-async def serve_theme_css():
-    no_cache_headers = {
-        "Cache-Control": "no-store, no-cache, must-revalidate, max-age=0",
-        "Pragma": "no-cache",
-        "Expires": "0",
-    }
-    css_path = ROOT_DIR / "frontend" / "theme.css"
-    if css_path.exists():
-        return FileResponse(str(css_path), media_type="text/css", headers=no_cache_headers)
-    return JSONResponse({"error": "theme.css not found"}, status_code=404)
+def serve_theme_css(req: Request):
+    return asset_response(req, FRONTEND_DIR / "theme.css", media_type="text/css", not_found="theme.css not found")
 
 
 @app.get("/validation/validation.json")
-async def serve_validation_json():
+def serve_validation_json(req: Request):
     """Serve frontend/validation/validation.json so the validation modal can load persisted validations."""
-    no_cache_headers = {
-        "Cache-Control": "no-store, no-cache, must-revalidate, max-age=0",
-        "Pragma": "no-cache",
-        "Expires": "0",
-    }
-    validation_path = ROOT_DIR / "frontend" / "validation" / "validation.json"
-    if validation_path.exists():
-        return FileResponse(str(validation_path), media_type="application/json", headers=no_cache_headers)
-    return JSONResponse({"error": "validation.json not found"}, status_code=404)
+    # Persisted validations are edited while the app runs: keep this one out of every cache.
+    return asset_response(
+        req,
+        FRONTEND_DIR / "validation" / "validation.json",
+        media_type="application/json",
+        no_store=True,
+        not_found="validation.json not found",
+    )
 
 
 @app.get("/assets/{asset_path:path}")
-async def serve_assets(asset_path: str):
+def serve_assets(req: Request, asset_path: str):
     """Serve static assets from frontend/assets (figures, tables, images)."""
-    no_cache_headers = {
-        "Cache-Control": "no-store, no-cache, must-revalidate, max-age=0",
-        "Pragma": "no-cache",
-        "Expires": "0",
-    }
-
-    assets_dir = (ROOT_DIR / "frontend" / "assets").resolve()
+    assets_dir = (FRONTEND_DIR / "assets").resolve()
     requested = (assets_dir / asset_path).resolve()
 
     # Ensure requested path stays within assets_dir
     if assets_dir not in requested.parents and requested != assets_dir:
         return JSONResponse({"error": "Invalid asset path"}, status_code=400)
 
-    if requested.exists() and requested.is_file():
-        # Let browser infer type; FileResponse will set content-type based on filename when possible.
-        return FileResponse(str(requested), headers=no_cache_headers)
-
-    return JSONResponse({"error": "Asset not found"}, status_code=404)
+    # Media type is inferred from the filename.
+    return asset_response(req, requested, not_found="Asset not found")
 
 
 @app.get("/bilag/{bilag_id}.html")
-async def serve_bilag_template(bilag_id: str):
+def serve_bilag_template(req: Request, bilag_id: str):
     """Serve bilag-specific HTML templates (frontend/bilag/<id>.html)."""
-    no_cache_headers = {
-        "Cache-Control": "no-store, no-cache, must-revalidate, max-age=0",
-        "Pragma": "no-cache",
-        "Expires": "0",
-    }
     # Basic safety: only allow digits
     if not bilag_id.isdigit():
         return JSONResponse({"error": "Invalid bilag id"}, status_code=400)
-    html_path = ROOT_DIR / "frontend" / "bilag" / f"{bilag_id}.html"
-    if html_path.exists():
-        return FileResponse(str(html_path), media_type="text/html", headers=no_cache_headers)
-    return JSONResponse({"error": "Bilag template not found"}, status_code=404)
+    html_path = FRONTEND_DIR / "bilag" / f"{bilag_id}.html"
+    return asset_response(req, html_path, media_type="text/html", not_found="Bilag template not found")
 
 @app.get("/Krav.json")
-async def serve_krav():
-    json_path = ROOT_DIR / "Krav.json"
-    if json_path.exists():
-        return FileResponse(str(json_path), media_type="application/json")
-    return JSONResponse({"error": "Krav.json not found"}, status_code=404)
+def serve_krav(req: Request):
+    return model_response(req, "krav", "Krav.json not found")
 
 @app.get("/favicon.ico")
 async def serve_favicon():
@@ -0,0 +1,186 @@
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+# ==============================================================
+# sessions.py – evalueringssessioner med delta-opdateringer
+#
+# Serveren holder det kanoniske input for hver session samt den seneste
+# evalueringstilstand (node-resultater og diagnostik). En opdatering sender kun
+# de ændrede felter (JSON merge patch: null fjerner et felt), kun det berørte
+# genberegnes, og svaret indeholder kun de resultatfelter, der er ændret.
+# Inaktive sessioner fjernes efter idle_ttl, og både antallet og den samlede
+# (omtrentlige) størrelse i bytes er begrænset; de mindst brugte fjernes først (LRU).
+# ==============================================================
+
+
+class EvaluationSession:
+    """Canonical inputs and the latest evaluation state of one client."""
+
+    __slots__ = ("id", "inputs", "state", "revision", "created_at", "last_access", "lock", "size")
+
+    def __init__(self, session_id, inputs, state):
+        self.id = session_id
+        self.inputs = inputs
+        self.state = state  # whatever the store's evaluate returned; .result is the response
+        self.revision = 0
+        self.created_at = time.time()
+        self.last_access = time.monotonic()
+        self.lock = threading.Lock()
+        self.size = 0  # approximate bytes, kept up to date by the store
+
+    @property
+    def result(self):
+        return self.state.result
+
+
+def apply_patch(inputs: dict, patch: dict):
+    """Apply a merge patch to a copy of inputs. Returns (new inputs, names of changed fields)."""
+    updated = dict(inputs)
+    changed = []
+    for field, value in patch.items():
+        if value is None:
+            if field in updated:
+                del updated[field]
+                changed.append(field)
+        elif field not in updated or type(updated[field]) is not type(value) or updated[field] != value:
+            updated[field] = value
+            changed.append(field)
+    return updated, changed
+
+
+def approx_size(session: EvaluationSession) -> int:
+    """Approximate memory of a session: the serialized size of its inputs and result.
+
+    The node results kept for incremental updates are derived from the same values, so they
+    grow with these; a full object walk would cost about as much as the update itself.
+    """
+    return (
+        len(json.dumps(session.inputs, ensure_ascii=False, default=str))
+        + len(json.dumps(session.result, ensure_ascii=False, default=str))
+    )
+
+
+def diff_result(old: dict, new: dict):
+    """Top-level result keys whose value changed: ({key: new value}, [removed keys])."""
+    changed = {key: value for key, value in new.items() if key not in old or old[key] != value}
+    removed = [key for key in old if key not in new]
+    return changed, removed
+
+
+class SessionStore:
+    """Evaluation sessions with idle eviction and caps on the number and size kept in memory.
+
+    evaluate(inputs, previous_state, changed_fields) must return a state object with a
+    `result` attribute; previous_state is None for the first evaluation of a session.
+    max_bytes caps the sum of size_of(session) (default approx_size); None disables it.
+    Above either cap the least recently used sessions are evicted, never the one just used.
+    """
+
+    def __init__(self, evaluate, max_sessions: int = 1000, idle_ttl: float | None = 1800.0,
+                 max_bytes: int | None = 64 * 1024 * 1024, size_of=approx_size):
+        self._evaluate = evaluate
+        self.max_sessions = max(1, int(max_sessions))
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self._size_of = size_of
+        self._sessions = OrderedDict()  # id -> EvaluationSession, least recently used first
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.created = 0
+        self.evictions = 0
+
+    def create(self, inputs: dict | None = None) -> EvaluationSession:
+        inputs = dict(inputs or {})
+        session = EvaluationSession(secrets.token_urlsafe(16), inputs, self._evaluate(inputs, None, None))
+        session.size = self._size_of(session)
+        with self._lock:
+            self._evict_idle(time.monotonic())
+            self._sessions[session.id] = session
+            self.total_bytes += session.size
+            self.created += 1
+            self._evict_over_caps()
+        return session
+
+    def get(self, session_id: str) -> EvaluationSession | None:
+        """The session (marked as used), or None if unknown or evicted."""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if self.idle_ttl and now - session.last_access > self.idle_ttl:
+                self._remove(session_id)
+                self.evictions += 1
+                return None
+            session.last_access = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def update(self, session_id: str, patch: dict):
+        """Apply a merge patch and re-evaluate. Returns (session, changed result, removed keys) or None."""
+        session = self.get(session_id)
+        if session is None:
+            return None
+        with session.lock:
+            inputs, changed_fields = apply_patch(session.inputs, patch)
+            if not changed_fields:
+                return session, {}, []
+            old = session.result
+            session.state = self._evaluate(inputs, session.state, changed_fields)
+            session.inputs = inputs
+            session.revision += 1
+            changed, removed = diff_result(old, session.result)
+            size = self._size_of(session)
+            with self._lock:
+                if self._sessions.get(session_id) is session:
+                    self.total_bytes += size - session.size
+                    self._sessions.move_to_end(session_id)
+                    self._evict_over_caps()
+                session.size = size
+        return session, changed, removed
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._remove(session_id) is not None
+
+    def _remove(self, session_id):
+        # Caller holds self._lock.
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self.total_bytes -= session.size
+        return session
+
+    def _evict_over_caps(self):
+        # Caller holds self._lock. The most recently used session is always kept.
+        while len(self._sessions) > 1 and (
+            len(self._sessions) > self.max_sessions
+            or (self.max_bytes is not None and self.total_bytes > self.max_bytes)
+        ):
+            self._remove(next(iter(self._sessions)))
+            self.evictions += 1
+
+    def _evict_idle(self, now):
+        # Caller holds self._lock. Sessions are in access order, so stop at the first live one.
+        if not self.idle_ttl:
+            return
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_access <= self.idle_ttl:
+                break
+            self._remove(session.id)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "idle_ttl": self.idle_ttl,
+                "created": self.created,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,224 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import stat as stat_module
+import threading
+import time
+
+from fastapi import Request
+from fastapi.responses import FileResponse, JSONResponse, Response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+# ==============================================================
+# static_assets.py – cachebar servering af frontend-filer
+#
+# Hver fil får en indholds-hash (stærk ETag), som beregnes første gang filen
+# serveres og igen når mtime/størrelse ændres (tjekkes højst én gang pr.
+# CHECK_INTERVAL). If-None-Match besvares med 304. Tekstfiler komprimeres én
+# gang (gzip, og brotli hvis `pip install brotli`) og holdes i hukommelsen.
+# no-store er nu et valg pr. route i stedet for standard.
+# ==============================================================
+
+NO_STORE_HEADERS = {
+    "Cache-Control": "no-store, no-cache, must-revalidate, max-age=0",
+    "Pragma": "no-cache",
+    "Expires": "0",
+}
+
+# Default for assets without a content hash in the URL: the browser may keep them,
+# but must revalidate (a cheap 304 when nothing changed).
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+CHECK_INTERVAL = 1.0  # seconds between stat() checks of an already hashed file
+MAX_INLINE_BYTES = 4 * 1024 * 1024  # larger files are streamed from disk
+MIN_COMPRESS_BYTES = 1024
+
+_COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+
+
+def _is_compressible(media_type: str) -> bool:
+    return bool(media_type) and media_type.startswith(_COMPRESSIBLE_TYPES)
+
+
+class StaticAsset:
+    """Content hash, bytes and precompressed variants of one file version."""
+
+    __slots__ = ("path", "stat", "media_type", "etag", "content", "variants", "checked_at")
+
+    def __init__(self, path, stat, media_type, etag, content, variants):
+        self.path = path
+        self.stat = stat  # (mtime_ns, size)
+        self.media_type = media_type
+        self.etag = etag  # strong ETag of the identity representation, quoted
+        self.content = content  # bytes, or None when streamed from disk
+        self.variants = variants  # {"br"/"gzip": (etag, bytes)}
+        self.checked_at = time.monotonic()
+
+    def etags(self):
+        return {self.etag, *(etag for etag, _ in self.variants.values())}
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _load_asset(path, stat, media_type):
+    content = None
+    variants = {}
+    if stat[1] <= MAX_INLINE_BYTES:
+        with open(path, "rb") as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+        if len(content) >= MIN_COMPRESS_BYTES and _is_compressible(media_type):
+            if brotli is not None:
+                variants["br"] = (f'"{digest[:32]}-br"', brotli.compress(content, quality=11))
+            variants["gzip"] = (f'"{digest[:32]}-gz"', gzip.compress(content, compresslevel=9, mtime=0))
+    else:
+        digest = _hash_file(path)
+    return StaticAsset(path, stat, media_type, f'"{digest[:32]}"', content, variants)
+
+
+class AssetStore:
+    """Hashed (and precompressed) static files, refreshed when they change on disk."""
+
+    def __init__(self, check_interval: float = CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._assets = {}
+        self._lock = threading.Lock()
+
+    def get(self, path, media_type=None):
+        """StaticAsset for path, or None if it isn't a file."""
+        path = str(path)
+        asset = self._assets.get(path)
+        now = time.monotonic()
+        if asset is not None and now - asset.checked_at < self.check_interval:
+            return asset
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._assets.pop(path, None)
+            return None
+        if not stat_module.S_ISREG(st.st_mode):
+            return None
+        stat = (st.st_mtime_ns, st.st_size)
+        if asset is not None and asset.stat == stat:
+            asset.checked_at = now
+            return asset
+        with self._lock:
+            media_type = media_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+            asset = _load_asset(path, stat, media_type)
+            self._assets[path] = asset
+        return asset
+
+    def preload(self, paths):
+        """Hash/compress files up front (e.g. at startup) so the first request doesn't pay for it."""
+        for path in paths:
+            try:
+                self.get(path)
+            except OSError:
+                pass
+
+
+def _etag_matches(if_none_match: str, etags) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag in etags:
+            return True
+    return False
+
+
+def _accepted_encodings(accept_encoding: str):
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(name)
+    return accepted
+
+
+def serve_bytes(request: Request, content: bytes, etag: str, media_type: str, variants=None,
+                cache_control: str = REVALIDATE_CACHE_CONTROL, headers=None):
+    """Response for an in-memory representation with ETag/304 and content negotiation.
+
+    variants: {"br"/"gzip": (etag, bytes)} precompressed forms of content.
+    """
+    variants = variants or {}
+    base_headers = {"Cache-Control": cache_control}
+    if variants:
+        base_headers["Vary"] = "Accept-Encoding"
+    if headers:
+        base_headers.update(headers)
+
+    encoding = None
+    if variants:
+        accepted = _accepted_encodings(request.headers.get("accept-encoding"))
+        for name in ("br", "gzip"):
+            if name in variants and name in accepted:
+                encoding = name
+                break
+
+    chosen_etag, body = variants[encoding] if encoding else (etag, content)
+    all_etags = {etag, *(tag for tag, _ in variants.values())}
+    if _etag_matches(request.headers.get("if-none-match"), all_etags):
+        return Response(status_code=304, headers={**base_headers, "ETag": chosen_etag})
+
+    response_headers = {**base_headers, "ETag": chosen_etag}
+    if encoding:
+        response_headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=response_headers)
+
+
+_STORE = AssetStore()
+
+
+def asset_response(request: Request, path, media_type=None, no_store: bool = False,
+                   cache_control: str = REVALIDATE_CACHE_CONTROL, not_found: str = "File not found"):
+    """Serve a file with a strong ETag, 304 revalidation and precompressed variants.
+
+    no_store=True keeps the old behaviour for routes that must never be cached.
+    """
+    asset = _STORE.get(path, media_type)
+    if asset is None:
+        return JSONResponse({"error": not_found}, status_code=404)
+    if no_store:
+        return FileResponse(asset.path, media_type=asset.media_type, headers=NO_STORE_HEADERS)
+    if asset.content is None:
+        # Too large to keep in memory: stream it, but still allow revalidation.
+        if _etag_matches(request.headers.get("if-none-match"), asset.etags()):
+            return Response(status_code=304, headers={"ETag": asset.etag, "Cache-Control": cache_control})
+        return FileResponse(
+            asset.path,
+            media_type=asset.media_type,
+            headers={"ETag": asset.etag, "Cache-Control": cache_control},
+        )
+    return serve_bytes(request, asset.content, asset.etag, asset.media_type, asset.variants, cache_control)
+
+
+def preload_assets(paths):
+    _STORE.preload(paths)
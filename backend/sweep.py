@@ -0,0 +1,173 @@
+import math
+
+# ==============================================================
+# sweep.py – hvordan ændrer resultatet sig, når ét eller to talfelter varieres?
+#
+# Alle talceller i tabellerne er tærskler, så flowets resultat er stykvis
+# konstant i hvert talfelt: det kan kun skifte ved en tærskel, som en celle på
+# feltet sammenligner med. Et interval deles derfor i stykker ved de tærskler,
+# der ligger inden for det (selve tærsklen er sit eget stykke, da <= og < skiller
+# der), og hvert stykke evalueres én gang med en repræsentativ værdi. Nabostykker
+# med samme resultat slås sammen til intervaller – eller, ved to felter, til
+# rektangler. Antallet af evalueringer afhænger af antallet af tærskler, ikke af
+# hvor fint intervallet ville skulle samples.
+# ==============================================================
+
+
+class SweepError(ValueError):
+    pass
+
+
+def field_breakpoints(compiled, field: str) -> list:
+    """Sorted values where some decision table's cells on the field can change outcome.
+
+    Threshold cells change at their threshold; list cells such as '2, 3' match numbers
+    spelled exactly like an item, so those numbers are breakpoints too.
+    """
+    points = set()
+    for table in compiled.tables.values():
+        if field not in table.inputs_map:
+            continue
+        for crule in table.rules:
+            for cond in crule.conditions:
+                if cond.field != field:
+                    continue
+                if cond.is_threshold:
+                    points.add(cond.threshold)
+                elif cond.choices:
+                    for choice in cond.choices:
+                        try:
+                            number = float(choice)
+                        except ValueError:
+                            continue
+                        if math.isfinite(number):
+                            points.add(number)
+    return sorted(points)
+
+
+def _number(value):
+    return int(value) if float(value).is_integer() else value
+
+
+def pieces(low, high, breakpoints) -> list:
+    """Split [low, high] at the breakpoints inside it.
+
+    Returns (from, to, from_inclusive, to_inclusive, representative) tuples in order:
+    each boundary as a single point and the open interval between neighbouring boundaries.
+    """
+    if low == high:
+        return [(low, high, True, True, _number(low))]
+    bounds = [low] + [p for p in breakpoints if low < p < high] + [high]
+    out = []
+    for i, x in enumerate(bounds):
+        out.append((x, x, True, True, _number(x)))
+        if i + 1 < len(bounds):
+            nxt = bounds[i + 1]
+            out.append((x, nxt, False, False, _number((x + nxt) / 2.0)))
+    return out
+
+
+def _interval(first, last):
+    """Interval spanning pieces first..last."""
+    return {
+        "from": _number(first[0]),
+        "to": _number(last[1]),
+        "from_inclusive": first[2],
+        "to_inclusive": last[3],
+    }
+
+
+def merge_intervals(piece_list, outputs) -> list:
+    """[(first piece index, last piece index, outputs)] for runs of equal outputs."""
+    runs = []
+    start = 0
+    for i in range(1, len(piece_list) + 1):
+        if i == len(piece_list) or outputs[i] != outputs[start]:
+            runs.append((start, i - 1, outputs[start]))
+            start = i
+    return runs
+
+
+def sweep_regions(fields, piece_lists, evaluate) -> tuple:
+    """Evaluate every piece (or pair of pieces) and merge equal neighbours.
+
+    evaluate(values) gets {field: representative} for each piece/cell, in row-major order
+    (the first field varies fastest), and returns the outputs dict of that cell.
+    Returns (regions, number of evaluations).
+    """
+    if len(fields) == 1:
+        (field,), (plist,) = fields, piece_lists
+        outputs = [evaluate({field: piece[4]}) for piece in plist]
+        regions = [
+            {field: _interval(plist[a], plist[b]), "outputs": out}
+            for a, b, out in merge_intervals(plist, outputs)
+        ]
+        return regions, len(plist)
+
+    (fx, fy), (xs, ys) = fields, piece_lists
+    regions = []
+    open_rects = {}  # (x run start, x run end, outputs key) -> [y start, y end, outputs], for runs in the previous row
+    for j, ypiece in enumerate(ys):
+        row = [evaluate({fx: xpiece[4], fy: ypiece[4]}) for xpiece in xs]
+        seen = set()
+        for a, b, out in merge_intervals(xs, row):
+            key = (a, b, _freeze(out))
+            seen.add(key)
+            rect = open_rects.get(key)
+            if rect is None:
+                open_rects[key] = [j, j, out]
+            else:
+                rect[1] = j  # same x-run with the same outputs as the row below: grow upwards
+        for key in [k for k in open_rects if k not in seen]:
+            regions.append(_rectangle(fx, fy, xs, ys, key, open_rects.pop(key)))
+    for key, rect in open_rects.items():
+        regions.append(_rectangle(fx, fy, xs, ys, key, rect))
+    regions.sort(key=lambda r: (r["_y"], r["_x"]))
+    for region in regions:
+        del region["_x"], region["_y"]
+    return regions, len(xs) * len(ys)
+
+
+def _rectangle(fx, fy, xs, ys, key, rect):
+    a, b, _out = key
+    return {
+        fx: _interval(xs[a], xs[b]),
+        fy: _interval(ys[rect[0]], ys[rect[1]]),
+        "outputs": rect[2],
+        "_x": a,
+        "_y": rect[0],
+    }
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def parse_ranges(ranges, numeric_fields) -> list:
+    """[(field, low, high)] from [{"field", "from", "to"}, ...] (one or two ranges).
+
+    numeric_fields are the input fields that may be swept; raises SweepError otherwise.
+    """
+    if not isinstance(ranges, list) or not 1 <= len(ranges) <= 2:
+        raise SweepError("'ranges' skal være en liste med ét eller to intervaller")
+    parsed = []
+    for item in ranges:
+        if not isinstance(item, dict):
+            raise SweepError("Hvert interval skal være et objekt med field/from/to")
+        field = item.get("field")
+        if field not in numeric_fields:
+            raise SweepError(f"Ukendt eller ikke-numerisk felt: {field}")
+        try:
+            low, high = float(item["from"]), float(item["to"])
+        except (KeyError, TypeError, ValueError):
+            raise SweepError(f"'from' og 'to' for {field} skal være tal")
+        if not (math.isfinite(low) and math.isfinite(high)) or low > high:
+            raise SweepError(f"Ugyldigt interval for {field}: {item.get('from')}..{item.get('to')}")
+        if any(field == f for f, _low, _high in parsed):
+            raise SweepError(f"{field} er angivet to gange")
+        parsed.append((field, low, high))
+    return parsed
@@ -0,0 +1,279 @@
+# ==============================================================
+# vectorized.py – kolonnebaseret (NumPy) evaluering af Brandklasse-kæden
+#
+# Evaluerer AK -> RK -> Relevant bilag -> BK for N input-rækker på én gang.
+# Hver regelcelle evalueres som en boolsk maske over alle rækker, og first-hit
+# vælges pr. række. Resultaterne er de samme som evaluate_complete_flow giver
+# for de enkelte rækker (kun selve værdierne, ikke diagnostik/forslag).
+#
+# NumPy er en valgfri afhængighed: pip install numpy
+# ==============================================================
+
+from logic import (
+    _parse_first_int,
+    _parse_relevant_bilag_token,
+    get_compiled_model,
+    get_compiled_table,
+)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+def _as_array(values):
+    """Convert a column to an ndarray without letting NumPy coerce mixed Python types."""
+    if isinstance(values, np.ndarray):
+        return values
+    values = list(values)
+    types = {type(v) for v in values}
+    if types and types <= {bool}:
+        return np.array(values, dtype=bool)
+    if types and (types <= {int} or types <= {float}):
+        return np.array(values)
+    if types and types <= {str}:
+        return np.array(values, dtype=str)
+    arr = np.empty(len(values), dtype=object)
+    arr[:] = values
+    return arr
+
+
+class _Column:
+    """One input column: values plus a per-row 'present' mask (masked entries count as missing)."""
+
+    def __init__(self, values, present=None):
+        if np.ma.isMaskedArray(values):
+            mask = np.ma.getmaskarray(values)
+            present = ~mask if present is None else present & ~mask
+            values = values.data
+        values = _as_array(values)
+        if values.dtype.kind not in "biufUO":
+            values = values.astype(object)
+        self.values = values
+        self.present = np.ones(len(values), dtype=bool) if present is None else present
+        self._factorized = None
+
+    @property
+    def kind(self):
+        k = self.values.dtype.kind
+        if k == "b":
+            return "bool"
+        if k in "iuf":
+            return "number"
+        if k == "U":
+            return "text"
+        return "object"
+
+    def factorize(self):
+        """Return (unique values, inverse codes) for text/object columns, cached."""
+        if self._factorized is None:
+            if self.kind == "text":
+                uniq, inverse = np.unique(self.values, return_inverse=True)
+                self._factorized = (list(uniq.tolist()), inverse)
+            else:
+                codes = {}
+                uniq = []
+                inverse = np.empty(len(self.values), dtype=np.int64)
+                for i, v in enumerate(self.values.tolist()):
+                    key = (type(v), v)
+                    code = codes.get(key)
+                    if code is None:
+                        code = codes[key] = len(uniq)
+                        uniq.append(v)
+                    inverse[i] = code
+                self._factorized = (uniq, inverse)
+        return self._factorized
+
+
+def _condition_mask(cond, column):
+    """Vectorized CellCondition over a column (False where the field is missing)."""
+    if column is None:
+        return None
+    kind = column.kind
+    values = column.values
+    if kind == "bool":
+        mask = np.where(values, cond.accepts_true, cond.accepts_false)
+    elif kind == "number":
+        op = cond.op
+        if op == "<=":
+            mask = values <= cond.threshold
+        elif op == ">=":
+            mask = values >= cond.threshold
+        elif op == "<":
+            mask = values < cond.threshold
+        elif op == ">":
+            mask = values > cond.threshold
+        elif op == "==":
+            mask = values.astype(float) == cond.threshold
+        else:
+            # Option lists compare str(value), which differs for ints and floats: do it per row.
+            mask = np.fromiter((cond.match_number(v) for v in values.tolist()), dtype=bool, count=len(values))
+    else:
+        try:
+            uniq, inverse = column.factorize()
+            lut = np.array([cond(v) for v in uniq], dtype=bool)
+            mask = lut[inverse] if len(uniq) else np.zeros(len(values), dtype=bool)
+        except TypeError:
+            # Unhashable values (lists/dicts): evaluate row by row.
+            mask = np.fromiter((cond(v) for v in values.tolist()), dtype=bool, count=len(values))
+    return mask & column.present
+
+
+def _first_hit(table, columns, active):
+    """Return the index of the first matching rule per row (-1 when no rule matches)."""
+    n = len(active)
+    chosen = np.full(n, -1, dtype=np.int64)
+    remaining = active.copy()
+    masks = {}
+    for crule in table.rules:
+        if not remaining.any():
+            break
+        m = remaining.copy()
+        for cond in crule.conditions:
+            key = (cond.field, cond.expected)
+            cm = masks.get(key)
+            if cm is None:
+                cm = _condition_mask(cond, columns.get(cond.field))
+                if cm is None:
+                    cm = np.zeros(n, dtype=bool)
+                masks[key] = cm
+            m &= cm
+            if not m.any():
+                break
+        chosen[m] = crule.index
+        remaining &= ~m
+    return chosen
+
+
+def _rule_outputs(table, chosen, parse):
+    """Map chosen rule indices to parsed output values (object array, None where unmatched)."""
+    out = np.full(len(chosen), None, dtype=object)
+    for crule in table.rules:
+        rows = chosen == crule.index
+        if rows.any():
+            out[rows] = parse(crule.result)
+    return out
+
+
+def _derived_column(values, rows):
+    """Build an input column from the output of a previous node (present only on rows)."""
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in values[rows].tolist()):
+        ints = np.zeros(len(values), dtype=np.int64)
+        ints[rows] = values[rows].astype(np.int64)
+        return _Column(ints, present=rows.copy())
+    return _Column(values, present=rows.copy())
+
+
+def _to_columns(data):
+    """Accept a dict of arrays/lists or a (masked) structured NumPy array."""
+    if np is None:
+        raise RuntimeError("NumPy er ikke installeret (pip install numpy)")
+    if isinstance(data, np.ndarray) and data.dtype.names:
+        data = {name: data[name] for name in data.dtype.names}
+    if not isinstance(data, dict):
+        raise TypeError("Forventede en dict af kolonner eller et struktureret NumPy-array")
+
+    columns = {field: _Column(values) for field, values in data.items()}
+    lengths = {len(c.values) for c in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError("Alle kolonner skal have samme længde")
+    n = lengths.pop() if lengths else 0
+
+    # Samme aliasing/normalisering som evaluate_complete_flow
+    if "fritliggende_BA" not in columns and "fritstaaende" in columns:
+        columns["fritliggende_BA"] = columns["fritstaaende"]
+    if "med_tilbygning" not in columns and "tilbygning" in columns:
+        columns["med_tilbygning"] = columns["tilbygning"]
+    byg = columns.get("bygningstype")
+    if byg is not None:
+        if byg.kind == "text":
+            values = np.char.lower(np.char.strip(byg.values))
+        else:
+            values = np.empty(len(byg.values), dtype=object)
+            values[:] = [v.strip().lower() if isinstance(v, str) else v for v in byg.values.tolist()]
+        columns["bygningstype"] = _Column(values, present=byg.present)
+    return columns, n
+
+
+def evaluate_complete_flow_columnar(data):
+    """Evaluate AK -> RK -> relevant bilag -> BK for all rows of a columnar input.
+
+    Args:
+        data: dict {field: array/list} or a structured NumPy array. Masked entries
+              (numpy.ma) are treated as missing fields for that row.
+
+    Returns:
+        dict of arrays (length N):
+          success, anvendelseskategori, risikoklasse, relevant_bilag, brandklasse
+          (object arrays, None where undetermined) and <step>_rule_index (int, -1 = no match).
+    """
+    columns, n = _to_columns(data)
+    flow_nodes = get_compiled_model().flow_nodes()
+
+    out = {"success": np.ones(n, dtype=bool)}
+    active = np.ones(n, dtype=bool)
+
+    # Step 1 + 2: Anvendelseskategori og Risikoklasse (stop pr. række ved manglende match)
+    for step, node_key in (("anvendelseskategori", "ak"), ("risikoklasse", "rk")):
+        node = flow_nodes[node_key]
+        values = np.full(n, None, dtype=object)
+        chosen = np.full(n, -1, dtype=np.int64)
+        if node:
+            table = get_compiled_table(node)
+            chosen = _first_hit(table, columns, active)
+            values = _rule_outputs(
+                table,
+                chosen,
+                lambda r: _parse_first_int(r.get("value")) if r.get("value") is not None else None,
+            )
+            matched = chosen >= 0
+            out["success"] &= ~(active & ~matched)
+            active &= matched
+            columns[step] = _derived_column(values, active)
+        out[step] = np.where(active, values, None)
+        out[f"{step}_rule_index"] = np.where(active, chosen, -1)
+
+    # Step 3: Relevant bilag (optional – BK evalueres også uden match)
+    bilag_node = flow_nodes["bilag"]
+    bilag_values = np.full(n, None, dtype=object)
+    bilag_chosen = np.full(n, -1, dtype=np.int64)
+    if bilag_node:
+        table = get_compiled_table(bilag_node)
+        bilag_chosen = _first_hit(table, columns, active)
+
+        def _bilag(r):
+            raw = r.get("relevant_bilag")
+            if raw is None:
+                raw = r.get("value")
+            return _parse_relevant_bilag_token(raw) if raw is not None else None
+
+        bilag_values = _rule_outputs(table, bilag_chosen, _bilag)
+        matched = bilag_chosen >= 0
+        previous = columns.get("relevant_bilag")
+        merged = np.full(n, None, dtype=object)
+        present = matched.copy()
+        if previous is not None:
+            merged[:] = previous.values.astype(object)
+            present |= previous.present
+        merged[matched] = bilag_values[matched]
+        columns["relevant_bilag"] = _Column(merged, present=present)
+    out["relevant_bilag"] = bilag_values
+    out["relevant_bilag_rule_index"] = bilag_chosen
+
+    # Step 4: Brandklasse
+    bk_node = flow_nodes["bk"]
+    bk_values = np.full(n, None, dtype=object)
+    bk_chosen = np.full(n, -1, dtype=np.int64)
+    if bk_node:
+        table = get_compiled_table(bk_node)
+        bk_chosen = _first_hit(table, columns, active)
+        bk_values = _rule_outputs(
+            table,
+            bk_chosen,
+            lambda r: _parse_first_int(r.get("brandklasse")) if r.get("brandklasse") is not None else None,
+        )
+        out["success"] &= ~(active & (bk_chosen < 0))
+    out["brandklasse"] = bk_values
+    out["brandklasse_rule_index"] = bk_chosen
+    return out
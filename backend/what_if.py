@@ -0,0 +1,393 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# ==============================================================
+# what_if.py – hvilke inputændringer giver et andet resultat længere nede i flowet?
+#
+# diagnose_optimization_suggestions_for_node ser kun på én node ad gangen. Her
+# søges der over hele kæden AK → RK → bilag → BK: for måltabellen vælges en
+# regel med det ønskede output, og reglens celler bliver krav – celler på
+# brugerens inputfelter bliver betingelser på feltet, celler på afledte felter
+# (anvendelseskategori, risikoklasse, relevant_bilag) bliver delmål for den
+# tabel, der producerer feltet. Søgningen er branch-and-bound: antallet af felter,
+# som de valgte reglers celler tvinger til at ændre sig, kan kun vokse, så en gren
+# opgives, så snart det overstiger det bedste fundne (eller max_changes).
+# Hver fuld plan kontrolleres med en rigtig evaluering; rammer en tidligere regel
+# først (first hit), tilføjes krav om at den ikke må matche. Søgningen stopper
+# ved tidsbudgettet, og måltabellens regler afsøges parallelt.
+# ==============================================================
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def _get_pool(max_workers: int):
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            # Separate from the graph executor's pool: searches wait on evaluations, not on each other.
+            _POOL = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="what-if")
+        return _POOL
+
+
+_MISSING = object()
+
+
+class _Timeout(Exception):
+    pass
+
+
+def _holds(cond, want: bool, inputs: dict, field: str) -> bool:
+    """Would the cell's match on inputs[field] be `want` (a missing field never matches a cell)?"""
+    if field not in inputs:
+        return not want
+    try:
+        return bool(cond(inputs[field])) == want
+    except Exception:
+        return False
+
+
+class _State:
+    """A partial plan: cell requirements per input field, chosen rule per table, open subgoals."""
+
+    __slots__ = ("conds", "chosen", "pending", "changes")
+
+    def __init__(self, conds, chosen, pending, changes):
+        self.conds = conds  # field -> tuple of (CellCondition, wanted outcome)
+        self.chosen = chosen  # node id -> rule index
+        self.pending = pending  # tuple of (node id, accept(values) -> bool)
+        self.changes = changes  # field -> new value, for the fields whose current value fails
+
+
+class WhatIfSearch:
+    """One search for the smallest sets of input changes that make `target` acceptable.
+
+    optimizer: the WhatIfOptimizer of the model version
+    inputs:    prepared flow inputs
+    accept:    predicate on the target field's value
+    """
+
+    def __init__(self, optimizer, inputs, target, accept, max_changes, fixed_fields, limit, deadline):
+        self.opt = optimizer
+        self.inputs = inputs
+        self.target = target
+        self.accept = accept
+        self.max_changes = max_changes
+        self.fixed = frozenset(fixed_fields or ())
+        self.limit = max(1, limit)
+        self.deadline = deadline
+        self.solutions = {}  # frozenset of (field, repr(value)) -> solution
+        self.explored = 0
+        self.complete = True
+        self._lock = threading.Lock()
+        self._values = {}  # (field, conds) -> chosen value or _MISSING
+
+    # -- bounds ---------------------------------------------------------------
+
+    def _bound(self) -> int:
+        """Change count a new plan must not exceed to be worth keeping."""
+        with self._lock:
+            if len(self.solutions) < self.limit:
+                return self.max_changes
+            return max(len(s["changes"]) for s in self.solutions.values())
+
+    def _value_for(self, field, conds):
+        """Closest domain value meeting all cells on the field, or _MISSING if none does."""
+        key = (field, conds)
+        value = self._values.get(key)
+        if value is None:
+            value = _MISSING
+            current = self.inputs.get(field)
+            best = None
+            for candidate in self.opt.candidates(field):
+                probe = {field: candidate}
+                if all(_holds(cond, want, probe, field) for cond, want in conds):
+                    distance = self.opt.distance(current, candidate)
+                    if best is None or distance < best:
+                        best, value = distance, candidate
+            self._values[key] = value
+        return value
+
+    def _require(self, state, node_id, crule, want=True, cells=None):
+        """State with the rule's cells (or only `cells`) required to match (want) / one to fail.
+
+        Returns None when a required value is impossible or would exceed the bound.
+        """
+        opt = self.opt
+        conds = dict(state.conds)
+        pending = list(state.pending)
+        changes = dict(state.changes)
+        for cond in (crule.conditions if cells is None else cells):
+            field = cond.field
+            producer = opt.producers.get(field)
+            if producer is not None:
+                pending.append((producer, _cell_goal(cond, field, want)))
+                continue
+            conds[field] = conds.get(field, ()) + ((cond, want),)
+            if all(_holds(c, w, self.inputs, field) for c, w in conds[field]):
+                changes.pop(field, None)
+            else:
+                value = self._value_for(field, conds[field])
+                if value is _MISSING or field in self.fixed:
+                    return None
+                changes[field] = value
+            if len(changes) > self._bound():
+                return None
+        chosen = state.chosen if node_id is None else {**state.chosen, node_id: crule.index}
+        return _State(conds, chosen, tuple(pending), changes)
+
+    # -- search ---------------------------------------------------------------
+
+    def _tick(self):
+        self.explored += 1
+        if time.monotonic() > self.deadline:
+            raise _Timeout()
+
+    def _rules_for(self, state, node_id, accept):
+        """Rules of the node whose outputs pass accept, cheapest (fewest new changes) first."""
+        opt = self.opt
+        options = []
+        for crule in opt.compiled.tables[node_id].rules:
+            if not accept(opt.rule_values[(node_id, crule.index)]):
+                continue
+            extra = 0
+            for cond in crule.conditions:
+                if cond.field not in opt.producers and cond.field not in state.changes:
+                    if not _holds(cond, True, self.inputs, cond.field):
+                        extra += 1
+            options.append((extra, crule.index, crule))
+        options.sort(key=lambda o: (o[0], o[1]))
+        return [crule for _extra, _index, crule in options]
+
+    def search(self, state):
+        self._tick()
+        if len(state.changes) > self._bound():
+            return
+        if not state.pending:
+            self._verify(state)
+            return
+        (node_id, accept), rest = state.pending[0], state.pending[1:]
+        state = _State(state.conds, state.chosen, rest, state.changes)
+        chosen = state.chosen.get(node_id)
+        if chosen is not None:
+            # The table already has a rule in this plan; its outputs must also pass this goal.
+            if accept(self.opt.rule_values[(node_id, chosen)]):
+                self.search(state)
+            return
+        for crule in self._rules_for(state, node_id, accept):
+            branch = self._require(state, node_id, crule)
+            if branch is not None:
+                self.search(branch)
+
+    def _verify(self, state):
+        """Evaluate the plan's inputs; record a solution or add what blocks the earlier first hit."""
+        opt = self.opt
+        inputs = dict(self.inputs)
+        inputs.update(state.changes)
+        run = opt.run(inputs, self.target)
+        for node_id in opt.order:
+            if node_id not in state.chosen:
+                continue
+            result = run.results.get(node_id)
+            actual = result.get("_matched_rule_index") if isinstance(result, dict) else None
+            wanted = state.chosen[node_id]
+            if actual == wanted:
+                continue
+            if actual is not None and actual < wanted:
+                # An earlier rule wins the first hit: one of its cells must fail as well.
+                blocker = opt.compiled.tables[node_id].rules[actual]
+                for cond in blocker.conditions:
+                    branch = self._require(state, None, blocker, want=False, cells=(cond,))
+                    if branch is not None:
+                        self.search(branch)
+            return
+        result = run.results.get(opt.target_node(self.target))
+        if not isinstance(result, dict) or not self.accept(opt.extract(self.target, result)):
+            return
+        self._record(state, run)
+
+    def _record(self, state, run):
+        opt = self.opt
+        changes = []
+        for field in sorted(state.changes):
+            value = state.changes[field]
+            changes.append({
+                "field": field,
+                "question": opt.questions.get(field, field),
+                "from": self.inputs.get(field),
+                "to": value,
+                # Cells the new value meets; "ikke ..." for cells of an earlier rule it must fail
+                "conditions": [
+                    cond.expected.strip() if want else f"ikke {cond.expected.strip()}"
+                    for cond, want in state.conds.get(field, ())
+                ],
+            })
+        key = frozenset((c["field"], repr(c["to"])) for c in changes)
+        rules = {}
+        for node_id in opt.order:
+            result = run.results.get(node_id)
+            if isinstance(result, dict):
+                rules[opt.compiled.tables[node_id].name] = result.get("_matched_rule_id")
+        solution = {
+            "changes": changes,
+            "delta": round(sum(opt.distance(c["from"], c["to"]) for c in changes), 6),
+            "outputs": opt.reported(run),
+            "rules": rules,
+        }
+        fields = frozenset(c["field"] for c in changes)
+        reached = solution["outputs"].get(self.target)
+        with self._lock:
+            if key in self.solutions:
+                return
+            # Minimal sets only: changing more fields to reach the same target value as another
+            # solution does is dominated by it, whichever of the two was found first.
+            dominated = []
+            for other_key, other in self.solutions.items():
+                if other["outputs"].get(self.target) != reached:
+                    continue
+                other_fields = frozenset(c["field"] for c in other["changes"])
+                if other_fields < fields:
+                    return
+                if fields < other_fields:
+                    dominated.append(other_key)
+            for other_key in dominated:
+                del self.solutions[other_key]
+            self.solutions[key] = solution
+            if len(self.solutions) > self.limit:
+                worst = max(self.solutions, key=lambda k: _rank(self.solutions[k]))
+                del self.solutions[worst]
+
+    def run_branch(self, state):
+        try:
+            self.search(state)
+        except _Timeout:
+            self.complete = False
+
+    def ranked(self):
+        with self._lock:
+            return sorted(self.solutions.values(), key=_rank)
+
+
+def _rank(solution):
+    return (len(solution["changes"]), solution["delta"])
+
+
+def _cell_goal(cond, field, want):
+    def accept(values):
+        if field not in values or values[field] is None:
+            return not want
+        try:
+            return bool(cond(values[field])) == want
+        except Exception:
+            return False
+    return accept
+
+
+class WhatIfOptimizer:
+    """What-if search over one compiled model version.
+
+    forward is the flow's output parsing (see logic._FLOW_FORWARD); outputs maps the output
+    fields reported per suggestion to the same kind of parser (default: the forwarded ones).
+    domains are the input fields' probe values (input_generator.model_domains), used as
+    candidate new values.
+    """
+
+    def __init__(self, compiled, forward, halt_on_miss, domains, outputs=None, max_workers: int = 4):
+        self.compiled = compiled
+        self.forward = forward
+        self.outputs = dict(forward) if outputs is None else outputs
+        self.halt_on_miss = halt_on_miss
+        self.domains = domains
+        self.max_workers = max_workers
+        self.order = [n for n in compiled.topological_order if n in compiled.tables]
+
+        # Forwarded field -> the table producing it (its cells elsewhere become subgoals)
+        self.producers = {}
+        for node_id, table in compiled.tables.items():
+            for field in table.outputs_map:
+                if field in forward:
+                    self.producers.setdefault(field, node_id)
+
+        # (node id, rule index) -> the rule's output values as the flow passes them on
+        self.rule_values = {}
+        for node_id, table in compiled.tables.items():
+            for crule in table.rules:
+                self.rule_values[(node_id, crule.index)] = {
+                    field: self.extract(field, crule.result) for field in table.outputs_map
+                }
+
+        self.questions = {}
+        for table in compiled.tables.values():
+            for field, question in table.field_questions.items():
+                self.questions.setdefault(field, question)
+        self._candidates = {field: tuple(domain.values) for field, domain in domains.items()}
+
+    def extract(self, field, result):
+        extract = self.outputs.get(field) or self.forward.get(field)
+        return extract(result) if extract is not None else result.get(field)
+
+    def reported(self, run) -> dict:
+        """The reported output values of a graph run, in flow order."""
+        values = {}
+        for node_id in self.order:
+            result = run.results.get(node_id)
+            if isinstance(result, dict):
+                for field in self.compiled.tables[node_id].outputs_map:
+                    if field in self.outputs:
+                        values[field] = self.extract(field, result)
+        return values
+
+    def target_node(self, target):
+        for node_id, table in self.compiled.tables.items():
+            if target in table.outputs_map:
+                return node_id
+        return None
+
+    def candidates(self, field):
+        return self._candidates.get(field, ())
+
+    @staticmethod
+    def distance(current, candidate) -> float:
+        """Size of a change: relative for numbers, 1 for anything else."""
+        if isinstance(current, bool) or isinstance(candidate, bool):
+            return 0.0 if current is candidate else 1.0
+        if isinstance(current, (int, float)) and isinstance(candidate, (int, float)):
+            return abs(candidate - current) / max(abs(current), 1.0)
+        return 0.0 if current == candidate else 1.0
+
+    def run(self, inputs, target):
+        return self.compiled.executor.run(
+            inputs, targets=(target,), forward=self.forward, halt_on_miss=self.halt_on_miss, parallel=False
+        )
+
+    def optimize(self, inputs, target, accept, max_changes=3, fixed_fields=None, limit=5,
+                 time_budget=0.25, parallel=True):
+        """Smallest input changes (at most max_changes fields) after which accept(target value) holds.
+
+        Returns (solutions best first, search stats). A search cut off by the time budget
+        reports complete=False; its solutions are the best found so far.
+        """
+        started = time.monotonic()
+        node_id = self.target_node(target)
+        search = WhatIfSearch(self, inputs, target, accept, max_changes, fixed_fields, limit, started + time_budget)
+        root = _State({}, {}, (), {})
+        if node_id is not None:
+            branches = []
+            for crule in search._rules_for(root, node_id, lambda values: accept(values.get(target))):
+                branch = search._require(root, node_id, crule)
+                if branch is not None:
+                    branches.append(branch)
+            if parallel and len(branches) > 1:
+                pool = _get_pool(self.max_workers)
+                for future in [pool.submit(search.run_branch, b) for b in branches]:
+                    future.result()
+            else:
+                for branch in branches:
+                    search.run_branch(branch)
+        stats = {
+            "complete": search.complete,
+            "explored": search.explored,
+            "elapsed_ms": round((time.monotonic() - started) * 1000.0, 3),
+        }
+        return search.ranked(), stats
@@ -0,0 +1,83 @@
+# ==============================================================
+# benchmarks/corpora.py – faste input-korpora til benchmarks
+#
+# input1.json, inputB1.json/inputB11.json (bilag-skabeloner udfyldt fra
+# input1.json), alle bygningsafsnit i Case_Files/Web_Projekt_Gemt.json og
+# syntetiske inputs fra backend/input_generator.py med fast seed, så to
+# kørsler måler det samme: "synthetic" varierer de faste inputs med
+# grænseværdier fra modellerne, "boundary" er ensfordelt over hele domænet.
+# ==============================================================
+
+import json
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def _load_json(name):
+    with open(ROOT_DIR / name, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _fill_template(template: dict, base: dict, **overrides) -> dict:
+    """Base inputs plus the template's fields, taking values from base where it has them."""
+    filled = dict(base)
+    for field, value in template.items():
+        filled[field] = base.get(field, value)
+    filled.update(overrides)
+    return filled
+
+
+def case_file_sections(path="Case_Files/Web_Projekt_Gemt.json"):
+    """Inputs (plus bilag extras) of every bygningsafsnit in a saved web project."""
+    project = _load_json(path)
+    groups = []
+    buildings = (project.get("buildings") or {}).get("buildings") or {}
+    groups.extend(buildings.values())
+    if not buildings and project.get("sections"):
+        groups.append(project["sections"])
+
+    sections = []
+    for group in groups:
+        extras = group.get("bilagExtras") or {}
+        for key, inputs in sorted((group.get("inputs") or {}).items()):
+            if isinstance(inputs, dict):
+                sections.append({**inputs, **(extras.get(key) or {})})
+    return sections
+
+
+def input_generator():
+    """InputGenerator over the field domains of both decision models (see backend/input_generator.py)."""
+    import logic
+    from input_generator import InputGenerator
+
+    return InputGenerator.from_models(
+        logic.get_model_snapshot("brandklasse").compiled, logic.get_model_snapshot("krav").compiled
+    )
+
+
+def synthetic_inputs(count: int = 500, seed: int = 18, base=None, generator=None):
+    """Seeded variations of the fixed corpora, with fields set to threshold-boundary and option values."""
+    base = base if base is not None else [_load_json("input1.json"), *case_file_sections()]
+    generator = generator or input_generator()
+    return list(generator.around(base, count, seed))
+
+
+def boundary_inputs(count: int = 500, seed: int = 18, generator=None):
+    """Seeded uniform rows over the model domains, starting with rows that cover every value."""
+    generator = generator or input_generator()
+    return list(generator.random(count, seed))
+
+
+def load_corpora(synthetic: int = 500, seed: int = 18) -> dict:
+    """{corpus name: [input dict, ...]}."""
+    input1 = _load_json("input1.json")
+    generator = input_generator()
+    return {
+        "input1": [input1],
+        "inputB1": [_fill_template(_load_json("inputB1.json"), input1, Relevant_bilag="1")],
+        "inputB11": [_fill_template(_load_json("inputB11.json"), input1, Relevant_bilag="1.1")],
+        "case_sections": case_file_sections(),
+        "synthetic": synthetic_inputs(synthetic, seed, generator=generator),
+        "boundary": boundary_inputs(synthetic, seed, generator=generator),
+    }
@@ -0,0 +1,239 @@
+# ==============================================================
+# benchmarks/run.py – reproducerbare benchmarks af evalueringsmotoren og API'et
+#
+# Kører offline: funktionerne i logic.py kaldes direkte, og FastAPI-app'en
+# drives in-process gennem en ASGI-testklient (kræver httpx). For hver case
+# rapporteres p50/p95/p99 og ops/sec, og resultatet gemmes som JSON.
+#
+#   python benchmarks/run.py                      # alle cases -> benchmarks/results/latest.json
+#   python benchmarks/run.py --quick --no-http    # hurtig kørsel af motoren
+#   python benchmarks/run.py --compare benchmarks/results/baseline.json
+#
+# Med --compare sammenlignes med en gemt kørsel; cases der er blevet mere end
+# --threshold langsommere (p50 eller p95) markeres, og exit-koden bliver 1.
+# ==============================================================
+
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(ROOT_DIR / "backend"))
+sys.path.insert(0, str(BENCH_DIR))
+
+import logic  # noqa: E402
+from corpora import load_corpora  # noqa: E402
+
+DEFAULT_OUT = BENCH_DIR / "results" / "latest.json"
+DEFAULT_THRESHOLD = 0.15
+
+
+def _percentile(sorted_samples, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(0, min(len(sorted_samples) - 1, math.ceil(q / 100.0 * len(sorted_samples)) - 1))
+    return sorted_samples[rank]
+
+
+def measure(fn, items, iterations: int, warmup: int) -> dict:
+    """Call fn on the items round-robin and summarize the per-call latencies (microseconds)."""
+    count = len(items)
+    for i in range(warmup):
+        fn(items[i % count])
+    samples = []
+    clock = time.perf_counter_ns
+    started = clock()
+    for i in range(iterations):
+        t0 = clock()
+        fn(items[i % count])
+        samples.append(clock() - t0)
+    elapsed = clock() - started
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "items": count,
+        "p50_us": _percentile(samples, 50) / 1000.0,
+        "p95_us": _percentile(samples, 95) / 1000.0,
+        "p99_us": _percentile(samples, 99) / 1000.0,
+        "mean_us": sum(samples) / len(samples) / 1000.0,
+        "ops_per_sec": iterations / (elapsed / 1e9) if elapsed else 0.0,
+    }
+
+
+def engine_cases(corpora):
+    """(name, fn, items) for the evaluation functions.
+
+    The *_uncached cases bypass the flow result cache and measure the engine itself;
+    the others go through the public functions exactly as the endpoints do.
+    """
+    compiled = logic.get_compiled_model()
+    for corpus in ("input1", "case_sections", "synthetic", "boundary"):
+        items = corpora[corpus]
+        yield f"complete_flow_uncached:{corpus}", lambda d: logic._evaluate_complete_flow(d, compiled), items
+        yield f"complete_flow:{corpus}", logic.evaluate_complete_flow, items
+        yield f"basic_flow_uncached:{corpus}", lambda d: logic._evaluate_basic_flow(d, compiled), items
+        yield f"evaluate_targets_uncached:{corpus}", lambda d: logic._evaluate_targets(
+            logic._prepare_flow_inputs(d), compiled, logic.EVALUATION_TARGETS, False
+        ), items
+        pairs = [(d, logic.evaluate_complete_flow(d)) for d in items]
+        yield f"generate_explanation:{corpus}", lambda p: logic.generate_explanation(*p), pairs
+
+    for corpus in ("inputB1", "inputB11", "case_sections", "synthetic", "boundary"):
+        yield f"evaluate_krav:{corpus}", logic.evaluate_krav, corpora[corpus]
+
+    # One-field edits on top of a previous state (what a wizard session does per keystroke)
+    edits = []
+    synthetic = corpora["synthetic"]
+    for i, inputs in enumerate(synthetic):
+        following = synthetic[(i + 1) % len(synthetic)]
+        field = sorted(following)[i % len(following)]
+        edited = dict(inputs)
+        edited[field] = following[field]
+        edits.append((logic.evaluate_incremental(inputs), edited, [field]))
+    yield "evaluate_incremental:synthetic", lambda e: logic.evaluate_incremental(e[1], e[0], e[2]), edits
+
+
+def http_cases(corpora):
+    """(name, fn, items) driving the FastAPI app in-process through the ASGI test client."""
+    try:
+        from fastapi.testclient import TestClient
+        import server
+    except ImportError as e:  # pragma: no cover - optional dependency (httpx)
+        print(f"HTTP cases skipped: {e}", file=sys.stderr)
+        return
+    client = TestClient(server.app)
+
+    def post(path):
+        def call(body):
+            response = client.post(path, json=body)
+            response.raise_for_status()
+        return call
+
+    def get(path, headers=None):
+        def call(_):
+            response = client.get(path, headers=headers)
+            if response.status_code >= 400:
+                response.raise_for_status()
+        return call
+
+    items = corpora["case_sections"] + corpora["synthetic"]
+    yield "http:POST /evaluate-complete", post("/evaluate-complete"), items
+    yield "http:POST /evaluate-basic", post("/evaluate-basic"), items
+    yield "http:POST /evaluate-krav", post("/evaluate-krav"), corpora["inputB1"] + corpora["inputB11"] + items
+    explain = [{"inputs": d, "results": logic.evaluate_complete_flow(d)} for d in items]
+    yield "http:POST /generate-explanation", post("/generate-explanation"), explain
+    yield "http:GET /models/versions", get("/models/versions"), [None]
+    etag = client.get("/Krav.json").headers.get("etag")
+    yield "http:GET /Krav.json (304)", get("/Krav.json", {"If-None-Match": etag or ""}), [None]
+
+
+def run(args) -> dict:
+    corpora = load_corpora(synthetic=args.synthetic, seed=args.seed)
+    groups = [engine_cases(corpora)]
+    if not args.no_http:
+        groups.append(http_cases(corpora))
+
+    cases = {}
+    for group in groups:
+        for name, fn, items in group:
+            if args.filter and args.filter not in name:
+                continue
+            stats = measure(fn, items, args.iterations, args.warmup)
+            cases[name] = stats
+            print(f"{name:48s} p50 {stats['p50_us']:9.1f}us  p95 {stats['p95_us']:9.1f}us  "
+                  f"p99 {stats['p99_us']:9.1f}us  {stats['ops_per_sec']:10.0f} ops/s")
+    return {"meta": _meta(args), "cases": cases}
+
+
+def _meta(args) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except Exception:
+        commit = None
+    versions = {name: info["version"] for name, info in logic.get_model_versions().items()}
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "model_versions": versions,
+        "iterations": args.iterations,
+        "warmup": args.warmup,
+        "synthetic": args.synthetic,
+        "seed": args.seed,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Print a comparison table and return the names of regressed cases."""
+    regressions = []
+    base_cases = baseline.get("cases", {})
+    print(f"\nCompared with {baseline.get('meta', {}).get('commit') or 'baseline'} (threshold {threshold:.0%}):")
+    for name, stats in current["cases"].items():
+        base = base_cases.get(name)
+        if not base:
+            print(f"  {name:48s} (new)")
+            continue
+        ratios = {
+            metric: stats[metric] / base[metric] if base.get(metric) else 1.0
+            for metric in ("p50_us", "p95_us")
+        }
+        regressed = any(ratio > 1.0 + threshold for ratio in ratios.values())
+        if regressed:
+            regressions.append(name)
+        print(f"  {name:48s} p50 x{ratios['p50_us']:5.2f}  p95 x{ratios['p95_us']:5.2f}"
+              + ("  REGRESSION" if regressed else ""))
+    for name in base_cases:
+        if name not in current["cases"]:
+            print(f"  {name:48s} (missing)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the BR18 evaluation engine and HTTP endpoints.")
+    parser.add_argument("--iterations", type=int, default=2000, help="measured calls per case")
+    parser.add_argument("--warmup", type=int, default=200, help="unmeasured calls per case")
+    parser.add_argument("--quick", action="store_true", help="200 iterations / 20 warmup")
+    parser.add_argument("--synthetic", type=int, default=500, help="number of synthetic and boundary inputs")
+    parser.add_argument("--seed", type=int, default=18)
+    parser.add_argument("--filter", help="only cases whose name contains this text")
+    parser.add_argument("--no-http", action="store_true", help="skip the in-process HTTP cases")
+    parser.add_argument("--out", default=str(DEFAULT_OUT), help="where to write the JSON results")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown (p50/p95) that counts as a regression")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.iterations, args.warmup = 200, 20
+
+    results = run(args)
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())